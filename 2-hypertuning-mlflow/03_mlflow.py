@@ -1,32 +1,111 @@
-from datetime import datetime
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import cache, lru_cache
 from pathlib import Path
 from typing import Iterator
 
 import mlflow
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from hyperopt import STATUS_OK, Trials, fmin, hp, tpe
+from hyperopt import STATUS_FAIL, STATUS_OK, Trials, hp, space_eval, tpe
+from hyperopt.base import (
+    JOB_STATE_DONE,
+    JOB_STATE_NEW,
+    JOB_STATE_RUNNING,
+    Domain,
+    spec_from_misc,
+)
 from hyperopt.pyll import scope
+from hyperopt.utils import coarse_utcnow
 from loguru import logger
 from mads_datasets import DatasetFactoryProvider, DatasetType
-from mltrainer import ReportTypes, Trainer, TrainerSettings, metrics
-from mltrainer.preprocessors import BasePreprocessor
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.store.artifact.artifact_repository_registry import get_artifact_repository
+from mlflow.tracking import MlflowClient
+from mltrainer import Trainer, TrainerSettings, metrics
+from safetensors.torch import load_file as load_safetensors
+from safetensors.torch import save as save_safetensors
 
+TRIALS_FILE = Path("hyperopt_trials.pkl")
+MODEL_ARTIFACT = "pytorch_models"
+MODEL_FILE = "model.safetensors"
 
-def get_fashion_streamers(batchsize: int) -> tuple[Iterator, Iterator]:
+
+@lru_cache(maxsize=1)
+def load_fashion_tensors() -> dict[str, tuple[torch.Tensor, torch.Tensor]]:
+    # Preprocess the whole dataset once, exactly like MNISTDataset does per item
     fashionfactory = DatasetFactoryProvider.create_factory(DatasetType.FASHION)
-    preprocessor = BasePreprocessor()
-    streamers = fashionfactory.create_datastreamer(
-        batchsize=batchsize, preprocessor=preprocessor
+    datasets = fashionfactory.create_dataset()
+    tensors = {}
+    for name, dataset in datasets.items():
+        images = dataset.data.unsqueeze(1).to(torch.float32).div_(255.0)
+        labels = dataset.labels.to(torch.uint8)
+        tensors[name] = (images, labels)
+    logger.info(
+        f"Cached Fashion-MNIST tensors: { {k: len(v[1]) for k, v in tensors.items()} }"
     )
-    train = streamers["train"]
-    valid = streamers["valid"]
-    trainstreamer = train.stream()
-    validstreamer = valid.stream()
+    return tensors
+
+
+class PrefetchStreamer:
+    """Endless shuffled batches from preloaded tensors, prepared in a background thread.
+
+    Mirrors BaseDatastreamer.stream(): batches are drawn from a random
+    permutation that is reshuffled once too few samples remain.
+    """
+
+    def __init__(
+        self,
+        images: torch.Tensor,
+        labels: torch.Tensor,
+        batchsize: int,
+        prefetch: int = 8,
+    ):
+        self.images = images
+        self.labels = labels
+        self.batchsize = batchsize
+        self._queue: queue.Queue = queue.Queue(maxsize=prefetch)
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self.labels) // self.batchsize
+
+    def _fill(self) -> None:
+        size = len(self.labels)
+        while True:
+            order = torch.randperm(size)
+            for start in range(0, size - self.batchsize + 1, self.batchsize):
+                idx = order[start : start + self.batchsize]
+                self._queue.put((self.images[idx], self.labels[idx]))
+
+    def __iter__(self) -> "PrefetchStreamer":
+        return self
+
+    def __next__(self) -> tuple[torch.Tensor, torch.Tensor]:
+        return self._queue.get()
+
+
+@cache
+def get_fashion_streamers(batchsize: int) -> tuple[Iterator, Iterator]:
+    # One pair of streamers per process, shared by all hyperopt evaluations
+    tensors = load_fashion_tensors()
+    trainstreamer = PrefetchStreamer(*tensors["train"], batchsize=batchsize)
+    validstreamer = PrefetchStreamer(*tensors["valid"], batchsize=batchsize)
     return trainstreamer, validstreamer
 
 
+@lru_cache(maxsize=1)
 def get_device() -> str:
     if torch.backends.mps.is_available() and torch.backends.mps.is_built():
         device = "mps"
@@ -88,16 +167,47 @@ class CNN(nn.Module):
         return logits
 
 
-def setup_mlflow(experiment_path: str) -> None:
+def setup_mlflow(experiment_path: str) -> str:
     mlflow.set_tracking_uri("sqlite:///mlflow.db")
-    mlflow.set_experiment(experiment_path)
+    return mlflow.set_experiment(experiment_path).experiment_id
+
+
+class HistoryTrainer(Trainer):
+    """Trainer that keeps what ReportTypes.MLFLOW would log, for one batched write.
+
+    Trainer.loop calls report once per epoch. Workers never open the SQLite
+    tracking store themselves; only the parent process writes to it, one
+    log_batch call per finished trial.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history: list[tuple[str, float, int, int]] = []
 
+    def report(
+        self,
+        epoch: int,
+        train_loss: float,
+        test_loss: float,
+        metric_dict: dict[str, float],
+    ) -> None:
+        timestamp = int(time.time() * 1000)
+        values = {"Loss/train": train_loss, "Loss/test": test_loss}
+        values.update({f"metric/{m}": v for m, v in metric_dict.items()})
+        values["learning_rate"] = self.optimizer.param_groups[0]["lr"]
+        for key, value in values.items():
+            self.history.append((key, float(value), timestamp, epoch))
+        super().report(epoch, train_loss, test_loss, metric_dict)
 
-def objective(params):
-    modeldir = Path("models").resolve()
-    if not modeldir.exists():
-        modeldir.mkdir(parents=True)
-        logger.info(f"Created {modeldir}")
+
+def init_worker(num_threads: int) -> None:
+    # Split the cores between workers instead of every process using all of them
+    torch.set_num_threads(num_threads)
+
+
+def train_trial(params: dict, tid: int) -> dict:
+    """Train one model in a worker process, without touching MLflow."""
+    start_time = int(time.time() * 1000)
     batchsize = 64
     trainstreamer, validstreamer = get_fashion_streamers(batchsize)
     accuracy = metrics.Accuracy()
@@ -107,51 +217,279 @@ def objective(params):
         logdir=Path("modellog"),
         train_steps=100,
         valid_steps=100,
-        reporttypes=[ReportTypes.MLFLOW],
+        reporttypes=[],
     )
-    # Start a new MLflow run for tracking the experiment
     device = get_device()
-    with mlflow.start_run():
-        # Set MLflow tags to record metadata about the model and developer
-        mlflow.set_tag("model", "convnet")
-        mlflow.set_tag("dev", "raoul")
-        # Log hyperparameters to MLflow
-        mlflow.log_params(params)
-        mlflow.log_param("batchsize", f"{batchsize}")
-
-        # Initialize the optimizer, loss function, and accuracy metric
-        optimizer = optim.Adam
-        loss_fn = torch.nn.CrossEntropyLoss()
-
-        # Instantiate the CNN model with the given hyperparameters
-        model = CNN(**params)
-        model.to(device)
-        # Train the model using a custom train loop
-        trainer = Trainer(
-            model=model,
-            settings=settings,
-            loss_fn=loss_fn,
-            optimizer=optimizer,  # type: ignore
-            traindataloader=trainstreamer,
-            validdataloader=validstreamer,
-            scheduler=optim.lr_scheduler.ReduceLROnPlateau,
-            device=device,
+
+    # Initialize the optimizer, loss function, and accuracy metric
+    optimizer = optim.Adam
+    loss_fn = torch.nn.CrossEntropyLoss()
+
+    # Instantiate the CNN model with the given hyperparameters
+    model = CNN(**params)
+    model.to(device)
+    # Train the model using a custom train loop
+    trainer = HistoryTrainer(
+        model=model,
+        settings=settings,
+        loss_fn=loss_fn,
+        optimizer=optimizer,  # type: ignore
+        traindataloader=trainstreamer,
+        validdataloader=validstreamer,
+        scheduler=optim.lr_scheduler.ReduceLROnPlateau,
+        device=device,
+    )
+    trainer.loop()
+
+    # Serialize the weights in memory; the parent writes them off the training path
+    state_dict = {k: v.detach().cpu() for k, v in model.state_dict().items()}
+
+    return {
+        "loss": trainer.test_loss,
+        "batchsize": batchsize,
+        "history": trainer.history,
+        "weights": save_safetensors(state_dict),
+        "start_time": start_time,
+        "end_time": int(time.time() * 1000),
+    }
+
+
+class ArtifactWriter:
+    """Logs finished trials to MLflow from a background thread.
+
+    Weights are stored as a safetensors state_dict, once per distinct content
+    hash: a run whose weights match a stored model only records the run that
+    holds them. With ``keep_top_k`` only the k best stored models by test loss
+    are kept, plus any worse ones that duplicate runs still load.
+    """
+
+    def __init__(
+        self, client: MlflowClient, experiment_id: str, keep_top_k: int | None = None
+    ):
+        self.client = client
+        self.experiment_id = experiment_id
+        self.keep_top_k = keep_top_k
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def submit(self, tid: int, params: dict, result: dict) -> None:
+        self._queue.put((tid, params, result))
+
+    def close(self) -> None:
+        # Finish everything already submitted
+        self._queue.put(None)
+        self._thread.join()
+
+    def _drain(self) -> None:
+        while (item := self._queue.get()) is not None:
+            try:
+                self.log_trial(*item)
+            except Exception:  # keep logging the other trials
+                logger.exception(f"Logging trial {item[0]} to MLflow failed")
+
+    def log_trial(self, tid: int, params: dict, result: dict) -> str:
+        weights = result["weights"]
+        digest = hashlib.sha256(weights).hexdigest()
+        owner = self._stored_run(digest)
+
+        # One run and a single batched write per trial
+        run = self.client.create_run(
+            self.experiment_id, start_time=result["start_time"]
+        )
+        run_id = run.info.run_id
+        self.client.log_batch(
+            run_id,
+            metrics=[Metric(*entry) for entry in result["history"]],
+            params=[Param(k, str(v)) for k, v in params.items()]
+            + [Param("batchsize", str(result["batchsize"]))],
+            tags=[
+                RunTag("model", "convnet"),
+                RunTag("dev", "raoul"),
+                RunTag("hyperopt_tid", str(tid)),
+                RunTag("model_sha256", digest),
+                RunTag("model_artifact", "duplicate" if owner else "stored"),
+                RunTag("model_artifact_run_id", owner or run_id),
+            ],
+        )
+        if owner is None:
+            with tempfile.TemporaryDirectory() as tmp:
+                modelpath = Path(tmp) / MODEL_FILE
+                modelpath.write_bytes(weights)
+                self.client.log_artifact(
+                    run_id, str(modelpath), artifact_path=MODEL_ARTIFACT
+                )
+        else:
+            logger.info(
+                f"Trial {tid} has the same weights as run {owner}, "
+                "not storing them again"
+            )
+        self.client.set_terminated(run_id, end_time=result["end_time"])
+
+        if owner is None and self.keep_top_k:
+            self._prune()
+        return run_id
+
+    def _stored_run(self, digest: str) -> str | None:
+        runs = self.client.search_runs(
+            [self.experiment_id],
+            filter_string=(
+                f"tags.model_sha256 = '{digest}' and tags.model_artifact = 'stored'"
+            ),
+            max_results=1,
+        )
+        return runs[0].info.run_id if runs else None
+
+    def _has_duplicates(self, run_id: str) -> bool:
+        # Duplicate runs load their model from the run that stored it
+        runs = self.client.search_runs(
+            [self.experiment_id],
+            filter_string=(
+                f"tags.model_artifact_run_id = '{run_id}' "
+                "and tags.model_artifact = 'duplicate'"
+            ),
+            max_results=1,
         )
-        trainer.loop()
+        return bool(runs)
+
+    def _prune(self) -> None:
+        stored = self.client.search_runs(
+            [self.experiment_id],
+            filter_string="tags.model_artifact = 'stored'",
+            order_by=["metrics.`Loss/test` ASC"],
+        )
+        for run in stored[self.keep_top_k :]:
+            if self._has_duplicates(run.info.run_id):
+                continue
+            get_artifact_repository(run.info.artifact_uri).delete_artifacts(
+                MODEL_ARTIFACT
+            )
+            self.client.set_tag(run.info.run_id, "model_artifact", "pruned")
+            logger.info(f"Pruned model of run {run.info.run_id}")
+
+
+def load_trial_model(client: MlflowClient, run_id: str) -> CNN:
+    # Duplicate runs point at the run that stored their weights
+    run = client.get_run(run_id)
+    params = {k: int(run.data.params[k]) for k in ("filters", "units1", "units2")}
+    path = mlflow.artifacts.download_artifacts(
+        run_id=run.data.tags.get("model_artifact_run_id", run_id),
+        artifact_path=f"{MODEL_ARTIFACT}/{MODEL_FILE}",
+    )
+    model = CNN(**params)
+    model.load_state_dict(load_safetensors(path))
+    return model
+
+
+def load_trials(trials_file: Path) -> Trials:
+    # Same pickle format as fmin(trials_save_file=...), so either can resume the other
+    if trials_file.exists():
+        with trials_file.open("rb") as f:
+            trials = pickle.load(f)
+        logger.info(f"Resuming {len(trials.trials)} trials from {trials_file}")
+        return trials
+    return Trials()
+
 
-        # Save the trained model with a timestamp
-        tag = datetime.now().strftime("%Y%m%d-%H%M")
-        modelpath = modeldir / (tag + "model.pt")
-        logger.info(f"Saving model to {modelpath}")
-        torch.save(model, modelpath)
+def save_trials(trials: Trials, trials_file: Path) -> None:
+    tmp = trials_file.with_suffix(".tmp")
+    with tmp.open("wb") as f:
+        pickle.dump(trials, f)
+    os.replace(tmp, trials_file)
 
-        # Log the saved model as an artifact in MLflow
-        mlflow.log_artifact(local_path=str(modelpath), artifact_path="pytorch_models")
-        return {"loss": trainer.test_loss, "status": STATUS_OK}
 
+def default_workers() -> int:
+    # Two torch threads per worker keeps the convolutions efficient on every core
+    return max(1, (os.cpu_count() or 1) // 2)
 
-def main():
-    setup_mlflow("mlflow_database")
+
+def run_sweep(
+    space: dict,
+    max_evals: int,
+    workers: int,
+    trials_file: Path,
+    experiment_id: str,
+    keep_top_k: int | None = None,
+    seed: int | None = None,
+) -> Trials:
+    """Evaluate up to ``workers`` trials at a time, asking TPE for one as each ends.
+
+    Trials still pending in a resumed trials file are evaluated again first.
+    """
+    # Download once up front; workers racing on an empty cache folder skip the download
+    DatasetFactoryProvider.create_factory(DatasetType.FASHION).download_data()
+
+    trials = load_trials(trials_file)
+    domain = Domain(train_trial, space)
+    writer = ArtifactWriter(MlflowClient(), experiment_id, keep_top_k)
+    rstate = np.random.default_rng(seed)
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    running: dict[Future, tuple[dict, dict]] = {}
+
+    # Trials already marked done in the trials file must reach MLflow, even when
+    # the sweep is interrupted
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(num_threads,),
+        ) as pool:
+
+            def submit(doc: dict) -> None:
+                params = space_eval(space, spec_from_misc(doc["misc"]))
+                doc["state"] = JOB_STATE_RUNNING
+                doc["book_time"] = coarse_utcnow()
+                running[pool.submit(train_trial, params, doc["tid"])] = (doc, params)
+                logger.info(f"Started trial {doc['tid']} with {params}")
+
+            for doc in trials.trials:
+                if doc["state"] in (JOB_STATE_NEW, JOB_STATE_RUNNING):
+                    submit(doc)
+
+            while running or len(trials.trials) < max_evals:
+                # Keep every worker busy; TPE only learns from finished trials
+                while len(running) < workers and len(trials.trials) < max_evals:
+                    new_ids = trials.new_trial_ids(1)
+                    trials.refresh()
+                    docs = tpe.suggest(
+                        new_ids, domain, trials, rstate.integers(2**31 - 1)
+                    )
+                    trials.insert_trial_docs(docs)
+                    trials.refresh()
+                    submit(next(t for t in trials.trials if t["tid"] == new_ids[0]))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    doc, params = running.pop(future)
+                    doc["refresh_time"] = coarse_utcnow()
+                    doc["state"] = JOB_STATE_DONE
+                    try:
+                        result = future.result()
+                    except Exception:
+                        # TPE skips failed trials, the rest of the sweep goes on
+                        logger.exception(f"Trial {doc['tid']} failed")
+                        doc["result"] = {"status": STATUS_FAIL}
+                        continue
+                    writer.submit(doc["tid"], params, result)
+                    doc["result"] = {"loss": result["loss"], "status": STATUS_OK}
+                    logger.info(
+                        f"Finished trial {doc['tid']} with loss {result['loss']:.4f}"
+                    )
+                trials.refresh()
+                save_trials(trials, trials_file)
+    finally:
+        writer.close()
+    return trials
+
+
+def main(
+    max_evals: int = 3,
+    workers: int | None = None,
+    trials_file: Path = TRIALS_FILE,
+    keep_top_k: int | None = None,
+):
+    experiment_id = setup_mlflow("mlflow_database")
 
     search_space = {
         "filters": scope.int(hp.quniform("filters", 16, 128, 8)),
@@ -159,12 +497,47 @@ def main():
         "units2": scope.int(hp.quniform("units2", 32, 128, 8)),
     }
 
-    best_result = fmin(
-        fn=objective, space=search_space, algo=tpe.suggest, max_evals=3, trials=Trials()
+    trials = run_sweep(
+        search_space,
+        max_evals=max_evals,
+        workers=workers or default_workers(),
+        trials_file=trials_file,
+        experiment_id=experiment_id,
+        keep_top_k=keep_top_k,
     )
+    best_result = space_eval(search_space, trials.argmin)
 
     logger.info(f"Best result: {best_result}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Hyperopt CNN sweep tracked in MLflow")
+    parser.add_argument(
+        "--max-evals", type=int, default=3, help="Total number of hyperopt trials"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Trials evaluated in parallel (defaults to half the CPU cores)",
+    )
+    parser.add_argument(
+        "--trials-file",
+        type=Path,
+        default=TRIALS_FILE,
+        help="Pickled hyperopt Trials, resumed when it exists",
+    )
+    parser.add_argument(
+        "--keep-top-k",
+        type=int,
+        default=None,
+        help="Only keep the model artifacts of the k trials with the lowest loss",
+    )
+    args = parser.parse_args()
+
+    main(
+        max_evals=args.max_evals,
+        workers=args.workers,
+        trials_file=args.trials_file,
+        keep_top_k=args.keep_top_k,
+    )
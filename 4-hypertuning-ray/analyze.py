@@ -5,19 +5,21 @@ from pathlib import Path
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow.compute as pc
 from loguru import logger
-from ray.tune import ExperimentAnalysis
 
+from src.results_store import final_results, max_iteration, read_results
 
-def load_latest_experiment(tune_dir: Path) -> ExperimentAnalysis:
-    """Load the latest Ray Tune experiment."""
-    experiments = sorted([d for d in tune_dir.iterdir() if d.is_dir()])
+
+def load_latest_experiment(tune_dir: Path) -> Path:
+    """Find the most recently updated Ray Tune experiment directory."""
+    experiments = [d for d in tune_dir.iterdir() if d.is_dir()]
     if not experiments:
         raise ValueError(f"No experiments found in {tune_dir}")
 
-    latest = experiments[-1]
+    latest = max(experiments, key=lambda d: d.stat().st_mtime)
     logger.info(f"Loading experiment from: {latest}")
-    return ExperimentAnalysis(latest)
+    return latest
 
 
 def create_parallel_plot(df: pd.DataFrame, columns: list[str], color: str = "val_acc"):
@@ -59,20 +61,23 @@ def create_heatmap(df: pd.DataFrame, x: str, y: str, z: str = "val_acc"):
 
 def analyze_results(tune_dir: Path):
     """Analyze and visualize hyperparameter tuning results."""
-    # Load experiment
-    analysis = load_latest_experiment(tune_dir)
-    df = analysis.results_df
-
-    # Get best configuration
-    best_config = analysis.get_best_config(metric="val_acc", mode="max")
-    best_result = analysis.best_result
+    # Load experiment (exports new results to Parquet, no Ray needed)
+    experiment_dir = load_latest_experiment(tune_dir)
+
+    # Get best configuration from the last result of every trial
+    finals = final_results(experiment_dir).to_pandas()
+    best_result = finals.loc[finals["val_acc"].idxmax()]
+    best_config = {
+        key.removeprefix("config/"): value
+        for key, value in best_result.items()
+        if key.startswith("config/")
+    }
 
     logger.info("=" * 60)
     logger.info("BEST CONFIGURATION")
     logger.info("=" * 60)
     for key, value in best_config.items():
-        if not key.startswith("config/"):
-            logger.info(f"{key}: {value}")
+        logger.info(f"{key}: {value}")
     logger.info(f"Validation Accuracy: {best_result['val_acc']:.4f}")
     logger.info(f"Validation Loss: {best_result['val_loss']:.4f}")
     logger.info("=" * 60)
@@ -85,10 +90,15 @@ def analyze_results(tune_dir: Path):
         "config/learning_rate",
     ]
 
-    # Filter to only completed trials
-    completed = df[df["training_iteration"] == df["training_iteration"].max()].copy()
+    # Filter to only completed trials, reading just the needed columns and rows
+    last_iteration = max_iteration(experiment_dir)
+    completed = read_results(
+        experiment_dir,
+        columns=["trial_name", "training_iteration"] + param_cols + ["val_acc", "val_loss"],
+        filters=pc.field("training_iteration") == last_iteration,
+    ).to_pandas()
 
-    logger.info(f"\nTotal trials: {len(df)}")
+    logger.info(f"\nTotal trials: {len(finals)}")
     logger.info(f"Completed trials: {len(completed)}")
 
     # Create visualizations
@@ -108,7 +118,7 @@ def analyze_results(tune_dir: Path):
     logger.info("\nSummary Statistics:")
     print(completed[param_cols + ["val_acc"]].describe())
 
-    return analysis, completed
+    return finals, completed
 
 
 if __name__ == "__main__":
@@ -118,4 +128,4 @@ if __name__ == "__main__":
         logger.error(f"No experiments found in {tune_dir}")
         logger.info("Run hypertune.py first!")
     else:
-        analysis, df = analyze_results(tune_dir)
+        finals, df = analyze_results(tune_dir)
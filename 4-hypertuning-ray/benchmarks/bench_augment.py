@@ -0,0 +1,102 @@
+"""Benchmark batched tensor augmentation against the torchvision DataLoaders.
+
+Both pipelines read the same synthetic CIFAR-sized uint8 images, so no dataset
+download is needed. The legacy pipeline mirrors get_data_with_augmentation:
+per-image PIL transforms in a DataLoader with ``num_workers`` workers.
+
+Usage:
+    python benchmarks/bench_augment.py [--images N] [--presets light medium strong]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.augment import PRESETS  # noqa: E402
+from src.datacache import CIFAR10_STATS, TensorBatchLoader  # noqa: E402
+
+
+def legacy_transform(preset: str):
+    """torchvision transform equivalent to a preset in get_data_with_augmentation."""
+    from torchvision import transforms
+
+    ops = {
+        "none": [],
+        "light": [transforms.RandomHorizontalFlip(p=0.5)],
+        "medium": [transforms.RandomCrop(32, padding=4), transforms.RandomHorizontalFlip(p=0.5)],
+        "strong": [
+            transforms.RandomCrop(32, padding=4),
+            transforms.RandomHorizontalFlip(p=0.5),
+            transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.1),
+        ],
+    }[preset]
+    return transforms.Compose(ops + [transforms.ToTensor(), transforms.Normalize(*CIFAR10_STATS)])
+
+
+class PILImageDataset(torch.utils.data.Dataset):
+    """Decodes uint8 HWC arrays to PIL per item, like torchvision's CIFAR10."""
+
+    def __init__(self, images: np.ndarray, labels: np.ndarray, transform):
+        self.images = images
+        self.labels = labels
+        self.transform = transform
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, index: int):
+        from PIL import Image
+
+        return self.transform(Image.fromarray(self.images[index])), int(self.labels[index])
+
+
+def images_per_second(loader) -> float:
+    """Iterate a loader once and return its throughput."""
+    start = time.perf_counter()
+    count = 0
+    for images, _ in loader:
+        count += images.shape[0]
+    return count / (time.perf_counter() - start)
+
+
+def main(num_images: int, batch_size: int, num_workers: int, presets: list[str]):
+    """Time both pipelines for each preset and print a table."""
+    rng = np.random.default_rng(0)
+    hwc = rng.integers(0, 256, (num_images, 32, 32, 3), dtype=np.uint8)
+    nchw = np.ascontiguousarray(hwc.transpose(0, 3, 1, 2))
+    labels = rng.integers(0, 10, num_images)
+
+    print(f"{'preset':<10}{'legacy img/s':>14}{'batched img/s':>15}{'speedup':>10}")
+    for preset in presets:
+        batched = images_per_second(
+            TensorBatchLoader(
+                nchw, labels, batch_size=batch_size, shuffle=True, augment=PRESETS[preset]
+            )
+        )
+        legacy_loader = torch.utils.data.DataLoader(
+            PILImageDataset(hwc, labels, legacy_transform(preset)),
+            batch_size=batch_size,
+            shuffle=True,
+            num_workers=num_workers,
+        )
+        legacy = images_per_second(legacy_loader)
+        print(f"{preset:<10}{legacy:>14.0f}{batched:>15.0f}{batched / legacy:>9.1f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark augmentation pipelines")
+    parser.add_argument("--images", type=int, default=10000, help="Synthetic images")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batch size")
+    parser.add_argument("--num-workers", type=int, default=2, help="Legacy loader workers")
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS), help="Presets to benchmark")
+
+    args = parser.parse_args()
+
+    main(args.images, args.batch_size, args.num_workers, args.presets)
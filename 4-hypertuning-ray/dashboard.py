@@ -0,0 +1,220 @@
+"""Live dashboard for a running Ray Tune sweep.
+
+Serves a local page that refreshes parallel coordinates, a hyperparameter
+heatmap and per-trial learning curves every few seconds. Each refresh reads
+only the result lines appended since the previous one, so it stays cheap on
+long sweeps. The "Stop sweep" button drops a STOP file in the experiment
+directory, which hypertune.py's stopper picks up to end all trials.
+
+    python dashboard.py [logs/ray/cifar10_tune] --port 8050
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import plotly.express as px
+from loguru import logger
+from plotly.offline import get_plotlyjs
+
+from analyze import create_heatmap, create_parallel_plot, load_latest_experiment
+from src.results_store import read_new_rows
+
+STOP_FILE = "STOP"
+PARAM_COLS = [
+    "config/num_conv_layers",
+    "config/base_filters",
+    "config/dropout",
+    "config/learning_rate",
+]
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Sweep dashboard</title>
+<script src="/plotly.js"></script>
+<style>
+body { font-family: sans-serif; margin: 1rem 2rem; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; }
+#status { color: #555; }
+</style>
+</head>
+<body>
+<h2>Sweep dashboard <button id="stop">Stop sweep</button></h2>
+<p id="status">Waiting for results...</p>
+<div id="parallel"></div>
+<div class="grid"><div id="curves"></div><div id="heatmap"></div></div>
+<script>
+let version = -1;
+async function refresh() {
+  const response = await fetch(`/figures.json?since=${version}`);
+  const data = await response.json();
+  if (data.version !== version) {
+    version = data.version;
+    document.getElementById("status").textContent = data.status;
+    for (const [id, fig] of Object.entries(data.figures)) {
+      Plotly.react(id, fig.data, fig.layout);
+    }
+  }
+}
+document.getElementById("stop").onclick = async () => {
+  if (confirm("Stop all running trials?")) {
+    await fetch("/stop", { method: "POST" });
+  }
+};
+refresh();
+setInterval(refresh, REFRESH_MS);
+</script>
+</body>
+</html>
+"""
+
+
+class SweepState:
+    """Results of one experiment, extended with appended rows on demand."""
+
+    def __init__(self, experiment_dir: Path):
+        self.experiment_dir = experiment_dir
+        self.offsets: dict[str, int] = {}
+        self.df = pd.DataFrame()
+        self.version = 0
+        self._figures: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def poll(self) -> bool:
+        """Read rows appended since the last poll; return whether any arrived."""
+        rows = list(read_new_rows(self.experiment_dir, self.offsets))
+        if not rows:
+            return False
+        self.df = pd.concat([self.df, pd.DataFrame(rows)], ignore_index=True)
+        self.version += 1
+        self._figures = {}
+        return True
+
+    def snapshot(self, since: int = -1) -> dict:
+        """Current figures as Plotly JSON, rebuilt only after new rows.
+
+        Args:
+            since: Version the client already has; figures are omitted when
+                nothing changed since then
+        """
+        with self._lock:
+            self.poll()
+            if since == self.version:
+                return {"version": self.version}
+            if not self._figures and not self.df.empty:
+                self._figures = {
+                    name: json.loads(fig.to_json()) for name, fig in build_figures(self.df).items()
+                }
+            return {
+                "version": self.version,
+                "status": self.status(),
+                "figures": self._figures,
+            }
+
+    def status(self) -> str:
+        """One-line summary of the sweep so far."""
+        if self.df.empty:
+            return f"Waiting for results in {self.experiment_dir}"
+        best = self.df["val_acc"].max()
+        stopped = " (stop requested)" if (self.experiment_dir / STOP_FILE).exists() else ""
+        return (
+            f"{self.df['trial_name'].nunique()} trials, {len(self.df)} results, "
+            f"best val_acc {best:.4f}{stopped}"
+        )
+
+
+def build_figures(df: pd.DataFrame) -> dict:
+    """Parallel coordinates, learning curves and heatmap for the results so far."""
+    latest = df.sort_values("training_iteration").groupby("trial_name").tail(1)
+    params = [c for c in PARAM_COLS if c in latest.columns]
+
+    curves = px.line(
+        df,
+        x="training_iteration",
+        y="val_acc",
+        color="trial_name",
+        title="Validation accuracy per trial",
+    )
+    curves.update_layout(showlegend=False)
+
+    figures = {"parallel": create_parallel_plot(latest, params), "curves": curves}
+    if {"config/num_conv_layers", "config/base_filters"} <= set(latest.columns):
+        figures["heatmap"] = create_heatmap(latest, "config/base_filters", "config/num_conv_layers")
+    return figures
+
+
+def make_handler(state: SweepState, refresh_ms: int):
+    """Build a request handler bound to a sweep."""
+    page = PAGE.replace("REFRESH_MS", str(refresh_ms)).encode()
+    plotly_js = get_plotlyjs().encode()
+
+    class DashboardHandler(BaseHTTPRequestHandler):
+        def _send(self, body: bytes, content_type: str, status: int = 200):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):  # noqa: N802
+            path = self.path.split("?")[0]
+            if path == "/":
+                self._send(page, "text/html; charset=utf-8")
+            elif path == "/plotly.js":
+                self._send(plotly_js, "application/javascript")
+            elif path == "/figures.json":
+                query = parse_qs(urlparse(self.path).query)
+                since = int(query.get("since", ["-1"])[0])
+                self._send(json.dumps(state.snapshot(since)).encode(), "application/json")
+            else:
+                self._send(b"Not found", "text/plain", 404)
+
+        def do_POST(self):  # noqa: N802
+            if self.path != "/stop":
+                self._send(b"Not found", "text/plain", 404)
+                return
+            (state.experiment_dir / STOP_FILE).touch()
+            logger.warning(f"Stop requested for {state.experiment_dir}")
+            self._send(b"{}", "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return DashboardHandler
+
+
+def serve(experiment_dir: Path, port: int = 8050, refresh_ms: int = 3000):
+    """Serve the dashboard until interrupted."""
+    state = SweepState(experiment_dir)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state, refresh_ms))
+    logger.info(f"Dashboard for {experiment_dir} at http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Live dashboard for a Ray Tune sweep")
+    parser.add_argument(
+        "experiment_dir",
+        nargs="?",
+        type=Path,
+        help="Experiment directory (defaults to the latest in logs/ray)",
+    )
+    parser.add_argument("--port", type=int, default=8050, help="Port to listen on")
+    parser.add_argument("--refresh", type=float, default=3.0, help="Seconds between refreshes")
+
+    args = parser.parse_args()
+
+    experiment_dir = args.experiment_dir or load_latest_experiment(Path("logs/ray").resolve())
+    serve(experiment_dir, args.port, int(args.refresh * 1000))
@@ -1,8 +1,11 @@
 """Hyperparameter tuning script using Ray Tune."""
 
+import argparse
+import time
 from pathlib import Path
 from typing import Any, Dict
 
+import numpy as np
 import ray
 import torch
 import torch.nn as nn
@@ -10,21 +13,32 @@ import torch.optim as optim
 from filelock import FileLock
 from loguru import logger
 from ray import tune
-from ray.tune.schedulers import AsyncHyperBandScheduler
+from ray.train import CheckpointConfig
+from ray.tune.schedulers import AsyncHyperBandScheduler, PopulationBasedTraining
 from ray.tune.search.hyperopt import HyperOptSearch
 from torch.utils.data import DataLoader
 from torchvision import datasets, transforms
 
+from src.augment import PRESETS, BatchTransform
+from src.checkpoints import report_with_checkpoint, restore_from_checkpoint
+from src.datacache import CIFAR10_STATS, SIMPLE_STATS, get_cached_loaders, load_cifar10_arrays
+from src.fidelity import FidelitySchedule, fidelity_loaders
 from src.model import ConfigurableCNN
+from src.resources import configure_trial_threads, make_trial_resources
+from src.results_store import update_results_store
 from src.train import train_epoch, validate
 
 # Configuration
 MAX_EPOCHS = 10
 NUM_SAMPLES = 20
 BATCH_SIZE = 32
+EXPERIMENT_NAME = "cifar10_tune"
+TRAIN_SIZE = 50_000  # CIFAR-10 training images
+# First ASHA rung in samples_seen: half an epoch at low fidelity
+FIDELITY_RUNG_SAMPLES = TRAIN_SIZE // 2
 
 
-def get_data(data_dir: Path, batch_size: int = 32):
+def get_data(data_dir: Path, batch_size: int = 32, num_workers: int = 0):
     """Load CIFAR-10 dataset with file locking."""
     with FileLock(data_dir / ".lock"):
         transform = transforms.Compose(
@@ -42,26 +56,52 @@ def get_data(data_dir: Path, batch_size: int = 32):
             root=data_dir, train=False, download=True, transform=transform
         )
 
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
+        train_loader = DataLoader(
+            train_dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers
+        )
+        val_loader = DataLoader(
+            val_dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers
+        )
 
     return train_loader, val_loader
 
 
 def get_data_with_augmentation(
-    data_dir: Path, augmentation: str = "none", batch_size: int = 32
+    data_dir: Path,
+    augmentation: str = "none",
+    batch_size: int = 32,
+    data: Dict[str, np.ndarray] | None = None,
+    num_workers: int = 2,
+    extra_presets: Dict[str, BatchTransform | None] | None = None,
 ):
     """
     Load CIFAR-10 dataset with configurable augmentation.
 
+    With cached arrays, augmentation runs batched on tensors (see src.augment);
+    otherwise the per-image torchvision pipeline below is used.
+
     Args:
         data_dir: Path to data directory
-        augmentation: One of ['none', 'light', 'medium', 'strong']
+        augmentation: One of ['none', 'light', 'medium', 'strong'] or a key
+            of ``extra_presets``
         batch_size: Batch size for training
+        data: Shared CIFAR-10 arrays from src.datacache.load_cifar10_arrays
+        num_workers: Dataloader worker processes for the torchvision pipeline
+        extra_presets: Custom batched presets by name (cached arrays only)
 
     Returns:
         train_loader, val_loader
     """
+    if data is not None and augmentation in {**PRESETS, **(extra_presets or {})}:
+        logger.info(f"Using cached CIFAR-10 with batched augmentation='{augmentation}'")
+        return get_cached_loaders(
+            data,
+            augmentation=augmentation,
+            batch_size=batch_size,
+            stats=CIFAR10_STATS,
+            extra_presets=extra_presets,
+        )
+
     with FileLock(data_dir / ".lock"):
         # Define augmentation strategies
         if augmentation == "none":
@@ -132,14 +172,14 @@ def get_data_with_augmentation(
             train_dataset,
             batch_size=batch_size,
             shuffle=True,
-            num_workers=2,
+            num_workers=num_workers,
             pin_memory=True,
         )
         val_loader = DataLoader(
             val_dataset,
             batch_size=batch_size,
             shuffle=False,
-            num_workers=2,
+            num_workers=num_workers,
             pin_memory=True,
         )
 
@@ -148,39 +188,98 @@ def get_data_with_augmentation(
     return train_loader, val_loader
 
 
-def tune_model(config: Dict[str, Any]):
+def build_model(config: Dict[str, Any]) -> ConfigurableCNN:
+    """Create the ConfigurableCNN described by a trial config."""
+    model_config = {
+        "input_channels": 3,
+        "num_classes": 10,
+        "num_conv_layers": int(config["num_conv_layers"]),
+        "base_filters": int(config["base_filters"]),
+        "use_batchnorm": config["use_batchnorm"],
+        "dropout": config["dropout"],
+        "activation": config.get("activation", "relu"),
+        "use_skip_connections": config.get("use_skip_connections", False),
+    }
+    return ConfigurableCNN(model_config)
+
+
+def count_trial_params(config: Dict[str, Any]) -> int:
+    """Total trainable parameters of a trial's model, used to size its resources."""
+    return build_model(config).count_parameters()["total_params"]
+
+
+class StopFileStopper(tune.Stopper):
+    """Stop the whole sweep once a STOP file appears (see dashboard.py)."""
+
+    def __init__(self, experiment_dir: Path):
+        self.stop_file = experiment_dir / "STOP"
+
+    def __call__(self, trial_id, result):
+        return False
+
+    def stop_all(self):
+        return self.stop_file.exists()
+
+
+class ResultsStoreCallback(tune.Callback):
+    """Append results to the experiment's Parquet store as trials finish."""
+
+    def __init__(self, experiment_dir: Path):
+        self.experiment_dir = experiment_dir
+
+    def on_trial_complete(self, iteration, trials, trial, **info):
+        update_results_store(self.experiment_dir)
+
+    def on_experiment_end(self, trials, **info):
+        update_results_store(self.experiment_dir)
+
+
+def tune_model(
+    config: Dict[str, Any],
+    data: Dict[str, np.ndarray] | None = None,
+    extra_presets: Dict[str, BatchTransform | None] | None = None,
+):
     """
     Training function for Ray Tune.
 
     This function will be called by Ray with different configs.
+
+    Args:
+        config: Trial configuration
+        data: Shared CIFAR-10 arrays from the object store (see src.datacache)
+        extra_presets: Custom batched augmentation presets by name, passed with
+            ``tune.with_parameters`` so they reach the trial processes
     """
     # Setup device
     device = "cuda" if torch.cuda.is_available() else "cpu"
 
+    # Pin torch threads to the CPUs Ray reserved; leftover cores go to loader workers
+    num_workers = configure_trial_threads(uses_workers=data is None)
+
     # Load data
     data_dir = Path(config["data_dir"])
 
-    # Check if augmentation is specified in config
+    # Prefer the shared in-memory cache; fall back to torchvision loaders
     if "augmentation" in config:
         train_loader, val_loader = get_data_with_augmentation(
-            data_dir, augmentation=config["augmentation"], batch_size=BATCH_SIZE
+            data_dir,
+            augmentation=config["augmentation"],
+            batch_size=BATCH_SIZE,
+            data=data,
+            num_workers=num_workers,
+            extra_presets=extra_presets,
+        )
+    elif data is not None:
+        train_loader, val_loader = get_cached_loaders(
+            data, batch_size=BATCH_SIZE, stats=SIMPLE_STATS
         )
     else:
-        train_loader, val_loader = get_data(data_dir, batch_size=BATCH_SIZE)
+        train_loader, val_loader = get_data(
+            data_dir, batch_size=BATCH_SIZE, num_workers=num_workers
+        )
 
     # Create model
-    model_config = {
-        "input_channels": 3,
-        "num_classes": 10,
-        "num_conv_layers": int(config["num_conv_layers"]),
-        "base_filters": int(config["base_filters"]),
-        "use_batchnorm": config["use_batchnorm"],
-        "dropout": config["dropout"],
-        "activation": config.get("activation", "relu"),
-        "use_skip_connections": config.get("use_skip_connections", False),
-    }
-
-    model = ConfigurableCNN(model_config).to(device)
+    model = build_model(config).to(device)
 
     # Count parameters for capacity analysis
     param_info = model.count_parameters()
@@ -205,12 +304,25 @@ def tune_model(config: Dict[str, Any]):
     else:
         scheduler = optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=MAX_EPOCHS)
 
+    # Continue from a checkpoint when ASHA/PBT resumes or clones this trial
+    start_epoch, last_metrics = restore_from_checkpoint(
+        model, optimizer, scheduler, config["learning_rate"]
+    )
+    samples_seen = last_metrics.get("samples_seen", 0)
+
+    # Subsample train and val data until the trial survives the first rung
+    fidelity = FidelitySchedule.from_config(config)
+
     # Training loop
-    for epoch in range(config["epochs"]):
+    for epoch in range(start_epoch, config["epochs"]):
+        epoch_train, epoch_val, val_fraction = fidelity_loaders(
+            fidelity, samples_seen, epoch, train_loader, val_loader
+        )
         train_loss, train_acc = train_epoch(
-            model, train_loader, loss_fn, optimizer, device
+            model, epoch_train, loss_fn, optimizer, device
         )
-        val_loss, val_acc = validate(model, val_loader, loss_fn, device)
+        val_loss, val_acc = validate(model, epoch_val, loss_fn, device)
+        samples_seen += len(epoch_train.dataset)
 
         # Update scheduler
         if isinstance(scheduler, optim.lr_scheduler.ReduceLROnPlateau):
@@ -218,22 +330,47 @@ def tune_model(config: Dict[str, Any]):
         else:
             scheduler.step()
 
-        # Report to Ray
-        ray.train.report(
+        # Report to Ray with a checkpoint of model, optimizer and scheduler
+        report_with_checkpoint(
             {
                 "train_loss": train_loss,
                 "train_acc": train_acc,
                 "val_loss": val_loss,
                 "val_acc": val_acc,
+                "samples_seen": samples_seen,
+                "val_fraction": val_fraction,
                 "total_params": param_info["total_params"],
                 "conv_params": param_info["conv_params"],
                 "fc_params": param_info["fc_params"],
                 "param_ratio_conv": param_info["param_ratio_conv"],
-            }
+            },
+            epoch + 1,
+            model,
+            optimizer,
+            scheduler,
+            config["learning_rate"],
         )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune ConfigurableCNN on CIFAR-10")
+    parser.add_argument(
+        "--scheduler",
+        choices=["asha", "pbt"],
+        default="asha",
+        help="ASHA early stopping with HyperOpt, or Population Based Training",
+    )
+    parser.add_argument(
+        "--name", default=EXPERIMENT_NAME, help="Experiment name under logs/ray"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Start from scratch instead of resuming an interrupted experiment; "
+        "the previous run is moved to <name>-<timestamp>",
+    )
+    args = parser.parse_args()
+
     ray.init()
 
     # Setup paths
@@ -259,21 +396,58 @@ if __name__ == "__main__":
         "scheduler": tune.choice(["step", "plateau", "cosine"]),
     }
 
-    # Setup search algorithm
-    search_alg = HyperOptSearch()
-
-    # Setup scheduler
-    scheduler = AsyncHyperBandScheduler(
-        time_attr="training_iteration",
-        grace_period=1,
-        reduction_factor=3,
-        max_t=MAX_EPOCHS,
+    if args.scheduler == "pbt":
+        # PBT explores by mutating configs itself, so it samples the initial
+        # population randomly instead of through a search algorithm
+        search_alg = None
+        scheduler = PopulationBasedTraining(
+            time_attr="training_iteration",
+            perturbation_interval=2,
+            hyperparam_mutations={
+                "learning_rate": tune.loguniform(1e-4, 1e-2),
+                "dropout": tune.uniform(0.0, 0.5),
+            },
+        )
+    else:
+        # Setup search algorithm
+        search_alg = HyperOptSearch()
+
+        # Setup scheduler; rungs are measured in training samples so that
+        # low-fidelity iterations count for what they cost
+        scheduler = AsyncHyperBandScheduler(
+            time_attr="samples_seen",
+            grace_period=FIDELITY_RUNG_SAMPLES,
+            reduction_factor=3,
+            max_t=MAX_EPOCHS * TRAIN_SIZE,
+        )
+        config["fidelity_rung_samples"] = FIDELITY_RUNG_SAMPLES
+        config["fidelity_train_fraction"] = 0.5
+        config["fidelity_val_fraction"] = 0.2
+
+    # Load CIFAR-10 once; Ray shares the arrays with all trials via the object store
+    data = load_cifar10_arrays(data_dir)
+    logger.info(f"Cached CIFAR-10 in memory: {data['train_images'].shape[0]} train images")
+
+    # Trials of the previous run would otherwise be read into the results store
+    experiment_dir = tune_dir / args.name
+    if args.restart and experiment_dir.exists():
+        archive = experiment_dir.with_name(f"{args.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        experiment_dir.rename(archive)
+        logger.info(f"Moved previous run to {archive}")
+
+    # A STOP file left by the dashboard belongs to the previous run
+    (tune_dir / args.name / "STOP").unlink(missing_ok=True)
+
+    # Reserve CPUs per trial by model size so small models pack densely
+    trainable = tune.with_resources(
+        tune.with_parameters(tune_model, data=data),
+        make_trial_resources(count_trial_params),
     )
 
     # Run tuning
     logger.info(f"Starting hyperparameter tuning with {NUM_SAMPLES} samples")
     analysis = tune.run(
-        tune_model,
+        trainable,
         config=config,
         metric="val_acc",
         mode="max",
@@ -281,6 +455,15 @@ if __name__ == "__main__":
         search_alg=search_alg,
         scheduler=scheduler,
         storage_path=str(tune_dir),
+        name=args.name,
+        resume=False if args.restart else "AUTO",
+        checkpoint_config=CheckpointConfig(
+            num_to_keep=2,
+            checkpoint_score_attribute="val_acc",
+            checkpoint_score_order="max",
+        ),
+        stop=StopFileStopper(tune_dir / args.name),
+        callbacks=[ResultsStoreCallback(tune_dir / args.name)],
         verbose=1,
     )
 
@@ -0,0 +1,162 @@
+"""Batched tensor augmentations for uint8 NCHW image batches.
+
+Each op transforms a whole minibatch with a handful of tensor operations
+instead of running per-image PIL transforms in dataloader workers. Geometric
+ops keep the uint8 dtype; color jitter returns float pixels in [0, 255], which
+the loaders normalize without another conversion.
+"""
+
+from typing import Callable
+
+import torch
+
+BatchTransform = Callable[[torch.Tensor], torch.Tensor]
+
+
+def random_crop(batch: torch.Tensor, padding: int = 4) -> torch.Tensor:
+    """Randomly crop every image after zero-padding, like ``RandomCrop(size, padding)``.
+
+    Args:
+        batch: uint8 tensor of shape (N, C, H, W)
+        padding: Pixels of zero padding on each border
+
+    Returns:
+        Cropped batch with the original shape
+    """
+    n, c, h, w = batch.shape
+    padded = torch.nn.functional.pad(batch, (padding, padding, padding, padding))
+    padded_w = w + 2 * padding
+    off_y = torch.randint(0, 2 * padding + 1, (n, 1, 1))
+    off_x = torch.randint(0, 2 * padding + 1, (n, 1, 1))
+    # Flat index of every output pixel in the padded image, gathered in one call
+    rows = (off_y + torch.arange(h).view(1, h, 1)) * padded_w
+    cols = off_x + torch.arange(w).view(1, 1, w)
+    index = (rows + cols).view(n, 1, h * w).expand(n, c, h * w)
+    return padded.flatten(2).gather(2, index).view(n, c, h, w)
+
+
+def random_horizontal_flip(batch: torch.Tensor, p: float = 0.5) -> torch.Tensor:
+    """Mirror a random subset of the batch horizontally.
+
+    Args:
+        batch: Tensor of shape (N, C, H, W)
+        p: Probability of flipping each image
+
+    Returns:
+        Batch with the selected images flipped
+    """
+    flip = torch.rand(batch.shape[0]) < p
+    return torch.where(flip.view(-1, 1, 1, 1), batch.flip(3), batch)
+
+
+def _blend(images: torch.Tensor, other: torch.Tensor, factor: torch.Tensor) -> torch.Tensor:
+    """Blend two float batches with per-image factors, clamped to [0, 255]."""
+    return (other + factor.view(-1, 1, 1, 1) * (images - other)).clamp_(0, 255)
+
+
+def _grayscale(images: torch.Tensor) -> torch.Tensor:
+    """ITU-R 601-2 luma of a float RGB batch, shape (N, 1, H, W)."""
+    r, g, b = images.unbind(1)
+    return (0.299 * r + 0.587 * g + 0.114 * b).unsqueeze(1)
+
+
+# RGB <-> YIQ; hue shifts are rotations of the chroma (I, Q) plane
+_RGB_TO_YIQ = torch.tensor([[0.299, 0.587, 0.114], [0.596, -0.274, -0.322], [0.211, -0.523, 0.312]])
+_YIQ_TO_RGB = torch.linalg.inv(_RGB_TO_YIQ)
+
+
+def _hue_rotation(shift: torch.Tensor) -> torch.Tensor:
+    """Per-image 3x3 RGB matrices rotating hue by ``shift`` turns."""
+    angle = shift * 2 * torch.pi
+    cos, sin = torch.cos(angle), torch.sin(angle)
+    rotation = torch.zeros(shift.shape[0], 3, 3)
+    rotation[:, 0, 0] = 1.0
+    rotation[:, 1, 1], rotation[:, 1, 2] = cos, -sin
+    rotation[:, 2, 1], rotation[:, 2, 2] = sin, cos
+    return _YIQ_TO_RGB @ rotation @ _RGB_TO_YIQ
+
+
+def _factors(n: int, strength: float) -> torch.Tensor:
+    """Per-image factors drawn uniformly from [1 - strength, 1 + strength]."""
+    return torch.empty(n).uniform_(max(0.0, 1 - strength), 1 + strength)
+
+
+def color_jitter(
+    batch: torch.Tensor,
+    brightness: float = 0.2,
+    contrast: float = 0.2,
+    saturation: float = 0.2,
+    hue: float = 0.1,
+) -> torch.Tensor:
+    """Randomly jitter brightness, contrast, saturation and hue per image.
+
+    Follows ``transforms.ColorJitter`` with the adjustments applied in a fixed
+    order rather than a per-image random permutation. Hue is rotated in YIQ
+    space, a linear approximation of the HSV shift that costs one batched
+    matrix multiply.
+
+    Args:
+        batch: uint8 or float tensor of shape (N, 3, H, W) with values in [0, 255]
+        brightness: Maximum relative brightness change
+        contrast: Maximum relative contrast change
+        saturation: Maximum relative saturation change
+        hue: Maximum hue shift, as a fraction of the color wheel (<= 0.5)
+
+    Returns:
+        Float batch with values in [0, 255]
+    """
+    n = batch.shape[0]
+    images = batch.float()
+    if brightness:
+        images = _blend(images, torch.zeros_like(images), _factors(n, brightness))
+    if contrast:
+        mean = _grayscale(images).mean((1, 2, 3), keepdim=True)
+        images = _blend(images, mean.expand_as(images), _factors(n, contrast))
+    if saturation:
+        images = _blend(images, _grayscale(images).expand_as(images), _factors(n, saturation))
+    if hue:
+        matrices = _hue_rotation(torch.empty(n).uniform_(-hue, hue))
+        images = (matrices @ images.flatten(2)).view_as(images).clamp_(0, 255)
+    return images
+
+
+def compose(*ops: BatchTransform) -> BatchTransform:
+    """Chain batch transforms into one callable."""
+
+    def apply(batch: torch.Tensor) -> torch.Tensor:
+        for op in ops:
+            batch = op(batch)
+        return batch
+
+    return apply
+
+
+# Batched equivalents of the presets in hypertune.get_data_with_augmentation
+PRESETS: dict[str, BatchTransform | None] = {
+    "none": None,
+    "light": random_horizontal_flip,
+    "medium": compose(random_crop, random_horizontal_flip),
+    "strong": compose(random_crop, random_horizontal_flip, color_jitter),
+}
+
+
+def get_batch_augmentation(
+    name: str, extra_presets: dict[str, BatchTransform | None] | None = None
+) -> BatchTransform | None:
+    """Look up a batched augmentation preset by name.
+
+    Custom presets are passed in rather than registered in :data:`PRESETS`, so
+    that they reach Ray worker processes with the trainable (for example via
+    ``tune.with_parameters(tune_model, extra_presets=...)``).
+
+    Args:
+        name: Preset name
+        extra_presets: Additional presets by name, taking precedence
+
+    Returns:
+        Batch transform, or None for no augmentation
+    """
+    presets = {**PRESETS, **(extra_presets or {})}
+    if name not in presets:
+        raise ValueError(f"Unknown augmentation: {name}")
+    return presets[name]
@@ -0,0 +1,88 @@
+"""Trial checkpoints for Ray Tune: model, optimizer and LR scheduler state.
+
+Checkpoints let ASHA pause and resume trials, let PBT clone promising trials
+into worse ones and let an interrupted sweep continue from ``logs/ray``.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import ray
+import torch
+from ray.train import Checkpoint
+
+STATE_FILE = "state.pt"
+
+
+def report_with_checkpoint(
+    metrics: dict[str, Any],
+    epoch: int,
+    model: torch.nn.Module,
+    optimizer: torch.optim.Optimizer,
+    scheduler: Any,
+    learning_rate: float,
+):
+    """Report metrics to Ray together with a checkpoint of the training state.
+
+    Args:
+        metrics: Metrics for this epoch
+        epoch: Number of completed epochs
+        model: Model being trained
+        optimizer: Its optimizer
+        scheduler: Its learning rate scheduler
+        learning_rate: Configured base learning rate of the trial
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        torch.save(
+            {
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "learning_rate": learning_rate,
+                "metrics": metrics,
+            },
+            Path(tmp) / STATE_FILE,
+        )
+        ray.train.report(metrics, checkpoint=Checkpoint.from_directory(tmp))
+
+
+def restore_from_checkpoint(
+    model: torch.nn.Module,
+    optimizer: torch.optim.Optimizer,
+    scheduler: Any,
+    learning_rate: float,
+) -> tuple[int, dict[str, Any]]:
+    """Restore training state from the trial's latest checkpoint, if any.
+
+    Args:
+        model: Freshly built model to load weights into
+        optimizer: Its optimizer
+        scheduler: Its learning rate scheduler
+        learning_rate: Configured base learning rate; when PBT mutated it
+            after exploiting another trial, the restored rates are rescaled
+
+    Returns:
+        Tuple of (epochs already completed, metrics last reported), which is
+        (0, {}) without a checkpoint
+    """
+    checkpoint = ray.train.get_checkpoint()
+    if checkpoint is None:
+        return 0, {}
+
+    with checkpoint.as_directory() as directory:
+        state = torch.load(Path(directory) / STATE_FILE, map_location="cpu")
+
+    model.load_state_dict(state["model"])
+    optimizer.load_state_dict(state["optimizer"])
+    scheduler.load_state_dict(state["scheduler"])
+
+    # Keep the schedule's progress but move it to the mutated base rate
+    ratio = learning_rate / state["learning_rate"]
+    if ratio != 1.0:
+        for group in optimizer.param_groups:
+            group["lr"] *= ratio
+        if hasattr(scheduler, "base_lrs"):
+            scheduler.base_lrs = [lr * ratio for lr in scheduler.base_lrs]
+    return state["epoch"], state.get("metrics", {})
@@ -0,0 +1,167 @@
+"""In-memory CIFAR-10 cache shared across Ray Tune trials.
+
+The raw CIFAR-10 arrays are read once in the driver as uint8 NCHW numpy arrays
+(no PIL decoding) and passed to trials through ``tune.with_parameters``. Ray
+stores numpy arrays in the shared-memory object store, so every trial on a node
+maps the same 180 MB buffer zero-copy instead of loading its own dataset.
+Normalization and augmentation run per minibatch as tensor ops.
+"""
+
+import copy
+import warnings
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import torch
+from filelock import FileLock
+from torch.utils.data import Subset, TensorDataset
+
+from src.augment import BatchTransform, get_batch_augmentation
+
+# Normalization used by get_data and by get_data_with_augmentation respectively
+SIMPLE_STATS = ((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
+CIFAR10_STATS = ((0.4914, 0.4822, 0.4465), (0.2023, 0.1994, 0.2010))
+
+
+def load_cifar10_arrays(data_dir: Path) -> dict[str, np.ndarray]:
+    """Load CIFAR-10 as uint8 NCHW arrays, downloading it if needed.
+
+    Args:
+        data_dir: Path to data directory
+
+    Returns:
+        Dictionary with train/val images (N, 3, 32, 32) and int64 labels
+    """
+    from torchvision import datasets
+
+    with FileLock(data_dir / ".lock"):
+        train = datasets.CIFAR10(root=data_dir, train=True, download=True)
+        val = datasets.CIFAR10(root=data_dir, train=False, download=True)
+
+    return {
+        "train_images": np.ascontiguousarray(train.data.transpose(0, 3, 1, 2)),
+        "train_labels": np.asarray(train.targets, dtype=np.int64),
+        "val_images": np.ascontiguousarray(val.data.transpose(0, 3, 1, 2)),
+        "val_labels": np.asarray(val.targets, dtype=np.int64),
+    }
+
+
+def _as_tensor(array: np.ndarray) -> torch.Tensor:
+    """Wrap a (possibly read-only, shared-memory) array without copying."""
+    with warnings.catch_warnings():
+        # Object store arrays are read-only; batches are always copied on indexing
+        warnings.filterwarnings("ignore", message=".*not writable.*")
+        return torch.from_numpy(array)
+
+
+class TensorBatchLoader:
+    """DataLoader replacement that batches straight from uint8 tensors.
+
+    Batches are gathered by index, augmented as a whole and normalized with a
+    single fused multiply-add, so no worker processes are needed.
+    """
+
+    def __init__(
+        self,
+        images: np.ndarray | torch.Tensor,
+        labels: np.ndarray | torch.Tensor,
+        batch_size: int = 32,
+        shuffle: bool = False,
+        stats: tuple[tuple[float, ...], tuple[float, ...]] = CIFAR10_STATS,
+        augment: BatchTransform | None = None,
+    ):
+        """Initialize the loader.
+
+        Args:
+            images: uint8 images of shape (N, C, H, W)
+            labels: Integer class labels of shape (N,)
+            batch_size: Batch size
+            shuffle: Reshuffle the order every epoch
+            stats: Per-channel (mean, std) used for normalization
+            augment: Optional batch transform applied to uint8 batches
+        """
+        self.images = images if torch.is_tensor(images) else _as_tensor(images)
+        self.labels = labels if torch.is_tensor(labels) else _as_tensor(labels)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augment = augment
+        self.indices: torch.Tensor | None = None
+        self.dataset = TensorDataset(self.images, self.labels)
+
+        # (x / 255 - mean) / std == x * scale + shift
+        mean = torch.tensor(stats[0]).view(1, -1, 1, 1)
+        std = torch.tensor(stats[1]).view(1, -1, 1, 1)
+        self._scale = 1.0 / (255.0 * std)
+        self._shift = -mean / std
+
+    def __len__(self) -> int:
+        return (len(self.dataset) + self.batch_size - 1) // self.batch_size
+
+    def subset(self, indices: np.ndarray | torch.Tensor) -> "TensorBatchLoader":
+        """Return a loader over a subset of rows sharing the same tensors.
+
+        Args:
+            indices: Row indices into the full arrays
+
+        Returns:
+            New loader with the same batch size, augmentation and normalization
+        """
+        loader = copy.copy(self)
+        loader.indices = torch.as_tensor(indices, dtype=torch.long)
+        loader.dataset = Subset(TensorDataset(self.images, self.labels), loader.indices.tolist())
+        return loader
+
+    def __iter__(self) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        n = len(self.dataset)
+        order = self.indices
+        if self.shuffle:
+            perm = torch.randperm(n)
+            order = perm if order is None else order[perm]
+        for start in range(0, n, self.batch_size):
+            if order is None:
+                idx = slice(start, start + self.batch_size)
+            else:
+                idx = order[start : start + self.batch_size]
+            images = self.images[idx]
+            if self.augment is not None:
+                images = self.augment(images)
+            images = torch.addcmul(self._shift, images.float(), self._scale)
+            yield images, self.labels[idx]
+
+
+def get_cached_loaders(
+    data: dict[str, np.ndarray],
+    augmentation: str = "none",
+    batch_size: int = 32,
+    stats: tuple[tuple[float, ...], tuple[float, ...]] = CIFAR10_STATS,
+    extra_presets: dict[str, BatchTransform | None] | None = None,
+) -> tuple[TensorBatchLoader, TensorBatchLoader]:
+    """Build train and validation loaders over the shared arrays.
+
+    Args:
+        data: Arrays from :func:`load_cifar10_arrays`
+        augmentation: Batched augmentation preset for training
+        batch_size: Batch size
+        stats: Per-channel (mean, std) used for normalization
+        extra_presets: Custom batched presets by name, besides src.augment.PRESETS
+
+    Returns:
+        train_loader, val_loader
+    """
+    train_loader = TensorBatchLoader(
+        data["train_images"],
+        data["train_labels"],
+        batch_size=batch_size,
+        shuffle=True,
+        stats=stats,
+        augment=get_batch_augmentation(augmentation, extra_presets),
+    )
+    val_loader = TensorBatchLoader(
+        data["val_images"],
+        data["val_labels"],
+        batch_size=batch_size,
+        shuffle=False,
+        stats=stats,
+    )
+    return train_loader, val_loader
@@ -0,0 +1,128 @@
+"""Multi-fidelity schedule for cheap early evaluation of trials.
+
+Until a trial has survived the first ASHA rung it trains on a fraction of the
+training set per iteration and validates on a fixed stratified subsample of
+the validation set. Progress is reported as ``samples_seen`` so the scheduler
+compares trials by the data they actually consumed, not by iterations of
+different sizes.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from torch.utils.data import DataLoader, RandomSampler, Subset
+
+from src.datacache import TensorBatchLoader
+
+
+@dataclass(frozen=True)
+class FidelitySchedule:
+    """When and how much to subsample before a trial reaches full fidelity.
+
+    Attributes:
+        rung_samples: samples_seen of the first scheduler rung; trials past it
+            train and validate on the full data
+        train_fraction: Share of the training set used per early iteration
+        val_fraction: Share of the validation set used for early validation
+        seed: Seed for the fixed validation subsample
+    """
+
+    rung_samples: int
+    train_fraction: float = 0.5
+    val_fraction: float = 0.2
+    seed: int = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FidelitySchedule | None":
+        """Build a schedule from trial config keys, or None for full fidelity."""
+        if not config.get("fidelity_rung_samples"):
+            return None
+        return cls(
+            rung_samples=int(config["fidelity_rung_samples"]),
+            train_fraction=config.get("fidelity_train_fraction", 0.5),
+            val_fraction=config.get("fidelity_val_fraction", 0.2),
+        )
+
+    def is_early(self, samples_seen: int) -> bool:
+        """Whether a trial has not yet survived the first rung."""
+        return samples_seen < self.rung_samples
+
+
+def stratified_indices(labels: np.ndarray, fraction: float, seed: int = 0) -> np.ndarray:
+    """Sample the same share of every class.
+
+    Args:
+        labels: Class label of every row
+        fraction: Share of each class to keep
+        seed: Random seed
+
+    Returns:
+        Sorted row indices of the subsample
+    """
+    rng = np.random.default_rng(seed)
+    picked = []
+    for cls in np.unique(labels):
+        rows = np.flatnonzero(labels == cls)
+        keep = max(1, round(len(rows) * fraction))
+        picked.append(rng.choice(rows, size=keep, replace=False))
+    return np.sort(np.concatenate(picked))
+
+
+def _labels(loader) -> np.ndarray:
+    """Class labels of the dataset behind a loader."""
+    if isinstance(loader, TensorBatchLoader):
+        return loader.labels.numpy()
+    return np.asarray(loader.dataset.targets)
+
+
+def subsample_loader(loader, fraction: float, seed: int = 0):
+    """Restrict a loader to a stratified subsample of its dataset.
+
+    Args:
+        loader: TensorBatchLoader or torchvision DataLoader
+        fraction: Share of each class to keep (1.0 returns ``loader``)
+        seed: Random seed for the subsample
+
+    Returns:
+        Loader of the same kind over the subsample
+    """
+    if fraction >= 1.0:
+        return loader
+    indices = stratified_indices(_labels(loader), fraction, seed)
+    if isinstance(loader, TensorBatchLoader):
+        return loader.subset(indices)
+    return DataLoader(
+        Subset(loader.dataset, indices.tolist()),
+        batch_size=loader.batch_size,
+        shuffle=isinstance(loader.sampler, RandomSampler),
+        num_workers=loader.num_workers,
+        pin_memory=loader.pin_memory,
+    )
+
+
+def fidelity_loaders(
+    schedule: FidelitySchedule | None,
+    samples_seen: int,
+    iteration: int,
+    train_loader,
+    val_loader,
+):
+    """Pick the train and validation loaders for the next iteration.
+
+    Args:
+        schedule: Fidelity schedule, or None to always use full data
+        samples_seen: Training samples consumed so far
+        iteration: Iteration number, seeds a fresh training subsample
+        train_loader: Full training loader
+        val_loader: Full validation loader
+
+    Returns:
+        Tuple of (train loader, val loader, val fraction used)
+    """
+    if schedule is None or not schedule.is_early(samples_seen):
+        return train_loader, val_loader, 1.0
+    return (
+        subsample_loader(train_loader, schedule.train_fraction, seed=iteration),
+        subsample_loader(val_loader, schedule.val_fraction, seed=schedule.seed),
+        schedule.val_fraction,
+    )
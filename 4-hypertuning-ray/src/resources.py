@@ -0,0 +1,95 @@
+"""Per-trial CPU budgets for Ray Tune sweeps on a single many-core machine.
+
+Trials are sized by model capacity: small CNNs get a fraction of a core so
+several pack onto one, larger ones get more cores for intra-op parallelism.
+Inside a trial the CPU budget is split between torch threads and dataloader
+workers so the two never oversubscribe the cores Ray reserved.
+"""
+
+import math
+import os
+from typing import Callable
+
+import torch
+
+# (max total params, CPUs per trial); the last tier catches everything larger
+CPU_TIERS: list[tuple[float, float]] = [
+    (50_000, 0.5),
+    (250_000, 1.0),
+    (1_000_000, 2.0),
+    (math.inf, 4.0),
+]
+
+
+def cpus_for_params(total_params: int, max_cpus: float | None = None) -> float:
+    """Pick the CPU budget of a trial from its model size.
+
+    Args:
+        total_params: Trainable parameters of the trial's model
+        max_cpus: Upper bound, e.g. the machine's core count
+
+    Returns:
+        Number of (possibly fractional) CPUs to reserve
+    """
+    cpus = next(c for limit, c in CPU_TIERS if total_params <= limit)
+    return min(cpus, max_cpus or os.cpu_count() or 1)
+
+
+def make_trial_resources(
+    count_params: Callable[[dict], int], max_cpus: float | None = None
+) -> Callable[[dict], dict]:
+    """Build a resource callable for ``tune.with_resources``.
+
+    Args:
+        count_params: Returns the parameter count of the model a config builds
+        max_cpus: Upper bound on CPUs for a single trial
+
+    Returns:
+        Function mapping a resolved trial config to its resource request
+    """
+
+    def trial_resources(config: dict) -> dict:
+        return {"cpu": cpus_for_params(count_params(config), max_cpus)}
+
+    return trial_resources
+
+
+def split_cpu_budget(cpus: float, uses_workers: bool) -> tuple[int, int]:
+    """Split a trial's CPU budget into torch threads and dataloader workers.
+
+    Args:
+        cpus: CPUs reserved for the trial
+        uses_workers: Whether the data pipeline runs in worker processes
+
+    Returns:
+        Tuple of (torch threads, dataloader workers)
+    """
+    cores = max(1, int(cpus))
+    if not uses_workers or cores < 2:
+        return cores, 0
+    workers = min(2, cores // 2)
+    return cores - workers, workers
+
+
+def assigned_cpus(default: float = 1.0) -> float:
+    """CPUs Ray assigned to the current trial (``default`` outside Ray)."""
+    try:
+        import ray
+
+        return ray.get_runtime_context().get_assigned_resources().get("CPU", default)
+    except Exception:
+        return default
+
+
+def configure_trial_threads(uses_workers: bool) -> int:
+    """Pin torch threads to the trial's CPU budget.
+
+    Args:
+        uses_workers: Whether the data pipeline runs in worker processes
+
+    Returns:
+        Number of dataloader workers that fit in the remaining budget
+    """
+    threads, workers = split_cpu_budget(assigned_cpus(), uses_workers)
+    torch.set_num_threads(threads)
+    return workers
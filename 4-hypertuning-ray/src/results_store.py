@@ -0,0 +1,176 @@
+"""Columnar store of Ray Tune trial results, readable without Ray.
+
+Ray appends one JSON line per reported iteration to each trial's
+``result.json``. The exporter reads only the bytes appended since its last run,
+flattens the trial config into typed ``config/<name>`` columns and rewrites
+``results.parquet`` in the experiment directory. Analysis code then reads just
+the columns and rows it needs with pyarrow. The sweep driver and analysis
+scripts can export at the same time; a lock file serializes them.
+
+    python -m src.results_store logs/ray/cifar10_tune
+"""
+
+import fcntl
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+STORE_FILE = "results.parquet"
+OFFSETS_FILE = "results.offsets.json"
+LOCK_FILE = "results.lock"
+RESULT_FILE = "result.json"
+
+# Bookkeeping fields Ray adds to every result that analysis never needs
+SKIPPED_FIELDS = {"config", "hostname", "node_ip", "pid", "date", "checkpoint_dir_name"}
+
+
+def flatten_result(result: dict[str, Any], trial_name: str) -> dict[str, Any]:
+    """Turn one Ray result line into a flat row.
+
+    Args:
+        result: Decoded line of a trial's result.json
+        trial_name: Name of the trial directory
+
+    Returns:
+        Row with scalar metrics and ``config/<name>`` columns
+    """
+    row = {"trial_name": trial_name}
+    for key, value in result.items():
+        if key not in SKIPPED_FIELDS and not isinstance(value, (dict, list)):
+            row[key] = value
+    for key, value in result.get("config", {}).items():
+        if not isinstance(value, (dict, list)):
+            row[f"config/{key}"] = value
+    return row
+
+
+def read_new_rows(experiment_dir: Path, offsets: dict[str, int]) -> Iterator[dict[str, Any]]:
+    """Yield rows appended to any trial's result.json since ``offsets``.
+
+    ``offsets`` maps trial directory names to the byte offset already read and
+    is updated in place. Incomplete trailing lines are left for the next call.
+
+    Args:
+        experiment_dir: Ray Tune experiment directory
+        offsets: Byte offsets per trial, updated in place
+
+    Yields:
+        Flattened result rows
+    """
+    for result_file in sorted(experiment_dir.glob(f"*/{RESULT_FILE}")):
+        trial_name = result_file.parent.name
+        start = offsets.get(trial_name, 0)
+        if result_file.stat().st_size <= start:
+            continue
+        with result_file.open("rb") as file:
+            file.seek(start)
+            chunk = file.read()
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                yield flatten_result(json.loads(line), trial_name)
+        offsets[trial_name] = start + end
+
+
+def update_results_store(experiment_dir: Path | str) -> Path:
+    """Append newly reported results of an experiment to its Parquet file.
+
+    Args:
+        experiment_dir: Ray Tune experiment directory
+
+    Returns:
+        Path to the Parquet file
+    """
+    experiment_dir = Path(experiment_dir)
+    store = experiment_dir / STORE_FILE
+    offsets_path = experiment_dir / OFFSETS_FILE
+    if not experiment_dir.is_dir():
+        return store
+
+    # The store and its offsets must change together; the lock is released
+    # when the file is closed
+    with (experiment_dir / LOCK_FILE).open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        offsets = json.loads(offsets_path.read_text()) if offsets_path.exists() else {}
+        if not store.exists():
+            offsets = {}
+        rows = list(read_new_rows(experiment_dir, offsets))
+        if not rows:
+            return store
+
+        # Columns from all rows: from_pylist would take them from the first row only
+        columns = dict.fromkeys(key for row in rows for key in row)
+        table = pa.Table.from_pydict({key: [row.get(key) for row in rows] for key in columns})
+        if store.exists():
+            table = pa.concat_tables([pq.read_table(store), table], promote_options="permissive")
+
+        # Write to a temporary file first so readers never see a partial file
+        tmp = experiment_dir / f"{STORE_FILE}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, store)
+        offsets_path.write_text(json.dumps(offsets))
+    return store
+
+
+def read_results(
+    experiment_dir: Path | str,
+    columns: list[str] | None = None,
+    filters: Any = None,
+) -> pa.Table:
+    """Read (a projection of) an experiment's results, exporting new rows first.
+
+    Args:
+        experiment_dir: Ray Tune experiment directory
+        columns: Columns to read (all when None)
+        filters: pyarrow filter expression or DNF list applied while reading
+
+    Returns:
+        Arrow table of result rows
+    """
+    store = update_results_store(experiment_dir)
+    if not store.exists():
+        raise ValueError(f"No trial results found in {experiment_dir}")
+    return pq.read_table(store, columns=columns, filters=filters)
+
+
+def final_results(experiment_dir: Path | str, columns: list[str] | None = None) -> pa.Table:
+    """Last reported row of every trial.
+
+    Args:
+        experiment_dir: Ray Tune experiment directory
+        columns: Extra columns to include besides trial_name and training_iteration
+
+    Returns:
+        Arrow table with one row per trial
+    """
+    keys = ["trial_name", "training_iteration"]
+    wanted = None if columns is None else list(dict.fromkeys(keys + columns))
+    table = read_results(experiment_dir, columns=wanted)
+    last = table.group_by("trial_name").aggregate([("training_iteration", "max")])
+    last = last.rename_columns(["trial_name", "training_iteration"])
+    return table.join(last, keys=keys, join_type="inner")
+
+
+def max_iteration(experiment_dir: Path | str) -> int:
+    """Highest training_iteration reported by any trial."""
+    table = read_results(experiment_dir, columns=["training_iteration"])
+    return pc.max(table["training_iteration"]).as_py()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export Ray Tune results to Parquet")
+    parser.add_argument("experiment_dir", type=Path, help="Ray Tune experiment directory")
+
+    args = parser.parse_args()
+
+    path = update_results_store(args.experiment_dir)
+    rows = pq.ParquetFile(path).metadata.num_rows if path.exists() else 0
+    print(f"{path}: {rows} rows")
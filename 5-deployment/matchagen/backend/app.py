@@ -1,14 +1,48 @@
 """FastAPI backend for matcha recipe generator."""
 
+import os
+import secrets
+import tempfile
+import time
+import uuid
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
+from loguru import logger
+from pydantic import BaseModel, Field
 
 from matchagen import RecipeGenerator
+from matchagen.admission import AdmissionController, DeadlineExceeded, Overloaded
+from matchagen.compilation import LENGTH_BUCKET, warm_up
+from matchagen.custom_logger import sample_request
+from matchagen.metrics import (
+    CONTENT_TYPE,
+    HTTP_REQUEST_SECONDS,
+    clear_snapshots,
+    render_metrics,
+    share_metrics,
+)
+from matchagen.profiling import Profiler
+from matchagen.recipe import Recipe
+from matchagen.recipe_cache import RecipeCache, recipe_id
+from matchagen.serving import (
+    apply_serving_config,
+    claim_worker_slot,
+    load_serving_config,
+    tune_and_save,
+)
+from matchagen.variants import VariantCache
+from utils import render_recipe_html
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # pragma: no cover - optional dependency
+    FastJSONResponse = JSONResponse
 
 app = FastAPI(title="Matcha Recipe Generator", version="0.1.0")
 
@@ -21,39 +55,140 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Record the latency of every request by route and status code."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            path=route.path if route else "unmatched",
+            status=status,
+        )
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag all log records of a request with its correlation ID.
+
+    An incoming X-Request-ID header is reused, otherwise a new ID is made. The
+    ID is returned in the X-Request-ID response header.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    with logger.contextualize(request_id=request_id, sampled=sample_request()):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # Global model instance
 model: RecipeGenerator | None = None
 
+# Variants generated per decode and handed out to repeated requests (1 disables)
+NUM_VARIANTS = int(os.getenv("MATCHAGEN_VARIANTS", "3"))
+variant_cache: VariantCache | None = None
+
+# Decode slots, priority lane and token budget, see matchagen.admission
+admission = AdmissionController.from_env()
+DEADLINE_MS = int(os.getenv("MATCHAGEN_DEADLINE_MS", "30000"))
+
+# Seeded recipes by content hash, for retries and shared links
+recipe_cache = RecipeCache.from_env()
+
+# Sampling profiler, off unless MATCHAGEN_PROFILE_RATE > 0
+profiler = Profiler.from_env()
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("MATCHAGEN_ADMIN_TOKEN", "")
+
 
 class GenerateRequest(BaseModel):
     """Request model for recipe generation."""
 
     temperature: float = 0.8
     inspiration: str = ""  # Comma-separated ingredients
-    max_length: int = 512
+    max_length: int = Field(default=512, ge=1)  # Capped by load
+    deadline_ms: int | None = Field(default=None, gt=0)  # Default DEADLINE_MS
+    seed: int | None = Field(default=None, ge=0)  # Reproducible recipe if set
 
 
-@app.on_event("startup")
-async def load_model():
-    """Load the trained model on startup."""
-    global model
+# Response formats of recipe endpoints, JSON unless ?format=html
+RESPONSE_FORMAT = Query(default="json", alias="format", pattern="^(json|html)$")
+
+
+class ProfilingSettings(BaseModel):
+    """Runtime profiling settings."""
+
+    rate: float = Field(ge=0.0, le=1.0)
+
+
+def is_admin(token: str | None) -> bool:
+    """Check an admin token in constant time."""
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(token or "", ADMIN_TOKEN)
 
-    # Try multiple possible paths for model
+
+async def require_admin(x_admin_token: str | None = Header(default=None)):
+    """Reject requests without the admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def find_model_path() -> Path | None:
+    """First existing model directory out of the known locations.
+
+    A trimmed artefact written by ``python -m matchagen.vocab`` is preferred.
+    """
     model_paths = [
+        Path("artefacts/matcha-model-trimmed"),
         Path("artefacts/matcha-model"),
         Path("../artefacts/matcha-model"),
         Path("/app/artefacts/matcha-model"),
     ]
+    return next((p for p in model_paths if p.exists()), None)
 
-    for model_path in model_paths:
-        if model_path.exists():
-            print(f"Loading model from {model_path}")
-            model = RecipeGenerator(str(model_path))
-            print("Model loaded successfully!")
-            return
 
-    print("WARNING: Model not found. Please train the model first.")
-    print("Run: python src/matchagen/main.py")
+@app.on_event("startup")
+async def load_model():
+    """Load the trained model on startup."""
+    global model, variant_cache
+
+    # Workers of a multi-worker server add up their metrics in /metrics
+    metrics_dir = os.getenv("MATCHAGEN_METRICS_DIR")
+    if metrics_dir:
+        interval = float(os.getenv("MATCHAGEN_METRICS_INTERVAL", "5"))
+        share_metrics(metrics_dir, interval)
+
+    # Threads and CPU pinning must be set before the model runs
+    serving = load_serving_config()
+    if serving is not None:
+        apply_serving_config(serving, claim_worker_slot(serving.workers))
+
+    model_path = find_model_path()
+    if model_path is not None:
+        logger.info(f"Loading model from {model_path}")
+        model = RecipeGenerator(str(model_path))
+        logger.info("Model loaded successfully!")
+        if NUM_VARIANTS > 1:
+            variant_cache = VariantCache(model, n=NUM_VARIANTS)
+        if model.compiled:
+            # Compile every cache length a request can get before serving:
+            # seeded requests decode one recipe, variant fills NUM_VARIANTS
+            lengths = range(LENGTH_BUCKET, admission.max_length + 1, LENGTH_BUCKET)
+            num_sequences = (1, NUM_VARIANTS) if variant_cache else (1,)
+            warm_up(model, [*lengths, admission.max_length], num_sequences)
+        return
+
+    logger.warning("Model not found. Please train the model first.")
+    logger.warning("Run: python src/matchagen/main.py")
 
 
 @app.get("/")
@@ -64,20 +199,30 @@ async def root():
         "version": "0.1.0",
         "endpoints": {
             "generate": "POST /generate",
+            "recipe": "GET /recipes/{recipe_id}",
             "health": "GET /health",
+            "metrics": "GET /metrics",
         },
     }
 
 
 @app.post("/generate")
-async def generate_recipe(request: GenerateRequest):
+async def generate_recipe(
+    request: GenerateRequest,
+    response_format: str = RESPONSE_FORMAT,
+    x_profile: str | None = Header(default=None),
+    x_admin_token: str | None = Header(default=None),
+):
     """Generate a new matcha recipe.
 
     Args:
         request: Generation parameters
+        response_format: "json", or "html" for a rendered fragment
+        x_profile: "1" to profile this request (requires the admin token)
+        x_admin_token: Admin token
 
     Returns:
-        JSON with generated recipe
+        JSON with the structured recipe and its plain text
     """
     if model is None:
         raise HTTPException(
@@ -85,25 +230,124 @@ async def generate_recipe(request: GenerateRequest):
             detail="Model not loaded. Please train model first.",
         )
 
-    try:
-        # Generate recipe
-        recipe_text = model.generate(
+    force_profile = x_profile == "1" and is_admin(x_admin_token)
+    deadline = time.monotonic() + (request.deadline_ms or DEADLINE_MS) / 1000
+
+    seeded = request.seed is not None
+    key = None
+    recipe = None
+    if seeded:
+        # Seeded output must not depend on load, so the budget is fixed
+        max_length = min(request.max_length, admission.max_length)
+        key = recipe_id(
+            request.inspiration,
+            request.seed,
+            request.temperature,
+            max_length,
+            fingerprint=model.fingerprint,
+            compiled=model.compiled,
+        )
+        cached = recipe_cache.get(key)
+        if cached is not None:
+            recipe = Recipe(**cached["recipe"])
+    elif variant_cache is not None:
+        # Repeated ingredients are served from memory without taking a slot,
+        # as long as the variant was decoded within the requested budget
+        recipe = variant_cache.pop(
+            request.inspiration,
+            request.temperature,
+            min(request.max_length, admission.max_length),
+        )
+
+    if recipe is None:
+        try:
+            async with admission.admit(
+                request.max_length, deadline, fixed_budget=seeded
+            ) as max_length:
+                recipe = await run_in_threadpool(
+                    run_generation, request, max_length, deadline, force_profile
+                )
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except Exception as e:
+            error_msg = f"Generation failed: {str(e)}"
+            raise HTTPException(status_code=500, detail=error_msg)
+
+        if seeded:
+            recipe_cache.put(
+                key,
+                {
+                    "recipe": recipe.to_dict(),
+                    "temperature": request.temperature,
+                    "inspiration": request.inspiration,
+                    "seed": request.seed,
+                    "max_length": max_length,
+                },
+            )
+
+    return recipe_response(
+        recipe,
+        response_format,
+        temperature=request.temperature,
+        inspiration=request.inspiration,
+        seed=request.seed,
+        recipe_id=key,
+    )
+
+
+def recipe_response(recipe: Recipe, response_format: str, **params) -> Response:
+    """Serialize a recipe with its generation parameters.
+
+    Args:
+        recipe: Generated recipe
+        response_format: "json", or "html" for a rendered fragment
+        **params: Generation parameters included in the JSON body
+
+    Returns:
+        JSON with the structured recipe, its plain text and ``params``, or
+        the recipe as HTML
+    """
+    if response_format == "html":
+        return HTMLResponse(render_recipe_html(recipe))
+    return FastJSONResponse(
+        {"recipe": recipe.to_dict(), "text": recipe.to_text(), **params}
+    )
+
+
+def run_generation(
+    request: GenerateRequest, max_length: int, deadline: float, force_profile: bool
+) -> Recipe:
+    """Generate a recipe on a worker thread, keeping the event loop free."""
+    with profiler.profile("generate", force=force_profile):
+        if variant_cache is not None and request.seed is None:
+            return variant_cache.fill(
+                request.inspiration, request.temperature, max_length, deadline
+            )
+        return model.generate(
             prompt=request.inspiration,
             temperature=request.temperature,
-            max_length=request.max_length,
+            max_length=max_length,
+            deadline=deadline,
+            seed=request.seed,
         )
 
-        return JSONResponse(
-            {
-                "recipe": recipe_text,
-                "temperature": request.temperature,
-                "inspiration": request.inspiration,
-            }
-        )
 
-    except Exception as e:
-        error_msg = f"Generation failed: {str(e)}"
-        raise HTTPException(status_code=500, detail=error_msg)
+@app.get("/recipes/{recipe_id}")
+async def get_recipe(recipe_id: str, response_format: str = RESPONSE_FORMAT):
+    """Seeded recipe by the ``recipe_id`` returned from ``/generate``."""
+    entry = recipe_cache.get(recipe_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    params = {k: v for k, v in entry.items() if k != "recipe"}
+    return recipe_response(
+        Recipe(**entry["recipe"]), response_format, **params, recipe_id=recipe_id
+    )
 
 
 @app.get("/health")
@@ -115,5 +359,51 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of request latency and generation stages."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_status():
+    """Current profiling settings and stored profiles."""
+    return {
+        "rate": profiler.rate,
+        "directory": str(profiler.directory),
+        "keep": profiler.keep,
+        "profiles": profiler.list_profiles(),
+    }
+
+
+@app.put("/admin/profiling", dependencies=[Depends(require_admin)])
+async def update_profiling(settings: ProfilingSettings):
+    """Change the fraction of profiled requests at runtime."""
+    profiler.rate = settings.rate
+    return {"rate": profiler.rate}
+
+
+@app.get("/admin/profiling/{name}", dependencies=[Depends(require_admin)])
+async def download_profile(name: str):
+    """Download a trace or folded-stack file."""
+    if name not in profiler.list_profiles():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(profiler.directory / name)
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serving = load_serving_config()
+    model_path = find_model_path()
+    if serving is None and model_path and os.getenv("MATCHAGEN_AUTOTUNE") == "1":
+        serving = tune_and_save(str(model_path))
+
+    if serving is not None and serving.workers > 1:
+        # Each worker would otherwise report only its own metrics
+        if not os.getenv("MATCHAGEN_METRICS_DIR"):
+            os.environ["MATCHAGEN_METRICS_DIR"] = tempfile.mkdtemp(
+                prefix="matchagen-metrics-"
+            )
+        clear_snapshots(os.environ["MATCHAGEN_METRICS_DIR"])
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=serving.workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
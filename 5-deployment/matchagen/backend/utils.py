@@ -1,59 +1,59 @@
 """Utility functions for backend processing."""
 
+import html
+from string import Template
+
+from matchagen.recipe import Recipe
+
+# Templates are parsed once at import; every value is escaped before it is
+# substituted, so generated text cannot inject markup
+RECIPE_TEMPLATE = Template("<h3>$title</h3>$ingredients$directions")
+SECTION_TEMPLATE = Template("<h4>$heading</h4><$tag>$items</$tag>")
+
+
+def _section(heading: str, tag: str, items: list[str]) -> str:
+    if not items:
+        return ""
+    return SECTION_TEMPLATE.substitute(
+        heading=heading,
+        tag=tag,
+        items="".join(f"<li>{html.escape(item)}</li>" for item in items),
+    )
+
+
+def render_recipe_html(recipe: Recipe) -> str:
+    """Render a recipe as an HTML fragment.
+
+    Args:
+        recipe: Structured recipe
+
+    Returns:
+        HTML with the title, an ingredient list and numbered directions
+    """
+    return RECIPE_TEMPLATE.substitute(
+        title=html.escape(recipe.title),
+        ingredients=_section("Ingredients:", "ul", recipe.ingredients),
+        directions=_section("Directions:", "ol", recipe.directions),
+    )
+
 
 def parse_recipe_text(text: str) -> dict:
     """Parse generated recipe text into structured components.
 
+    Only needed for recipe text from elsewhere; the generator already
+    returns a structured ``Recipe``.
+
     Args:
-        text: Raw generated recipe text
+        text: Recipe text as produced by ``Recipe.to_text``
 
     Returns:
         Dictionary with title, ingredients, and instructions
     """
-    lines = [line.strip() for line in text.split("\\n") if line.strip()]
-
-    if not lines:
-        return {
-            "title": "Matcha Recipe",
-            "ingredients": [],
-            "instructions": [],
-        }
-
-    title = lines[0] if lines else "Matcha Recipe"
-    ingredients = []
-    instructions = []
-
-    in_ingredients = False
-    in_instructions = False
-
-    for line in lines[1:]:
-        lower_line = line.lower()
-
-        # Check for section headers
-        if "ingredient" in lower_line:
-            in_ingredients = True
-            in_instructions = False
-            continue
-        if "instruction" in lower_line or "step" in lower_line:
-            in_instructions = True
-            in_ingredients = False
-            continue
-
-        # Parse ingredients
-        if in_ingredients and line.startswith("-"):
-            ingredients.append(line[1:].strip())
-
-        # Parse instructions
-        elif in_instructions and (line[0].isdigit() or line.startswith("-")):
-            # Remove numbering if present
-            instruction = line.lstrip("0123456789.-) ").strip()
-            if instruction:
-                instructions.append(instruction)
-
+    recipe = Recipe.from_text(text)
     return {
-        "title": title,
-        "ingredients": ingredients,
-        "instructions": instructions,
+        "title": recipe.title,
+        "ingredients": recipe.ingredients,
+        "instructions": recipe.directions,
     }
 
 
@@ -66,18 +66,10 @@ def format_recipe_html(recipe_dict: dict) -> str:
     Returns:
         HTML formatted recipe
     """
-    html = f"<h3>{recipe_dict['title']}</h3>"
-
-    if recipe_dict["ingredients"]:
-        html += "<h4>Ingredients:</h4><ul>"
-        for ingredient in recipe_dict["ingredients"]:
-            html += f"<li>{ingredient}</li>"
-        html += "</ul>"
-
-    if recipe_dict["instructions"]:
-        html += "<h4>Instructions:</h4><ol>"
-        for instruction in recipe_dict["instructions"]:
-            html += f"<li>{instruction}</li>"
-        html += "</ol>"
-
-    return html
+    return render_recipe_html(
+        Recipe(
+            title=recipe_dict["title"],
+            ingredients=recipe_dict["ingredients"],
+            directions=recipe_dict["instructions"],
+        )
+    )
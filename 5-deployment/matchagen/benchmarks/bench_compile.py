@@ -0,0 +1,155 @@
+"""Benchmark compiled against eager decoding of the recipe model.
+
+Runs the same prompts through an eager RecipeGenerator and one with compiled
+decoding (static KV cache), and reports warm-up time, median latency and the
+speed-up per token budget. The CPU architecture is part of the report, so
+runs on x86 and ARM hosts (such as the arm64 serving image) can be compared
+side by side with ``--output``.
+
+Usage:
+    python benchmarks/bench_compile.py [--model DIR] [--lengths 128,256]
+        [--repeat N] [--output results.json]
+"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+sys.path.insert(0, "src")  # noqa: E402
+
+from loguru import logger  # noqa: E402
+
+from matchagen.compilation import warm_up  # noqa: E402
+from matchagen.models import RecipeGenerator  # noqa: E402
+
+PROMPTS = [
+    "Oat Milk, Mango",
+    "Almond Milk, Vanilla Syrup, Collagen",
+    "Coconut Milk, Strawberry",
+    "Whole Milk, Honey, Cinnamon",
+]
+
+
+def time_generation(
+    generator: RecipeGenerator, max_length: int, num_sequences: int, repeat: int
+) -> list[float]:
+    """Latencies in ms of ``repeat`` generations cycling through the prompts."""
+    latencies = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        generator.generate_variants(
+            PROMPTS[i % len(PROMPTS)], n=num_sequences, max_length=max_length
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_mode(
+    model_path: str,
+    compiled: bool,
+    lengths: list[int],
+    num_sequences: int,
+    repeat: int,
+) -> dict:
+    """Warm up one generator and time it at every token budget."""
+    generator = RecipeGenerator(model_path, compile=compiled)
+    start = time.perf_counter()
+    if compiled:
+        warm_up(generator, lengths, (num_sequences,))
+    else:
+        generator.generate_variants(PROMPTS[0], n=num_sequences, max_length=64)
+    warmup_s = time.perf_counter() - start
+
+    results = {}
+    for length in lengths:
+        latencies = time_generation(generator, length, num_sequences, repeat)
+        results[length] = statistics.median(latencies)
+    return {
+        "compiled": generator.compiled,
+        "warmup_s": warmup_s,
+        "p50_ms": results,
+    }
+
+
+def main(
+    model_path: str,
+    lengths: list[int],
+    num_sequences: int,
+    repeat: int,
+    output: Path | None,
+):
+    """Benchmark both modes and print a comparison table."""
+    host = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "torch": torch.__version__,
+        "threads": torch.get_num_threads(),
+    }
+    logger.info(f"Benchmarking on {host}")
+
+    eager = run_mode(model_path, False, lengths, num_sequences, repeat)
+    compiled = run_mode(model_path, True, lengths, num_sequences, repeat)
+    if not compiled["compiled"]:
+        logger.warning("Compiled decoding fell back to eager, results are eager")
+
+    print(
+        f"\nHost: {host['machine']}, torch {host['torch']}, {host['threads']} threads"
+    )
+    print(
+        f"Warm-up: eager {eager['warmup_s']:.1f}s, compiled {compiled['warmup_s']:.1f}s"
+    )
+    print(f"{'tokens':>8}{'eager ms':>12}{'compiled ms':>14}{'speed-up':>10}")
+    for length, eager_ms in eager["p50_ms"].items():
+        compiled_ms = compiled["p50_ms"][length]
+        print(
+            f"{length:>8}{eager_ms:>12.1f}{compiled_ms:>14.1f}"
+            f"{eager_ms / compiled_ms:>9.2f}x"
+        )
+
+    if output:
+        output.write_text(
+            json.dumps(
+                {
+                    "host": host,
+                    "num_sequences": num_sequences,
+                    "eager": eager,
+                    "compiled": compiled,
+                },
+                indent=2,
+            )
+        )
+        logger.info(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compiled vs eager decoding")
+    parser.add_argument(
+        "--model", default="artefacts/matcha-model", help="Model directory"
+    )
+    parser.add_argument(
+        "--lengths", default="128,256,512", help="Comma-separated token budgets"
+    )
+    parser.add_argument(
+        "--num-sequences", type=int, default=1, help="Sequences per generate call"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed generations per budget"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+
+    args = parser.parse_args()
+
+    main(
+        model_path=args.model,
+        lengths=[int(n) for n in args.lengths.split(",")],
+        num_sequences=args.num_sequences,
+        repeat=args.repeat,
+        output=args.output,
+    )
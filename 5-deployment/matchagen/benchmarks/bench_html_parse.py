@@ -0,0 +1,92 @@
+"""Benchmark HTML recipe parsing backends over saved HTML fixtures.
+
+Usage:
+    python benchmarks/bench_html_parse.py [--fixtures DIR] [--repeat N]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, "src")  # noqa: E402
+
+from loguru import logger  # noqa: E402
+
+from matchagen.htmlparse import (  # noqa: E402
+    BACKEND,
+    parse_pages_parallel,
+    parse_recipe_html,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+
+
+def load_pages(fixtures_dir: Path, repeat: int) -> list[tuple[str, bytes]]:
+    """Load every ``*.html`` fixture and repeat the set ``repeat`` times.
+
+    Args:
+        fixtures_dir: Folder with saved HTML pages
+        repeat: How many copies of the fixture set to parse
+
+    Returns:
+        List of ``(url, html)`` pairs
+    """
+    paths = sorted(fixtures_dir.glob("*.html"))
+    if not paths:
+        raise SystemExit(f"No HTML fixtures found in {fixtures_dir}")
+    pages = [(p.resolve().as_uri(), p.read_bytes()) for p in paths]
+    return pages * repeat
+
+
+def run_serial(pages: list[tuple[str, bytes]], backend: str) -> tuple[float, int]:
+    """Parse pages one by one in this process with a given backend."""
+    start = time.perf_counter()
+    found = sum(
+        len(parse_recipe_html(html, url, backend=backend)["recipes"])
+        for url, html in pages
+    )
+    return time.perf_counter() - start, found
+
+
+def run_pool(pages: list[tuple[str, bytes]], workers: int) -> tuple[float, int]:
+    """Parse pages across a process pool with the default backend."""
+    start = time.perf_counter()
+    results = parse_pages_parallel(pages, max_workers=workers)
+    found = sum(len(r["recipes"]) for r in results)
+    return time.perf_counter() - start, found
+
+
+def main(fixtures_dir: Path, repeat: int, workers: int | None):
+    """Run all benchmark configurations and print a summary table."""
+    pages = load_pages(fixtures_dir, repeat)
+    logger.info(f"Parsing {len(pages)} pages (default backend: {BACKEND})")
+
+    rows = [("bs4 (baseline)", *run_serial(pages, "bs4"))]
+    if BACKEND != "bs4":
+        rows.append((f"{BACKEND} serial", *run_serial(pages, BACKEND)))
+    rows.append((f"{BACKEND} pool", *run_pool(pages, workers)))
+
+    baseline = rows[0][1]
+    print(f"{'config':<22}{'seconds':>10}{'pages/s':>12}{'speedup':>10}{'recipes':>10}")
+    for name, seconds, found in rows:
+        print(
+            f"{name:<22}{seconds:>10.3f}{len(pages) / seconds:>12.1f}"
+            f"{baseline / seconds:>9.1f}x{found:>10}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark HTML parsing")
+    parser.add_argument(
+        "--fixtures", type=Path, default=FIXTURES_DIR, help="HTML fixture folder"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=200, help="Copies of the fixture set"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+
+    args = parser.parse_args()
+
+    main(args.fixtures, args.repeat, args.workers)
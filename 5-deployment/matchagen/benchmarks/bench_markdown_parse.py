@@ -0,0 +1,155 @@
+"""Compare the single-pass markdown tokenizer with the legacy parsers.
+
+The legacy baseline reproduces the previous datatools behaviour: three
+independent scans of the page (recipes, pagination, links). Both take about
+the same time; the table shows it next to the recipes each one finds, since
+the tokenizer also splits roundup pages into their recipes.
+
+Usage:
+    python benchmarks/bench_markdown_parse.py [--fixtures DIR] [--repeat N]
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, "src")  # noqa: E402
+
+from matchagen.mdparse import recipes_from_page, tokenize_markdown  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "markdown"
+BASE_URL = "https://www.jadeleafmatcha.com/blogs/matcha-recipes"
+
+
+def legacy_parse(markdown: str, url: str) -> tuple[list[dict], int, list[str]]:
+    """Three-pass reference implementation of the old markdown parsing."""
+    recipes = []
+    ingredients_match = re.search(
+        r"(?:##?\s*Ingredients?|INGREDIENTS?)[:\s]*\n(.*?)(?=##|$)",
+        markdown,
+        re.IGNORECASE | re.DOTALL,
+    )
+    instructions_match = re.search(
+        r"(?:##?\s*(?:Instructions?|Directions?|Method|Steps?)|INSTRUCTIONS?)"
+        r"[:\s]*\n(.*?)(?=##|$)",
+        markdown,
+        re.IGNORECASE | re.DOTALL,
+    )
+    if ingredients_match and instructions_match:
+        ingredients = [
+            line.strip().lstrip("-*•").strip()
+            for line in ingredients_match.group(1).split("\n")
+            if line.strip() and not line.strip().startswith("#")
+        ]
+        instructions = [
+            line.strip().lstrip("0123456789.-*•").strip()
+            for line in instructions_match.group(1).split("\n")
+            if line.strip()
+            and not line.strip().startswith("#")
+            and len(line.strip()) > 10
+        ]
+        if ingredients and instructions:
+            title_match = re.search(r"^#\s+(.+)$", markdown, re.MULTILINE)
+            recipes.append(
+                {
+                    "title": title_match.group(1) if title_match else "Matcha Recipe",
+                    "ingredients": ingredients[:20],
+                    "instructions": instructions[:15],
+                }
+            )
+
+    page_numbers = [
+        int(p) for p in re.findall(r"page[=\s]+(\d+)", markdown, re.IGNORECASE)
+    ]
+    page_numbers += [int(n) for n in re.findall(r"\[(\d+)\]", markdown) if int(n) < 100]
+    max_page = max(page_numbers) if page_numbers else 1
+
+    links = []
+    base_domain = urlparse(url).netloc
+    for plain in re.findall(r"https://[^\s\)]+/blogs/[^\s\)]*/[a-z0-9-]+", markdown):
+        skip = ["/tagged", "/account", "/checkout", "/policies", "/pages"]
+        if urlparse(plain).netloc == base_domain and not any(
+            s in plain for s in skip + ["/collections"]
+        ):
+            links.append(plain)
+    for text, href in re.findall(r"\[([^\]]+)\]\(([^\)]+)\)", markdown):
+        if not href or href.startswith("#"):
+            continue
+        exts = [".jpg", ".jpeg", ".png", ".gif", ".svg", ".css", ".js", ".ico"]
+        if any(ext in href.lower() for ext in exts):
+            continue
+        keywords = ["recipe", "latte", "smoothie", "dessert", "cake"]
+        is_recipe_path = (
+            "/blogs/" in href.lower()
+            and "/matcha-recipes/" in href.lower()
+            and href.lower().count("/") >= 4
+        )
+        if is_recipe_path or any(k in text.lower() for k in keywords):
+            if href.startswith("http"):
+                full_url = href
+            elif href.startswith("/"):
+                full_url = urljoin(url, href)
+            else:
+                continue
+            skip = ["page=", "?page", "/tagged/", "/account/", "/checkout"]
+            skip += ["/policies/", "/pages/", "/collections/", "/cdn/"]
+            if urlparse(full_url).netloc == base_domain and not any(
+                s in full_url for s in skip
+            ):
+                links.append(full_url)
+
+    return recipes, max_page, list(set(links))
+
+
+def single_pass(markdown: str, url: str) -> tuple[list[dict], int, list[str]]:
+    """Tokenize once and derive recipes, pagination and links from it."""
+    page = tokenize_markdown(markdown, url)
+    return recipes_from_page(page), page.max_page, page.links
+
+
+def bench(fn, pages: list[str], repeat: int) -> tuple[float, int]:
+    """Time ``fn`` over every page ``repeat`` times."""
+    start = time.perf_counter()
+    found = 0
+    for _ in range(repeat):
+        for markdown in pages:
+            found += len(fn(markdown, BASE_URL)[0])
+    return time.perf_counter() - start, found // repeat
+
+
+def main(fixtures_dir: Path, repeat: int):
+    """Run both parsers and print a summary table."""
+    pages = [p.read_text() for p in sorted(fixtures_dir.glob("*.md"))]
+    if not pages:
+        raise SystemExit(f"No markdown fixtures found in {fixtures_dir}")
+
+    rows = [
+        ("legacy (3 scans)", *bench(legacy_parse, pages, repeat)),
+        ("single pass", *bench(single_pass, pages, repeat)),
+    ]
+    total = len(pages) * repeat
+    baseline = rows[0][1]
+    print(f"{'parser':<20}{'seconds':>10}{'pages/s':>12}{'speedup':>10}{'recipes':>10}")
+    for name, seconds, found in rows:
+        print(
+            f"{name:<20}{seconds:>10.3f}{total / seconds:>12.1f}"
+            f"{baseline / seconds:>9.1f}x{found:>10}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark markdown parsing")
+    parser.add_argument(
+        "--fixtures", type=Path, default=FIXTURES_DIR, help="Markdown fixture folder"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=2000, help="Passes over the fixture set"
+    )
+
+    args = parser.parse_args()
+
+    main(args.fixtures, args.repeat)
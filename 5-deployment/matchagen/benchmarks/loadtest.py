@@ -0,0 +1,419 @@
+"""Open-loop load test of the recipe backend.
+
+Requests arrive as a Poisson process at a fixed rate, independent of how fast
+the server answers, so queueing in the serving path shows up as latency
+instead of silently lowering the offered load. Latency is measured from the
+scheduled arrival time. Prompts are drawn from the frontend's Pantry presets;
+some requests also carry a seed or a smaller token budget, like API clients
+that retry or share recipes.
+
+By default a local server is started with a stub generator, so the serving
+path can be benchmarked offline. Use ``--model`` to serve the trained model
+or ``--url`` to test a running deployment.
+
+Usage:
+    python benchmarks/loadtest.py [--rates 1,2,4] [--duration 30]
+    python benchmarks/loadtest.py --model artefacts/matcha-model --rates 0.5,1
+    python benchmarks/loadtest.py --url http://localhost:8080/api
+"""
+
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, "src")  # noqa: E402
+sys.path.insert(0, "backend")  # noqa: E402
+
+from loguru import logger  # noqa: E402
+
+# Same presets as frontend/src/components/Pantry.jsx
+PANTRY = {
+    "base": ["Oat Milk", "Almond Milk", "Coconut Milk", "Soy Milk", "Whole Milk"],
+    "twist": [
+        "Mango",
+        "Strawberry",
+        "Blueberries",
+        "Vanilla Syrup",
+        "Honey",
+        "White Chocolate",
+    ],
+    "boost": ["Collagen", "Protein Powder", "Cinnamon", "Ginger"],
+}
+# Free-text examples from the Pantry search field
+CUSTOM = ["Matcha Ice Cream", "Cardamom", "Caramel"]
+# Values the temperature slider can take
+TEMPERATURES = [round(0.5 + 0.1 * i, 1) for i in range(11)]
+# Token budgets of API clients that set max_length, None keeps the default
+MAX_LENGTHS = [None, None, 128, 256]
+# Share of seeded requests, and the seeds they pick so some of them repeat
+SEEDED_FRACTION = 0.2
+SEEDS = range(20)
+
+
+def build_corpus(size: int, seed: int = 0) -> list[dict]:
+    """Build request bodies like the frontend and API clients send them.
+
+    Args:
+        size: Number of request bodies
+        seed: Random seed
+
+    Returns:
+        List of JSON bodies for ``POST /generate``
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        picked = []
+        if rng.random() < 0.8:
+            picked.append(rng.choice(PANTRY["base"]))
+        picked += rng.sample(PANTRY["twist"], rng.randint(0, 2))
+        if rng.random() < 0.4:
+            picked.append(rng.choice(PANTRY["boost"]))
+        if rng.random() < 0.2:
+            picked.append(rng.choice(CUSTOM))
+        body = {
+            "inspiration": ", ".join(picked),
+            "temperature": rng.choice(TEMPERATURES),
+        }
+        max_length = rng.choice(MAX_LENGTHS)
+        if max_length is not None:
+            body["max_length"] = max_length
+        if rng.random() < SEEDED_FRACTION:
+            body["seed"] = rng.choice(SEEDS)
+        corpus.append(body)
+    return corpus
+
+
+class StubGenerator:
+    """Stand-in for RecipeGenerator with a configurable generation time.
+
+    Like the real model it blocks the calling thread while generating, and a
+    batch of variants costs about as much as a single recipe.
+    """
+
+    compiled = False
+    fingerprint = "stub"
+
+    def __init__(self, latency_ms: float = 400.0, sigma: float = 0.3, seed: int = 0):
+        """Initialize the stub.
+
+        Args:
+            latency_ms: Median generation time
+            sigma: Spread of the log-normal generation time
+            seed: Random seed
+        """
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def generate(
+        self,
+        prompt: str,
+        temperature: float = 0.9,
+        max_length: int = 256,
+        deadline: float | None = None,
+        seed: int | None = None,
+    ):
+        """Generate one recipe, see ``generate_variants``."""
+        return self.generate_variants(
+            prompt, 1, temperature, max_length, deadline, seed
+        )[0]
+
+    def generate_variants(
+        self,
+        prompt: str,
+        n: int = 3,
+        temperature: float = 0.9,
+        max_length: int = 256,
+        deadline: float | None = None,
+        seed: int | None = None,
+    ):
+        """Sleep for a sampled generation time and return fixed-shape recipes.
+
+        The time scales with ``max_length`` relative to the default budget of
+        512 tokens, and stops at the deadline like a cancelled decode.
+        """
+        from matchagen.admission import DeadlineExceeded
+        from matchagen.recipe import Recipe
+
+        with self._lock:
+            delay = self._rng.lognormal(np.log(self.latency_ms / 1000), self.sigma)
+        delay *= min(1.0, max_length / 512)
+        if deadline is not None and time.monotonic() + delay > deadline:
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            raise DeadlineExceeded("Deadline passed while decoding")
+        time.sleep(delay)
+        ingredients = [i.strip() for i in prompt.split(",") if i.strip()]
+        return [
+            Recipe(
+                title=f"Stub Matcha Latte {i + 1}",
+                ingredients=ingredients + ["Matcha powder"],
+                directions=["Whisk the matcha.", "Add the rest."],
+            )
+            for i in range(n)
+        ]
+
+
+@dataclass
+class RunResult:
+    """Outcome of one load level."""
+
+    config: str
+    rate: float
+    sent: int
+    ok: int
+    rejected: int
+    errors: int
+    duration: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @property
+    def throughput(self) -> float:
+        return self.ok / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.sent if self.sent else 0.0
+
+    @property
+    def reject_rate(self) -> float:
+        return self.rejected / self.sent if self.sent else 0.0
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    corpus: list[dict],
+    rate: float,
+    duration: float,
+    config: str,
+    seed: int = 0,
+) -> RunResult:
+    """Send requests at Poisson arrival times for ``duration`` seconds.
+
+    Args:
+        client: Client with the target base URL
+        corpus: Request bodies, cycled through in order
+        rate: Mean arrivals per second
+        duration: Length of the arrival window in seconds
+        config: Label of this configuration in the report
+        seed: Random seed for the arrival times
+
+    Returns:
+        Latency percentiles of successful requests, throughput, and counts of
+        requests rejected by admission control (429) and other errors
+    """
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    rejected = 0
+    errors = 0
+
+    async def send(body: dict, scheduled: float):
+        nonlocal rejected, errors
+        try:
+            response = await client.post("/generate", json=body)
+            if response.status_code == 429:
+                rejected += 1
+                return
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            errors += 1
+            logger.debug(f"Request failed: {e!r}")
+            return
+        latencies.append(loop.time() - scheduled)
+
+    start = loop.time()
+    arrival = start
+    tasks = []
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival - start > duration:
+            break
+        await asyncio.sleep(max(0.0, arrival - loop.time()))
+        body = corpus[len(tasks) % len(corpus)]
+        tasks.append(asyncio.create_task(send(body, arrival)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return RunResult(
+        config=config,
+        rate=rate,
+        sent=len(tasks),
+        ok=len(latencies),
+        rejected=rejected,
+        errors=errors,
+        duration=elapsed,
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(generator) -> tuple[str, Callable[[], None]]:
+    """Serve backend/app.py with ``generator`` on a free local port.
+
+    Args:
+        generator: RecipeGenerator or StubGenerator instance
+
+    Returns:
+        Tuple of (base URL, function that stops the server)
+    """
+    import uvicorn
+
+    import app as backend
+    from matchagen.variants import VariantCache
+
+    # Skip the startup hook that would load a model from artefacts/, but set
+    # up the variant cache the same way
+    backend.app.router.on_startup.clear()
+    backend.model = generator
+    if backend.NUM_VARIANTS > 1:
+        backend.variant_cache = VariantCache(generator, n=backend.NUM_VARIANTS)
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(backend.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+async def run_all(
+    url: str, config: str, rates: list[float], duration: float, timeout: float
+) -> list[RunResult]:
+    """Run every load level against one target."""
+    corpus = build_corpus(size=500)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(
+        base_url=url, timeout=timeout, limits=limits
+    ) as client:
+        results = []
+        for rate in rates:
+            logger.info(f"{config}: {rate} req/s for {duration}s")
+            results.append(await run_load(client, corpus, rate, duration, config))
+        return results
+
+
+def print_report(results: list[RunResult]):
+    """Print one row per configuration and load level."""
+    print(
+        f"{'config':<16}{'rate':>7}{'sent':>7}{'ok':>7}{'429%':>7}{'err%':>7}"
+        f"{'req/s':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for r in results:
+        print(
+            f"{r.config:<16}{r.rate:>7.2f}{r.sent:>7}{r.ok:>7}"
+            f"{100 * r.reject_rate:>7.1f}{100 * r.error_rate:>7.1f}"
+            f"{r.throughput:>8.2f}"
+            f"{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}{r.p99_ms:>10.1f}"
+        )
+
+
+def main(
+    rates: list[float],
+    duration: float,
+    url: str | None,
+    model: Path | None,
+    stub_latency: float,
+    timeout: float,
+    output: Path | None,
+):
+    """Start the target if needed, run the load levels and report."""
+    stop = None
+    if url:
+        config = "remote"
+    elif model:
+        from matchagen import RecipeGenerator
+
+        config = "model"
+        url, stop = start_local_server(RecipeGenerator(str(model)))
+    else:
+        config = f"stub-{stub_latency:g}ms"
+        url, stop = start_local_server(StubGenerator(latency_ms=stub_latency))
+
+    try:
+        results = asyncio.run(run_all(url, config, rates, duration, timeout))
+    finally:
+        if stop:
+            stop()
+
+    print_report(results)
+    if output:
+        rows = [
+            asdict(r)
+            | {
+                "throughput": r.throughput,
+                "reject_rate": r.reject_rate,
+                "error_rate": r.error_rate,
+            }
+            for r in results
+        ]
+        output.write_text(json.dumps(rows, indent=2))
+        logger.info(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the recipe backend")
+    parser.add_argument(
+        "--rates", default="1,2,4", help="Comma-separated arrival rates (req/s)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="Seconds per arrival rate"
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Base URL of a running backend")
+    target.add_argument("--model", type=Path, help="Serve this model locally")
+    parser.add_argument(
+        "--stub-latency",
+        type=float,
+        default=400.0,
+        help="Median generation time of the stub in ms",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="Per-request timeout in seconds"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+
+    args = parser.parse_args()
+
+    main(
+        rates=[float(r) for r in args.rates.split(",")],
+        duration=args.duration,
+        url=args.url,
+        model=args.model,
+        stub_latency=args.stub_latency,
+        timeout=args.timeout,
+        output=args.output,
+    )
@@ -50,7 +50,7 @@ function App() {
       if (!response.ok) throw new Error('Failed to generate recipe');
       
       const data = await response.json();
-      setRecipe(data.recipe);
+      setRecipe({ ...data.recipe, text: data.text });
     } catch (err) {
       setError(err.message);
     } finally {
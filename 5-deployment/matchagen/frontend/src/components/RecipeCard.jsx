@@ -3,18 +3,12 @@ import { motion } from 'framer-motion';
 import { Share2, Download, RefreshCw, Sparkles } from 'lucide-react';
 
 export function RecipeCard({ recipe, onReset }) {
-  // Simple parser to split the text
-  const lines = recipe.split('\n');
-  const title = lines.find(l => l.startsWith('Title:'))?.replace('Title: ', '') || 'Custom Recipe';
-
-  const ingredientsStart = lines.findIndex(l => l.includes('Ingredients:'));
-  const directionsStart = lines.findIndex(l => l.includes('Directions:'));
-
-  const ingredients = lines.slice(ingredientsStart + 1, directionsStart).filter(l => l.trim().startsWith('-'));
-  const directions = lines.slice(directionsStart + 1).filter(l => l.trim().match(/^\d+\./));
+  // The backend returns the recipe structured, plus its plain text
+  const title = recipe.title || 'Custom Recipe';
+  const { ingredients, directions } = recipe;
 
   const handleDownload = () => {
-    const blob = new Blob([recipe], { type: 'text/plain' });
+    const blob = new Blob([recipe.text], { type: 'text/plain' });
     const url = URL.createObjectURL(blob);
     const a = document.createElement('a');
     a.href = url;
@@ -28,7 +22,7 @@ export function RecipeCard({ recipe, onReset }) {
   const handleShare = async () => {
     const shareData = {
       title: `${title} - TokiMono Matcha Lab`,
-      text: recipe,
+      text: recipe.text,
     };
 
     if (navigator.share) {
@@ -46,7 +40,7 @@ export function RecipeCard({ recipe, onReset }) {
   };
 
   const copyToClipboard = () => {
-    navigator.clipboard.writeText(recipe).then(() => {
+    navigator.clipboard.writeText(recipe.text).then(() => {
       alert('Recipe copied to clipboard!');
     }).catch(err => {
       console.error('Failed to copy:', err);
@@ -117,7 +111,7 @@ export function RecipeCard({ recipe, onReset }) {
               {ingredients.map((ing, i) => (
                 <li key={i} className="flex items-start gap-3 text-luxury-cream/80 font-light tracking-wide">
                   <span className="w-1.5 h-1.5 rounded-full bg-matcha-500 mt-2 shrink-0 shadow-[0_0_5px_rgba(76,175,80,0.5)]" />
-                  <span>{ing.replace('-', '').trim()}</span>
+                  <span>{ing}</span>
                 </li>
               ))}
             </ul>
@@ -129,7 +123,7 @@ export function RecipeCard({ recipe, onReset }) {
               {directions.map((step, i) => (
                 <li key={i} className="flex gap-4 text-luxury-cream/80">
                   <span className="font-mono text-matcha-300 font-bold shrink-0 text-sm pt-1">{(i + 1).toString().padStart(2, '0')}</span>
-                  <span className="font-light leading-relaxed">{step.replace(/^\d+\.\s*/, '')}</span>
+                  <span className="font-light leading-relaxed">{step}</span>
                 </li>
               ))}
             </ol>
@@ -0,0 +1,228 @@
+"""Local mock of the Firecrawl v2 scrape and batch APIs for offline runs.
+
+Pages are rendered from the markdown fixtures in ``benchmarks/fixtures``:
+blog listing URLs get the listing page (with page-specific recipe slugs),
+recipe URLs get a single recipe or a roundup page. JSON-schema extraction is
+emulated with the markdown tokenizer. Batch jobs finish one page every
+``--page-delay`` seconds so polling and streaming behave like the real API.
+
+Usage:
+    python mock_firecrawl.py --port 3002
+    FIRECRAWL_API_KEY=test FIRECRAWL_API_URL=http://localhost:3002 \\
+        python -m matchagen.datatools --firecrawl-mode batch
+
+``python mock_firecrawl.py --check`` runs the batch scraper against a mock on a
+free port and exits non-zero when it yields no recipes.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, "src")  # noqa: E402
+
+from matchagen.mdparse import recipes_from_page, tokenize_markdown  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).parent / "benchmarks" / "fixtures" / "markdown"
+RECIPE_SLUG_RE = re.compile(r"(/blogs/matcha-recipes/)(?!tagged)([a-z0-9-]+)")
+
+
+def render_markdown(url: str, fixtures: dict[str, str]) -> str:
+    """Pick and adapt a fixture page for a URL."""
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/")
+    if path.endswith(("matcha-recipes", "/recipes")):
+        page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+        if page == 1:
+            return fixtures["listing"]
+        return RECIPE_SLUG_RE.sub(rf"\g<1>\g<2>-p{page}", fixtures["listing"])
+    # Every third recipe page is a roundup with several recipes
+    if zlib.crc32(path.encode()) % 3 == 0:
+        return fixtures["roundup"]
+    return fixtures["single_recipe"]
+
+
+def make_document(url: str, formats: list, fixtures: dict[str, str]) -> dict:
+    """Build a v2 Document payload for a URL."""
+    markdown = render_markdown(url, fixtures)
+    doc = {
+        "metadata": {
+            "sourceURL": url,
+            "url": url,
+            "statusCode": 200,
+            "creditsUsed": 1,
+        }
+    }
+    wants_json = any(isinstance(f, dict) and f.get("type") == "json" for f in formats)
+    if "markdown" in formats:
+        doc["markdown"] = markdown
+    if wants_json:
+        # Extraction only succeeds on pages with exactly one recipe
+        recipes = recipes_from_page(tokenize_markdown(markdown, url))
+        doc["json"] = recipes[0] if len(recipes) == 1 else None
+        doc["metadata"]["creditsUsed"] = 5
+    return doc
+
+
+class MockFirecrawlHandler(BaseHTTPRequestHandler):
+    """Request handler for the scrape and batch scrape endpoints."""
+
+    server: "MockFirecrawlServer"
+
+    def _send(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):  # noqa: N802
+        body = self._read_json()
+        formats = body.get("formats") or ["markdown"]
+        if self.path == "/v2/scrape":
+            doc = make_document(body["url"], formats, self.server.fixtures)
+            self._send({"success": True, "data": doc})
+        elif self.path == "/v2/batch/scrape":
+            job_id = self.server.create_job(body["urls"], formats)
+            status_url = f"/v2/batch/scrape/{job_id}"
+            self._send({"success": True, "id": job_id, "url": status_url})
+        else:
+            self._send({"success": False, "error": "Not found"}, 404)
+
+    def do_GET(self):  # noqa: N802
+        prefix = "/v2/batch/scrape/"
+        job = self.server.jobs.get(self.path[len(prefix) :].split("?")[0])
+        if not self.path.startswith(prefix) or job is None:
+            self._send({"success": False, "error": "Job not found"}, 404)
+            return
+        self._send(self.server.job_status(job))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MockFirecrawlServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding batch job state."""
+
+    def __init__(self, address, page_delay: float = 0.05, verbose: bool = False):
+        super().__init__(address, MockFirecrawlHandler)
+        self.page_delay = page_delay
+        self.verbose = verbose
+        self.fixtures = {p.stem: p.read_text() for p in FIXTURES_DIR.glob("*.md")}
+        self.jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, urls: list[str], formats: list) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = {"urls": urls, "formats": formats, "start": time.time()}
+        return job_id
+
+    def job_status(self, job: dict) -> dict:
+        elapsed = time.time() - job["start"]
+        total = len(job["urls"])
+        completed = total
+        if self.page_delay:
+            completed = min(total, int(elapsed / self.page_delay))
+        data = [
+            make_document(url, job["formats"], self.fixtures)
+            for url in job["urls"][:completed]
+        ]
+        return {
+            "success": True,
+            "status": "completed" if completed == total else "scraping",
+            "completed": completed,
+            "total": total,
+            "creditsUsed": sum(d["metadata"]["creditsUsed"] for d in data),
+            "expiresAt": None,
+            "next": None,
+            "data": data,
+        }
+
+
+def serve(host: str = "127.0.0.1", port: int = 3002, page_delay: float = 0.05):
+    """Run the mock server until interrupted."""
+    server = MockFirecrawlServer((host, port), page_delay=page_delay, verbose=True)
+    print(f"Mock Firecrawl listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def check(url: str = "https://www.jadeleafmatcha.com/blogs/matcha-recipes") -> int:
+    """Scrape ``url`` in batch mode against a mock server on a free port.
+
+    Args:
+        url: Listing page to start from
+
+    Returns:
+        Number of recipes scraped
+
+    Raises:
+        RuntimeError: When the scraper yields no recipes
+    """
+    server = MockFirecrawlServer(("127.0.0.1", 0), page_delay=0.0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    os.environ["FIRECRAWL_API_KEY"] = "test"
+    os.environ["FIRECRAWL_API_URL"] = f"http://{host}:{port}"
+    # Keep the check's telemetry out of assets/crawl_metrics.jsonl
+    metrics_dir = tempfile.TemporaryDirectory()
+    os.environ["CRAWL_METRICS_FILE"] = str(Path(metrics_dir.name) / "metrics.jsonl")
+    try:
+        from matchagen.datatools import scrape_with_firecrawl_batch
+
+        recipes = scrape_with_firecrawl_batch(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+        metrics_dir.cleanup()
+    if not recipes:
+        raise RuntimeError(f"Batch scrape of {url} against the mock found no recipes")
+    print(f"Batch scrape against the mock found {len(recipes)} recipes")
+    return len(recipes)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock Firecrawl API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=3002, help="Port to listen on")
+    parser.add_argument(
+        "--page-delay",
+        type=float,
+        default=0.05,
+        help="Seconds per finished page in batch jobs",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Run the batch scraper against a mock on a free port and exit",
+    )
+
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+    else:
+        serve(args.host, args.port, args.page_delay)
@@ -1,6 +1,7 @@
 """Matchagen - Matcha recipe generator using distilgpt2."""
 
 from matchagen.models import RecipeGenerator
+from matchagen.recipe import Recipe
 
 __version__ = "0.1.0"
-__all__ = ["RecipeGenerator"]
+__all__ = ["Recipe", "RecipeGenerator"]
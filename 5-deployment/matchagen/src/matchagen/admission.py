@@ -0,0 +1,179 @@
+"""Admission control for recipe generation.
+
+Generation is admitted through a fixed number of slots, one decode each.
+Requests that find every slot busy wait in one of two lanes: requests with a
+small token budget (the short lane) are always let in before long ones, and
+long requests never hold all slots at once, so a burst of long decodes cannot
+starve short ones. When the queue is full a request is rejected right away
+with a Retry-After estimate. Under load, the token budget of admitted requests
+shrinks, so the queue drains faster.
+
+Configured through environment variables:
+
+    MATCHAGEN_CONCURRENCY    concurrent decodes (default 2)
+    MATCHAGEN_MAX_QUEUE      waiting requests before rejecting (default 16)
+    MATCHAGEN_MAX_LENGTH     token budget when idle (default 512)
+    MATCHAGEN_SHORT_LENGTH   largest budget of the short lane, also the
+                             smallest budget under load (default 128)
+    MATCHAGEN_DEADLINE_MS    default time a request may take (default 30000)
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from matchagen.metrics import ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTIONS
+
+SHORT = "short"
+LONG = "long"
+
+
+class Overloaded(Exception):
+    """The queue is full; the client should retry after ``retry_after`` s."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request ran past its deadline, while queued or while decoding."""
+
+
+class AdmissionController:
+    """Bounded concurrency with a priority lane for short requests."""
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_queue: int = 16,
+        max_length: int = 512,
+        short_length: int = 128,
+    ):
+        """Initialize the controller.
+
+        Args:
+            concurrency: Decodes running at the same time
+            max_queue: Waiting requests before new ones are rejected
+            max_length: Token budget when the server is idle
+            short_length: Largest budget in the short lane and the floor of
+                the budget under load
+        """
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_length = max_length
+        self.short_length = short_length
+        # Keep one slot free of long decodes, unless there is only one
+        self.long_slots = max(1, concurrency - 1)
+        self.active = {SHORT: 0, LONG: 0}
+        self._waiters: dict[str, deque[asyncio.Future]] = {
+            SHORT: deque(),
+            LONG: deque(),
+        }
+        # Moving average of one decode's duration, for Retry-After
+        self._service_seconds = 1.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Create a controller configured by MATCHAGEN_* variables."""
+        return cls(
+            concurrency=int(os.getenv("MATCHAGEN_CONCURRENCY", "2")),
+            max_queue=int(os.getenv("MATCHAGEN_MAX_QUEUE", "16")),
+            max_length=int(os.getenv("MATCHAGEN_MAX_LENGTH", "512")),
+            short_length=int(os.getenv("MATCHAGEN_SHORT_LENGTH", "128")),
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    def token_budget(self, requested: int) -> int:
+        """Tokens a request may generate at the current load.
+
+        The idle budget is divided by the number of requests per slot, but
+        never goes below the short lane's budget.
+        """
+        load = (sum(self.active.values()) + self.queued + 1) / self.concurrency
+        cap = max(self.short_length, int(self.max_length / max(1.0, load)))
+        return max(1, min(requested, cap))
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to have drained."""
+        backlog = self.queued + sum(self.active.values())
+        return max(1, math.ceil(backlog * self._service_seconds / self.concurrency))
+
+    def _can_start(self, lane: str) -> bool:
+        if sum(self.active.values()) >= self.concurrency:
+            return False
+        return lane == SHORT or self.active[LONG] < self.long_slots
+
+    def _release(self, lane: str):
+        self.active[lane] -= 1
+        # Hand free slots to waiting requests, short lane first
+        for waiting in (SHORT, LONG):
+            queue = self._waiters[waiting]
+            while queue and self._can_start(waiting):
+                future = queue.popleft()
+                if not future.done():
+                    self.active[waiting] += 1
+                    future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(
+        self, requested: int, deadline: float, fixed_budget: bool = False
+    ) -> AsyncIterator[int]:
+        """Hold a decode slot for the duration of the block.
+
+        Args:
+            requested: Token budget asked for by the client
+            deadline: ``time.monotonic()`` by which the request must finish
+            fixed_budget: Do not shrink the budget under load, for requests
+                whose output must not depend on load (seeded ones)
+
+        Yields:
+            Token budget granted to the request
+
+        Raises:
+            Overloaded: When the queue is full
+            DeadlineExceeded: When the deadline passes while queued
+        """
+        lane = SHORT if min(requested, self.max_length) <= self.short_length else LONG
+        if fixed_budget:
+            max_length = max(1, min(requested, self.max_length))
+        else:
+            max_length = self.token_budget(requested)
+
+        if self._can_start(lane) and not self._waiters[SHORT]:
+            self.active[lane] += 1
+        elif self.queued >= self.max_queue:
+            ADMISSION_REJECTIONS.inc(reason="overloaded")
+            raise Overloaded(self.retry_after())
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[lane].append(future)
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(future, timeout=deadline - start)
+            except BaseException as e:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just before the timeout
+                    self._release(lane)
+                elif future in self._waiters[lane]:
+                    self._waiters[lane].remove(future)
+                if isinstance(e, asyncio.TimeoutError):
+                    ADMISSION_REJECTIONS.inc(reason="deadline")
+                    raise DeadlineExceeded("Deadline passed while queued") from None
+                raise
+            ADMISSION_QUEUE_SECONDS.observe(time.monotonic() - start, lane=lane)
+
+        start = time.monotonic()
+        try:
+            yield max_length
+        finally:
+            elapsed = time.monotonic() - start
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * elapsed
+            self._release(lane)
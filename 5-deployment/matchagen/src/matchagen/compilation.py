@@ -0,0 +1,135 @@
+"""Optional compiled decoding with a static KV cache.
+
+With ``MATCHAGEN_COMPILE=1`` the decoder step is compiled with
+``torch.compile`` through the ``CompileConfig`` of transformers' ``generate``.
+The KV cache is preallocated at a fixed length (a static cache), so each
+combination of batch size and cache length compiles once. The cache length is
+the token budget rounded up to a multiple of ``LENGTH_BUCKET`` to keep the
+number of combinations small; decoding still stops at the budget itself.
+
+Compiled graphs are stored in ``MATCHAGEN_COMPILE_CACHE`` (default
+artefacts/compile-cache.bin) after warm-up and loaded again at startup, so a
+restart does not compile from scratch. Ops dynamo cannot handle run eagerly,
+and if compiled generation fails outright the generator falls back to eager
+decoding for good.
+"""
+
+import os
+from pathlib import Path
+
+import torch
+from loguru import logger
+
+COMPILE_CACHE_FILE = Path(
+    os.getenv("MATCHAGEN_COMPILE_CACHE", "artefacts/compile-cache.bin")
+)
+LENGTH_BUCKET = 64
+
+
+def compile_enabled() -> bool:
+    """Whether MATCHAGEN_COMPILE asks for compiled decoding."""
+    return os.getenv("MATCHAGEN_COMPILE", "0") == "1"
+
+
+def static_length(max_length: int, bucket: int = LENGTH_BUCKET) -> int:
+    """Static cache length for a token budget, rounded up to a bucket."""
+    return max(bucket, -(-max_length // bucket) * bucket)
+
+
+def enable_compilation(model) -> bool:
+    """Make ``model.generate`` decode through a compiled step.
+
+    Args:
+        model: Seq2seq model with a generation config
+
+    Returns:
+        Whether compilation is available and enabled
+    """
+    try:
+        import torch._dynamo
+        from transformers import CompileConfig
+    except ImportError as e:
+        logger.warning(f"Compiled decoding unavailable, using eager: {e}")
+        return False
+
+    # Fall back to eager per frame instead of failing on unsupported ops
+    torch._dynamo.config.suppress_errors = True
+
+    mode = "reduce-overhead" if model.device.type == "cuda" else "default"
+    config = CompileConfig(mode=mode, dynamic=False)
+    # generate() only compiles on accelerators unless asked to
+    config._compile_all_devices = True
+    model.generation_config.cache_implementation = "static"
+    model.generation_config.compile_config = config
+    model.generation_config.disable_compile = False
+    return True
+
+
+def disable_compilation(model):
+    """Return ``model.generate`` to eager decoding with a dynamic cache."""
+    model.generation_config.cache_implementation = None
+    model.generation_config.compile_config = None
+    model.generation_config.disable_compile = True
+
+
+def load_compile_cache(path: Path | str = COMPILE_CACHE_FILE) -> bool:
+    """Load compiled artefacts saved by an earlier run.
+
+    Returns:
+        Whether a cache was loaded
+    """
+    path = Path(path)
+    if not path.exists() or not hasattr(torch.compiler, "load_cache_artifacts"):
+        return False
+    try:
+        torch.compiler.load_cache_artifacts(path.read_bytes())
+    except Exception as e:
+        logger.warning(f"Ignoring unusable compile cache {path}: {e}")
+        return False
+    logger.info(f"Loaded compile cache from {path}")
+    return True
+
+
+def save_compile_cache(path: Path | str = COMPILE_CACHE_FILE) -> bool:
+    """Save the artefacts compiled so far.
+
+    Returns:
+        Whether a cache was written
+    """
+    if not hasattr(torch.compiler, "save_cache_artifacts"):
+        return False
+    artifacts = torch.compiler.save_cache_artifacts()
+    if artifacts is None:
+        return False
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(artifacts[0])
+    except OSError as e:
+        logger.warning(f"Could not save compile cache to {path}: {e}")
+        return False
+    logger.info(f"Saved compile cache to {path}")
+    return True
+
+
+def warm_up(generator, lengths: list[int], num_sequences: tuple[int, ...] = (1,)):
+    """Compile every shape the server will use, then save the cache.
+
+    Args:
+        generator: RecipeGenerator with compiled decoding enabled
+        lengths: Token budgets requests can be granted
+        num_sequences: Batch sizes generate is called with
+
+    Returns:
+        Whether compiled decoding is still enabled afterwards
+    """
+    if not generator.compiled:
+        return False
+    buckets = {static_length(length) for length in lengths}
+    for n, length in sorted((n, b) for n in num_sequences for b in buckets):
+        logger.info(f"Compiling decode step for {n} sequence(s), {length} tokens")
+        generator.generate_variants("matcha", n=n, max_length=length)
+        if not generator.compiled:
+            return False
+    save_compile_cache()
+    return True
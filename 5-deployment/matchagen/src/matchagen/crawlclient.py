@@ -0,0 +1,153 @@
+"""Pluggable Firecrawl clients and asynchronous batch streaming.
+
+The scraper only depends on the small :class:`CrawlClient` interface, so the
+hosted Firecrawl API, a self-hosted instance or the local mock server in
+``mock_firecrawl.py`` can be swapped in through ``FIRECRAWL_API_URL``.
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Protocol
+
+from firecrawl import Firecrawl
+from loguru import logger
+
+DEFAULT_API_URL = "https://api.firecrawl.dev"
+FINISHED_STATES = {"completed", "failed", "cancelled"}
+
+
+class CrawlClient(Protocol):
+    """Minimal scrape interface used by the recipe scrapers.
+
+    Documents are plain dictionaries with ``url``, ``markdown``, ``json``,
+    ``status_code`` and ``credits`` keys.
+    """
+
+    def scrape(self, url: str, formats: list) -> dict:
+        """Scrape a single page and return its document."""
+        ...
+
+    def start_batch(self, urls: list[str], formats: list) -> str:
+        """Submit a batch scrape job and return its id."""
+        ...
+
+    def batch_status(self, job_id: str) -> dict:
+        """Return ``status``, ``completed``, ``total`` and ``data`` of a job."""
+        ...
+
+
+def document_to_dict(doc) -> dict:
+    """Convert a Firecrawl SDK Document into a plain dictionary.
+
+    Args:
+        doc: Document returned by the Firecrawl SDK
+
+    Returns:
+        Dictionary with url, markdown, json, status_code and credits
+    """
+    metadata = getattr(doc, "metadata", None)
+    return {
+        "url": getattr(metadata, "source_url", None) or getattr(metadata, "url", None),
+        "markdown": getattr(doc, "markdown", None),
+        "json": getattr(doc, "json", None),
+        "status_code": getattr(metadata, "status_code", None),
+        "credits": getattr(metadata, "credits_used", None),
+    }
+
+
+class FirecrawlClient:
+    """CrawlClient backed by the Firecrawl v2 SDK."""
+
+    def __init__(self, api_key: str, api_url: str = DEFAULT_API_URL):
+        """Initialize the client.
+
+        Args:
+            api_key: Firecrawl API key
+            api_url: API base URL (point at the mock server for offline runs)
+        """
+        self._app = Firecrawl(api_key=api_key, api_url=api_url)
+
+    def scrape(self, url: str, formats: list) -> dict:
+        """Scrape a single page."""
+        doc = document_to_dict(self._app.scrape(url, formats=formats))
+        doc["url"] = doc["url"] or url
+        return doc
+
+    def start_batch(self, urls: list[str], formats: list) -> str:
+        """Submit a batch scrape job."""
+        return self._app.start_batch_scrape(urls, formats=formats).id
+
+    def batch_status(self, job_id: str) -> dict:
+        """Fetch the status and finished documents of a batch job."""
+        job = self._app.get_batch_scrape_status(job_id)
+        return {
+            "status": job.status,
+            "completed": job.completed,
+            "total": job.total,
+            "credits_used": job.credits_used,
+            "data": [document_to_dict(doc) for doc in job.data or []],
+        }
+
+
+def get_crawl_client() -> CrawlClient | None:
+    """Build a Firecrawl client from the environment.
+
+    Returns:
+        FirecrawlClient, or None when FIRECRAWL_API_KEY is not set
+    """
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    if not api_key:
+        return None
+    return FirecrawlClient(api_key, os.getenv("FIRECRAWL_API_URL", DEFAULT_API_URL))
+
+
+async def stream_batch(
+    client: CrawlClient,
+    urls: list[str],
+    formats: list,
+    poll_interval: float = 2.0,
+    timeout: float = 900.0,
+) -> AsyncIterator[dict]:
+    """Submit a batch job and yield documents as soon as they finish.
+
+    Polling runs in a worker thread, so several batches can be streamed
+    concurrently from one event loop.
+
+    Args:
+        client: Crawl client
+        urls: Pages to scrape
+        formats: Firecrawl formats for every page
+        poll_interval: Seconds between status polls
+        timeout: Give up after this many seconds
+
+    Yields:
+        Document dictionaries with an added ``latency_ms`` since submission
+    """
+    if not urls:
+        return
+    start = time.perf_counter()
+    job_id = await asyncio.to_thread(client.start_batch, urls, formats)
+    logger.info(f"Submitted batch {job_id} with {len(urls)} pages")
+
+    seen: set[str] = set()
+    while True:
+        status = await asyncio.to_thread(client.batch_status, job_id)
+        for doc in status["data"]:
+            key = doc.get("url") or str(len(seen))
+            if key in seen:
+                continue
+            seen.add(key)
+            doc["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            yield doc
+
+        if status["status"] in FINISHED_STATES:
+            logger.info(
+                f"Batch {job_id} {status['status']}: "
+                f"{status['completed']}/{status['total']} pages"
+            )
+            return
+        if time.perf_counter() - start > timeout:
+            logger.warning(f"Batch {job_id} timed out after {timeout:.0f}s")
+            return
+        await asyncio.sleep(poll_interval)
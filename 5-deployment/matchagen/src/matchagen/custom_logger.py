@@ -1,19 +1,183 @@
-"""Custom logger configuration using loguru."""
+"""Custom logger configuration using loguru.
 
+Log records are handed to a background thread through a bounded queue, so
+callers never wait for stdout. When the queue is full, records are dropped
+and counted instead of blocking the serving path. Logging is configured from
+environment variables:
+
+    LOG_LEVEL              minimum level (default INFO)
+    LOG_FORMAT             "text" or "json" (default text)
+    LOG_DEBUG_SAMPLE_RATE  fraction of requests whose DEBUG payloads, such as
+                           raw model output, are logged (default 0.01)
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
 import sys
+import threading
+import traceback
 
 from loguru import logger
 
-# Remove default logger
-logger.remove()
-
-# Add custom logger with formatting
-logger.add(
-    sys.stdout,
-    format=(
-        "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-        "<level>{level: <8}</level> | "
-        "<level>{message}</level>"
-    ),
-    level="INFO",
+from matchagen.metrics import Counter
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "{extra[request_id]} | "
+    "<level>{message}</level>"
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "matchagen_log_records_dropped_total",
+    "Log records dropped because the log queue was full",
 )
+
+
+class AsyncSink:
+    """Loguru sink that writes from a background thread.
+
+    JSON lines are also rendered on that thread, so the logging call only
+    pays for putting the record on the queue.
+    """
+
+    def __init__(self, stream=sys.stdout, serialize: bool = False, maxsize=10000):
+        """Start the writer thread.
+
+        Args:
+            stream: Text stream to write to
+            serialize: Write one JSON object per line instead of text
+            maxsize: Records buffered before new ones are dropped
+        """
+        self.stream = stream
+        self.serialize = serialize
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+    def stop(self):
+        """Write everything still queued and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            # Write whatever else is queued before a single flush
+            lines = []
+            while message is not None:
+                lines.append(self._render(message))
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.stream.write("".join(lines))
+            self.stream.flush()
+            if message is None:
+                return
+
+    def _render(self, message) -> str:
+        if not self.serialize:
+            return str(message)
+        record = message.record
+        entry = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "message": record["message"],
+            "logger": f"{record['name']}:{record['function']}:{record['line']}",
+        }
+        entry.update({k: v for k, v in record["extra"].items() if k != "sampled"})
+        if record["exception"] is not None:
+            exc_type, exc_value, exc_traceback = record["exception"]
+            entry["exception"] = "".join(
+                traceback.format_exception(exc_type, exc_value, exc_traceback)
+            )
+        return json.dumps(entry, default=str) + "\n"
+
+
+def sampling_filter(level: str, rate: float):
+    """Build a filter that keeps records below ``level`` for sampled requests only.
+
+    Requests decide once (the ``sampled`` extra set by the backend), so a
+    sampled request logs all of its debug payloads. Records outside a request
+    are sampled one by one.
+
+    Args:
+        level: Minimum level that is always kept
+        rate: Fraction of requests whose lower-level records are kept
+    """
+    level_no = logger.level(level).no
+    debug_no = logger.level("DEBUG").no
+
+    def keep(record) -> bool:
+        if record["level"].no >= level_no:
+            return True
+        if record["level"].no < debug_no:
+            return False
+        sampled = record["extra"].get("sampled")
+        return sampled if sampled is not None else random.random() < rate
+
+    return keep
+
+
+_debug_sample_rate = 0.0
+
+
+def sample_request() -> bool:
+    """Decide whether a new request logs its debug payloads."""
+    return random.random() < _debug_sample_rate
+
+
+def configure_logging(
+    level: str | None = None,
+    fmt: str | None = None,
+    debug_sample_rate: float | None = None,
+) -> AsyncSink:
+    """Replace all loguru sinks with one asynchronous stdout sink.
+
+    Arguments default to the LOG_* environment variables.
+
+    Args:
+        level: Minimum level that is always logged
+        fmt: "text" or "json"
+        debug_sample_rate: Fraction of requests whose DEBUG records are logged
+
+    Returns:
+        The installed sink
+    """
+    global _debug_sample_rate
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+    _debug_sample_rate = debug_sample_rate
+
+    logger.remove()
+    logger.configure(extra={"request_id": "-"})
+    sink = AsyncSink(sys.stdout, serialize=fmt == "json")
+    logger.add(
+        sink,
+        level=min(logger.level(level).no, logger.level("DEBUG").no),
+        format="{message}" if fmt == "json" else TEXT_FORMAT,
+        filter=sampling_filter(level, debug_sample_rate),
+        colorize=fmt != "json" and sys.stdout.isatty(),
+    )
+    return sink
+
+
+# Drain the queue on exit
+atexit.register(logger.remove)
+
+configure_logging()
@@ -1,18 +1,26 @@
 """Data collection module for scraping matcha recipes from websites."""
 
+import asyncio
 import json
 import os
 import time
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from firecrawl import Firecrawl
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from matchagen.crawlclient import CrawlClient, get_crawl_client, stream_batch
+from matchagen.htmlparse import (  # noqa: F401
+    extract_recipe_from_json_ld,
+    parse_recipe_html,
+)
+from matchagen.mdparse import recipes_from_page, tokenize_markdown
+from matchagen.telemetry import firecrawl_stats, telemetry
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -49,57 +57,7 @@ def parse_recipes_from_markdown(markdown: str, url: str) -> list[dict]:
     Returns:
         List of recipe dictionaries
     """
-    import re
-
-    recipes = []
-
-    # Look for common recipe patterns in markdown
-    # Pattern 1: Ingredients and Instructions sections
-    ingredients_pattern = (
-        r"(?:##?\s*Ingredients?|INGREDIENTS?)[:\s]*\n(.*?)(?=##|$)"  # noqa: E501
-    )
-    instructions_pattern = r"(?:##?\s*(?:Instructions?|Directions?|Method|Steps?)|INSTRUCTIONS?)[:\s]*\n(.*?)(?=##|$)"  # noqa: E501
-
-    ingredients_match = re.search(
-        ingredients_pattern, markdown, re.IGNORECASE | re.DOTALL
-    )
-    instructions_match = re.search(
-        instructions_pattern, markdown, re.IGNORECASE | re.DOTALL
-    )
-
-    if ingredients_match and instructions_match:
-        # Extract ingredients
-        ingredients_text = ingredients_match.group(1)
-        ingredients = [
-            line.strip().lstrip("-*•").strip()
-            for line in ingredients_text.split("\n")
-            if line.strip() and not line.strip().startswith("#")
-        ]
-
-        # Extract instructions
-        instructions_text = instructions_match.group(1)
-        instructions = [
-            line.strip().lstrip("0123456789.-*•").strip()
-            for line in instructions_text.split("\n")
-            if line.strip()
-            and not line.strip().startswith("#")
-            and len(line.strip()) > 10
-        ]
-
-        if ingredients and instructions:
-            # Try to find title
-            title_match = re.search(r"^#\s+(.+)$", markdown, re.MULTILINE)
-            title = title_match.group(1) if title_match else "Matcha Recipe"
-
-            recipes.append(
-                {
-                    "title": title,
-                    "ingredients": ingredients[:20],  # Limit to 20
-                    "instructions": instructions[:15],  # Limit to 15
-                }
-            )
-
-    return recipes
+    return recipes_from_page(tokenize_markdown(markdown, url))
 
 
 def extract_pagination_info(markdown: str) -> int:
@@ -111,21 +69,7 @@ def extract_pagination_info(markdown: str) -> int:
     Returns:
         Maximum page number (1 if no pagination found)
     """
-    import re
-
-    # Look for pagination patterns
-    page_numbers = []
-
-    # Pattern 1: page=N in URLs
-    page_matches = re.findall(r"page[=\s]+(\d+)", markdown, re.IGNORECASE)
-    page_numbers.extend([int(p) for p in page_matches])
-
-    # Pattern 2: Standalone numbers that could be page numbers
-    # Look for sequences like [1] [2] [3] ... [26]
-    bracket_numbers = re.findall(r"\[(\d+)\]", markdown)
-    page_numbers.extend([int(n) for n in bracket_numbers if int(n) < 100])
-
-    return max(page_numbers) if page_numbers else 1
+    return tokenize_markdown(markdown).max_page
 
 
 def extract_recipe_links_from_markdown(
@@ -140,97 +84,7 @@ def extract_recipe_links_from_markdown(
     Returns:
         List of recipe URLs
     """
-    import re
-    from urllib.parse import urljoin, urlparse
-
-    links = []
-    base_domain = urlparse(base_url).netloc
-
-    # Method 1: Find plain recipe URLs in text
-    url_pattern = r"https://[^\s\)]+/blogs/[^\s\)]*/[a-z0-9-]+"
-    plain_urls = re.findall(url_pattern, markdown)
-    for url in plain_urls:
-        if urlparse(url).netloc == base_domain:
-            skip_patterns = [
-                "/tagged",
-                "/account",
-                "/checkout",
-                "/policies",
-                "/pages",
-                "/collections",
-            ]
-            if not any(pattern in url for pattern in skip_patterns):
-                links.append(url)
-
-    # Method 2: Find markdown formatted links [text](url)
-    link_pattern = r"\[([^\]]+)\]\(([^\)]+)\)"
-    matches = re.findall(link_pattern, markdown)
-
-    for text, url in matches:
-        # Skip if URL is empty or just an anchor
-        if not url or url.startswith("#"):
-            continue
-
-        # Skip images, CSS, JS files
-        if any(
-            ext in url.lower()
-            for ext in [
-                ".jpg",
-                ".jpeg",
-                ".png",
-                ".gif",
-                ".svg",
-                ".css",
-                ".js",
-                ".ico",
-            ]
-        ):
-            continue
-
-        # Only include links that look like recipes
-        text_lower = text.lower()
-        url_lower = url.lower()
-
-        # Check if it's a recipe path (e.g., /blogs/matcha-recipes/recipe-name)
-        is_recipe_path = (
-            "/blogs/" in url_lower
-            and "/matcha-recipes/" in url_lower
-            and url_lower.count("/") >= 4
-        )
-
-        # Or contains recipe keywords
-        has_keywords = any(
-            keyword in text_lower
-            for keyword in ["recipe", "latte", "smoothie", "dessert", "cake"]
-        )
-
-        if is_recipe_path or has_keywords:
-            # Make absolute URL
-            if url.startswith("http"):
-                full_url = url
-            elif url.startswith("/"):
-                full_url = urljoin(base_url, url)
-            else:
-                continue
-
-            # Only include links from same domain
-            if urlparse(full_url).netloc == base_domain:
-                # Skip pagination, tagged, and other system links
-                skip_patterns = [
-                    "page=",
-                    "?page",
-                    "/tagged/",
-                    "/account/",
-                    "/checkout",
-                    "/policies/",
-                    "/pages/",
-                    "/collections/",
-                    "/cdn/",
-                ]
-                if not any(pattern in full_url for pattern in skip_patterns):
-                    links.append(full_url)
-
-    return list(set(links))  # Remove duplicates
+    return tokenize_markdown(markdown, base_url).links
 
 
 def is_valid_recipe(recipe) -> bool:
@@ -270,6 +124,65 @@ def is_valid_recipe(recipe) -> bool:
     return has_ingredients and has_instructions
 
 
+def recipes_from_firecrawl_json(extracted) -> list[dict]:
+    """Collect valid recipes from a Firecrawl JSON-schema extraction.
+
+    Args:
+        extracted: ``json`` payload of a Firecrawl Document
+
+    Returns:
+        List of valid recipe dictionaries
+    """
+    logger.debug(f"Extracted type: {type(extracted)}")
+    # Ensure extracted is a dict or list, not a Document object
+    if hasattr(extracted, "__dict__"):
+        # Convert Document-like objects to dict
+        try:
+            extracted = dict(extracted)
+        except Exception as e:
+            logger.debug(f"Could not convert to dict: {e}")
+            return []
+
+    # Handle both single recipe and list of recipes
+    if isinstance(extracted, dict):
+        return [extracted] if is_valid_recipe(extracted) else []
+    if isinstance(extracted, list):
+        return [r for r in extracted if is_valid_recipe(r)]
+    return []
+
+
+def paginated_urls(url: str, max_page: int, limit: int = 30) -> list[str]:
+    """Build the listing URLs for pages 1..max_page of a paginated blog.
+
+    Args:
+        url: URL of the first listing page
+        max_page: Number of pages detected
+        limit: Upper bound on pages, for safety
+
+    Returns:
+        List of URLs with a ``page`` query parameter
+    """
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+    urls = []
+    for page_num in range(1, min(max_page, limit) + 1):
+        query_params["page"] = [str(page_num)]
+        new_query = urlencode(query_params, doseq=True)
+        urls.append(
+            urlunparse(
+                (
+                    parsed_url.scheme,
+                    parsed_url.netloc,
+                    parsed_url.path,
+                    "",
+                    new_query,
+                    "",
+                )
+            )
+        )
+    return urls
+
+
 def scrape_with_firecrawl(
     url: str, visited: set[str] | None = None, depth: int = 0
 ) -> list[dict]:
@@ -302,64 +215,57 @@ def scrape_with_firecrawl(
         firecrawl = Firecrawl(api_key=api_key)
 
         # Try structured data extraction first
-        result = firecrawl.scrape(
-            url,
-            formats=[{"type": "json", "schema": Recipe.model_json_schema()}],
-        )
+        with telemetry.track(url, "firecrawl", kind="json") as record:
+            result = firecrawl.scrape(
+                url,
+                formats=[{"type": "json", "schema": Recipe.model_json_schema()}],
+            )
+            record["bytes"], record["credits"], record["status"] = firecrawl_stats(
+                result
+            )
 
-        # Debug logging
-        logger.debug(f"Firecrawl result type: {type(result)}")
-        if result and hasattr(result, "json"):
-            logger.debug(f"JSON result type: {type(result.json)}")
-            logger.debug(f"JSON result: {result.json}")
-
-        # Extract recipes from result (result is a Document object)
-        recipes = []
-        if result and hasattr(result, "json") and result.json:
-            extracted = result.json
-            logger.debug(f"Extracted type: {type(extracted)}")
-            # Ensure extracted is a dict or list, not a Document object
-            if hasattr(extracted, "__dict__"):
-                # Convert Document-like objects to dict
-                try:
-                    extracted = dict(extracted)
-                except Exception as e:
-                    logger.debug(f"Could not convert to dict: {e}")
-                    extracted = None
-
-            if extracted:
-                # Handle both single recipe and list of recipes
-                if isinstance(extracted, dict):
-                    if is_valid_recipe(extracted):
-                        recipes.append(extracted)
-                elif isinstance(extracted, list):
-                    valid_recipes = [
-                        r for r in extracted if is_valid_recipe(r)
-                    ]  # noqa: E501
-                    recipes.extend(valid_recipes)
+            # Debug logging
+            logger.debug(f"Firecrawl result type: {type(result)}")
+            if result and hasattr(result, "json"):
+                logger.debug(f"JSON result type: {type(result.json)}")
+                logger.debug(f"JSON result: {result.json}")
+
+            # Extract recipes from result (result is a Document object)
+            recipes = []
+            if result and hasattr(result, "json") and result.json:
+                recipes = recipes_from_firecrawl_json(result.json)
+            if recipes:
+                record.update(stage="json_schema", recipes=len(recipes))
 
         # If no recipes found, try markdown approach
-        markdown_text = None
+        md_page = None
         if not recipes:
             logger.debug("No recipes from JSON schema, trying markdown")
-            md_result = firecrawl.scrape(url, formats=["markdown"])
-            logger.debug(f"Markdown result type: {type(md_result)}")
-
-            # Check if markdown extraction succeeded
-            if md_result and hasattr(md_result, "markdown"):
-                markdown_text = md_result.markdown
-                if markdown_text:
-                    logger.debug(f"Markdown length: {len(markdown_text)}")
-                    # Try to parse recipes from markdown
-                    parsed = parse_recipes_from_markdown(markdown_text, url)
-                    recipes.extend([r for r in parsed if is_valid_recipe(r)])
+            with telemetry.track(url, "firecrawl", kind="markdown") as record:
+                md_result = firecrawl.scrape(url, formats=["markdown"])
+                record["bytes"], record["credits"], record["status"] = (
+                    firecrawl_stats(md_result)
+                )
+                logger.debug(f"Markdown result type: {type(md_result)}")
+
+                # Check if markdown extraction succeeded
+                if md_result and hasattr(md_result, "markdown"):
+                    markdown_text = md_result.markdown
+                    if markdown_text:
+                        logger.debug(f"Markdown length: {len(markdown_text)}")
+                        # Tokenize once: recipes, links and pagination together
+                        md_page = tokenize_markdown(markdown_text, url)
+                        parsed = recipes_from_page(md_page)
+                        recipes.extend([r for r in parsed if is_valid_recipe(r)])
+                if recipes:
+                    record.update(stage="markdown", recipes=len(recipes))
 
         # If still no recipes and we have markdown, try extracting links
-        if not recipes and markdown_text and depth == 0:
+        if not recipes and md_page and depth == 0:
             logger.debug("No recipes found, looking for recipe links")
 
             # Check for pagination
-            max_page = extract_pagination_info(markdown_text)
+            max_page = md_page.max_page
 
             # For known paginated sites, try more pages
             if "jadeleafmatcha.com" in url:
@@ -372,49 +278,35 @@ def scrape_with_firecrawl(
 
             # If paginated, scrape all pages (limit to 30 for safety)
             if max_page > 1:
-                from urllib.parse import (parse_qs, urlencode, urlparse,
-                                          urlunparse)
-
-                parsed_url = urlparse(url)
-                base_path = parsed_url.path
-                query_params = parse_qs(parsed_url.query)
-
-                for page_num in range(1, min(max_page + 1, 31)):
-                    # Build paginated URL
-                    query_params["page"] = [str(page_num)]
-                    new_query = urlencode(query_params, doseq=True)
-                    page_url = urlunparse(
-                        (
-                            parsed_url.scheme,
-                            parsed_url.netloc,
-                            base_path,
-                            "",
-                            new_query,
-                            "",
-                        )
-                    )
-
+                for page_num, page_url in enumerate(
+                    paginated_urls(url, max_page), 1
+                ):
                     page_info = f"page {page_num}/{max_page}"
                     logger.info(f"Scraping {page_info}: {page_url}")  # noqa: E501
 
                     # Get markdown for this page
-                    page_result = firecrawl.scrape(
-                        page_url, formats=["markdown"]
-                    )  # noqa: E501
-                    if page_result and hasattr(page_result, "markdown"):
-                        page_links = extract_recipe_links_from_markdown(
-                            page_result.markdown, page_url
+                    with telemetry.track(
+                        page_url, "firecrawl", kind="listing"
+                    ) as record:
+                        page_result = firecrawl.scrape(
+                            page_url, formats=["markdown"]
                         )  # noqa: E501
-                        all_recipe_links.extend(page_links)
-                        link_count = len(page_links)
-                        logger.info(f"Found {link_count} links on {page_info}")
+                        record["bytes"], record["credits"], record["status"] = (
+                            firecrawl_stats(page_result)
+                        )
+                        if page_result and hasattr(page_result, "markdown"):
+                            page_links = extract_recipe_links_from_markdown(
+                                page_result.markdown, page_url
+                            )  # noqa: E501
+                            all_recipe_links.extend(page_links)
+                            link_count = len(page_links)
+                            record.update(stage="links", links=link_count)
+                            logger.info(f"Found {link_count} links on {page_info}")
 
                     time.sleep(2)  # Be polite between page requests
             else:
                 # No pagination, just extract from current page
-                all_recipe_links = extract_recipe_links_from_markdown(
-                    markdown_text, url
-                )
+                all_recipe_links = md_page.links
 
             # Remove duplicates
             all_recipe_links = list(set(all_recipe_links))
@@ -439,6 +331,160 @@ def scrape_with_firecrawl(
         return []
 
 
+BATCH_SIZE = 25
+
+
+def recipes_from_document(doc: dict, kind: str = "page") -> list[dict]:
+    """Parse a streamed Firecrawl document and record its telemetry.
+
+    The JSON-schema extraction is used when it holds a valid recipe, the
+    markdown of the same document is the fallback.
+
+    Args:
+        doc: Document dictionary from a :class:`CrawlClient`
+        kind: Telemetry kind for the record
+
+    Returns:
+        List of valid recipe dictionaries
+    """
+    markdown = doc.get("markdown") or ""
+    stage = None
+    recipes = recipes_from_firecrawl_json(doc["json"]) if doc.get("json") else []
+    if recipes:
+        stage = "json_schema"
+    elif markdown:
+        parsed = recipes_from_page(tokenize_markdown(markdown, doc["url"]))
+        recipes = [r for r in parsed if is_valid_recipe(r)]
+        stage = "markdown" if recipes else None
+
+    size = len(markdown) + (len(json.dumps(doc["json"])) if doc.get("json") else 0)
+    telemetry.record(
+        doc["url"],
+        "firecrawl-batch",
+        kind=kind,
+        latency_ms=doc.get("latency_ms"),
+        status=doc.get("status_code"),
+        bytes=size,
+        credits=doc.get("credits"),
+        stage=stage,
+        recipes=len(recipes),
+    )
+    return recipes
+
+
+async def scrape_with_firecrawl_batch_async(
+    url: str, client: CrawlClient, batch_size: int = BATCH_SIZE
+) -> list[dict]:
+    """Scrape a site through Firecrawl batch jobs, parsing pages as they stream.
+
+    The root page is fetched once with both the JSON schema and markdown
+    formats. Listing pages are submitted as one batch job; recipe links found
+    on them are submitted in chunks of ``batch_size`` while the listing job is
+    still running, and every finished document is parsed immediately.
+
+    Args:
+        url: URL of a recipe or listing page
+        client: Crawl client
+        batch_size: Recipe pages per batch job
+
+    Returns:
+        List of recipe dictionaries
+    """
+    formats = [{"type": "json", "schema": Recipe.model_json_schema()}, "markdown"]
+
+    with telemetry.track(url, "firecrawl", kind="page") as record:
+        root = await asyncio.to_thread(client.scrape, url, formats)
+        record["status"], record["credits"] = root["status_code"], root["credits"]
+        record["bytes"] = len(root.get("markdown") or "")
+        recipes = recipes_from_firecrawl_json(root["json"]) if root["json"] else []
+        md_page = tokenize_markdown(root.get("markdown") or "", url)
+        if not recipes:
+            parsed = recipes_from_page(md_page)
+            recipes = [r for r in parsed if is_valid_recipe(r)]
+            record["stage"] = "markdown" if recipes else None
+        else:
+            record["stage"] = "json_schema"
+        record["recipes"] = len(recipes)
+    if recipes:
+        logger.info(f"Extracted {len(recipes)} recipes from {url}")
+        return recipes
+
+    max_page = md_page.max_page
+    if "jadeleafmatcha.com" in url:
+        max_page = max(max_page, 26)  # We know Jade Leaf has 26 pages
+    logger.info(f"Detected pagination: {max_page} pages")
+
+    seen_links: set[str] = {url}
+    pending: list[str] = []
+    jobs: list[asyncio.Task] = []
+
+    async def scrape_recipe_batch(links: list[str]) -> list[dict]:
+        found = []
+        async for doc in stream_batch(client, links, formats):
+            found.extend(recipes_from_document(doc))
+        return found
+
+    def queue_links(links: list[str], flush: bool = False):
+        pending.extend(link for link in links if link not in seen_links)
+        seen_links.update(links)
+        while len(pending) >= batch_size or (flush and pending):
+            chunk = pending[:batch_size]
+            del pending[:batch_size]
+            jobs.append(asyncio.create_task(scrape_recipe_batch(chunk)))
+
+    if max_page > 1:
+        listing_urls = paginated_urls(url, max_page)
+        async for doc in stream_batch(client, listing_urls, ["markdown"]):
+            page_links = tokenize_markdown(doc.get("markdown") or "", doc["url"]).links
+            telemetry.record(
+                doc["url"],
+                "firecrawl-batch",
+                kind="listing",
+                latency_ms=doc.get("latency_ms"),
+                status=doc.get("status_code"),
+                bytes=len(doc.get("markdown") or ""),
+                credits=doc.get("credits"),
+                stage="links",
+                links=len(page_links),
+            )
+            logger.info(f"Found {len(page_links)} links on {doc['url']}")
+            queue_links(page_links)
+    queue_links(md_page.links, flush=True)
+
+    total_links = len(seen_links) - 1
+    logger.info(f"Total {total_links} unique recipe links in {len(jobs)} batches")
+    for found in await asyncio.gather(*jobs):
+        recipes.extend(found)
+
+    logger.info(f"Extracted {len(recipes)} recipes from {url}")
+    return recipes
+
+
+def scrape_with_firecrawl_batch(
+    url: str, client: CrawlClient | None = None, batch_size: int = BATCH_SIZE
+) -> list[dict]:
+    """Scrape recipes using Firecrawl batch jobs instead of one call per page.
+
+    Args:
+        url: URL of a recipe or listing page
+        client: Crawl client (defaults to one built from the environment)
+        batch_size: Recipe pages per batch job
+
+    Returns:
+        List of recipe dictionaries
+    """
+    client = client or get_crawl_client()
+    if client is None:
+        logger.warning("FIRECRAWL_API_KEY not set, skipping Firecrawl")
+        return []
+
+    try:
+        return asyncio.run(scrape_with_firecrawl_batch_async(url, client, batch_size))
+    except Exception as e:
+        logger.warning(f"Firecrawl batch scrape failed for {url}: {e}")
+        return []
+
+
 def scrape_recipe_page(
     url: str, visited: set[str] | None = None
 ) -> list[dict]:  # noqa: E501
@@ -474,191 +520,38 @@ def scrape_recipe_page(
                 "Chrome/91.0.4472.124 Safari/537.36"
             )
         }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Try to find recipe structured data (JSON-LD)
-        json_ld = soup.find("script", {"type": "application/ld+json"})
-        if json_ld:
-            try:
-                data = json.loads(json_ld.string)
-                if isinstance(data, list):
-                    data = data[0] if data else {}
-                if data.get("@type") == "Recipe":
-                    recipe = extract_recipe_from_json_ld(data)
-                    if recipe:
-                        recipes.append(recipe)
-                        return recipes
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Fallback: Try to find recipe links and scrape them
-        if ("/recipes" in url or "/matcha-recipes" in url) and len(
-            visited
-        ) < 50:  # noqa: E501
-            recipe_links = find_recipe_links(soup, url)
-            for link in recipe_links[:10]:  # Limit to 10 recipes per listing
+        # Listing pages: JSON-LD first, otherwise follow recipe links
+        is_listing = (
+            "/recipes" in url or "/matcha-recipes" in url
+        ) and len(visited) < 50
+        with telemetry.track(url, "http") as record:
+            response = requests.get(url, headers=headers, timeout=30)
+            record.update(status=response.status_code, bytes=len(response.content))
+            response.raise_for_status()
+
+            page = parse_recipe_html(response.content, url, with_links=is_listing)
+            record.update(stage=page["stage"], recipes=len(page["recipes"]))
+            if page["links"]:
+                record["links"] = len(page["links"])
+
+        if page["recipes"]:
+            logger.debug(f"Parsed {url} via {page['stage']}")
+            recipes.extend(page["recipes"])
+            return recipes
+
+        if is_listing:
+            for link in page["links"][:10]:  # Limit to 10 recipes per listing
                 if link not in visited:
                     time.sleep(1)  # Be polite
                     recipes.extend(scrape_recipe_page(link, visited))
             return recipes
 
-        # Try to extract recipe from page structure
-        recipe = extract_recipe_from_html(soup, url)
-        if recipe:
-            recipes.append(recipe)
-
     except Exception as e:
         logger.warning(f"Failed to scrape {url}: {e}")
 
     return recipes
 
 
-def extract_recipe_from_json_ld(data: dict) -> dict | None:
-    """Extract recipe from JSON-LD structured data.
-
-    Args:
-        data: JSON-LD data dictionary
-
-    Returns:
-        Recipe dictionary or None
-    """
-    try:
-        recipe = {
-            "title": data.get("name", "Matcha Recipe"),
-            "ingredients": [],
-            "instructions": [],
-        }
-
-        # Extract ingredients
-        ingredients = data.get("recipeIngredient", [])
-        if isinstance(ingredients, list):
-            recipe["ingredients"] = ingredients
-        elif isinstance(ingredients, str):
-            recipe["ingredients"] = [ingredients]
-
-        # Extract instructions
-        instructions = data.get("recipeInstructions", [])
-        if isinstance(instructions, list):
-            for step in instructions:
-                if isinstance(step, dict):
-                    text = step.get("text", "")
-                elif isinstance(step, str):
-                    text = step
-                else:
-                    continue
-                if text:
-                    recipe["instructions"].append(text)
-        elif isinstance(instructions, str):
-            recipe["instructions"] = [instructions]
-
-        if recipe["ingredients"] and recipe["instructions"]:
-            return recipe
-    except Exception:
-        pass
-    return None
-
-
-def find_recipe_links(soup: BeautifulSoup, base_url: str) -> list[str]:
-    """Find recipe links on a recipe listing page.
-
-    Args:
-        soup: BeautifulSoup object
-        base_url: Base URL for relative links
-
-    Returns:
-        List of recipe URLs
-    """
-    links = []
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        if any(
-            keyword in href.lower()
-            for keyword in ["recipe", "matcha", "latte", "smoothie"]
-        ):
-            if href.startswith("http"):
-                links.append(href)
-            elif href.startswith("/"):
-                links.append(urljoin(base_url, href))
-    return list(set(links))  # Remove duplicates
-
-
-def extract_recipe_from_html(soup: BeautifulSoup, url: str) -> dict | None:
-    """Extract recipe from HTML structure.
-
-    Args:
-        soup: BeautifulSoup object
-        url: URL of the page
-
-    Returns:
-        Recipe dictionary or None
-    """
-    try:
-        # Try common selectors for recipe title
-        title = None
-        for selector in ["h1", ".recipe-title", ".entry-title", "h1.title"]:
-            elem = soup.select_one(selector)
-            if elem:
-                title = elem.get_text(strip=True)
-                break
-        if not title:
-            title = "Matcha Recipe"
-
-        # Try to find ingredients
-        ingredients = []
-        for selector in [
-            ".ingredients li",
-            ".recipe-ingredients li",
-            '[itemprop="recipeIngredient"]',
-            ".ingredient",
-        ]:
-            elems = soup.select(selector)
-            if elems:
-                ingredients = [elem.get_text(strip=True) for elem in elems]
-                break
-
-        # Try to find instructions
-        instructions = []
-        for selector in [
-            ".instructions li",
-            ".recipe-instructions li",
-            '[itemprop="recipeInstructions"] li',
-            ".instruction-step",
-            ".step",
-        ]:
-            elems = soup.select(selector)
-            if elems:
-                instructions = [elem.get_text(strip=True) for elem in elems]
-                break
-
-        # If no list items, try paragraphs
-        if not instructions:
-            for selector in [
-                ".instructions p",
-                ".recipe-instructions p",
-                ".directions p",
-            ]:
-                elems = soup.select(selector)
-                if elems:
-                    instructions = [
-                        elem.get_text(strip=True)
-                        for elem in elems
-                        if elem.get_text(strip=True)
-                    ]
-                    break
-
-        if ingredients and instructions:
-            return {
-                "title": title,
-                "ingredients": ingredients,
-                "instructions": instructions,
-            }
-    except Exception:
-        pass
-    return None
-
-
 def format_recipe(recipe: dict) -> str:
     """Format a recipe dictionary as readable text.
 
@@ -714,10 +607,14 @@ def load_or_scrape_data(data_config: dict) -> Path:
 
     logger.info("Scraping matcha recipes from websites...")
     all_recipes = []
+    batch_mode = data_config.get("firecrawl_mode", "single") == "batch"
 
     for url in RECIPE_URLS:
         # Try Firecrawl first
-        recipes = scrape_with_firecrawl(url)
+        if batch_mode:
+            recipes = scrape_with_firecrawl_batch(url)
+        else:
+            recipes = scrape_with_firecrawl(url)
 
         # Fall back to BeautifulSoup if Firecrawl fails
         if not recipes:
@@ -779,10 +676,23 @@ def get_fallback_recipes() -> list[dict]:
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape matcha recipes")
+    parser.add_argument(
+        "--firecrawl-mode",
+        choices=["single", "batch"],
+        default=os.getenv("FIRECRAWL_MODE", "single"),
+        help="One scrape call per page, or Firecrawl batch jobs",
+    )
+
+    args = parser.parse_args()
+
     # Test the scraper
     test_config = {
         "assets_dir": "assets",
         "filename": "matcha_recipes.txt",
+        "firecrawl_mode": args.firecrawl_mode,
     }
     data_file = load_or_scrape_data(test_config)
     print(f"Data saved to: {data_file}")
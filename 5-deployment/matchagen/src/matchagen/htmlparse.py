@@ -0,0 +1,339 @@
+"""Fast HTML recipe extraction with selectolax/lxml backends.
+
+The parser reads every JSON-LD block of a page in one pass, walks ``@graph``
+containers and only falls back to CSS selector heuristics when no structured
+recipe is present. selectolax is preferred, lxml is used when selectolax is not
+installed and BeautifulSoup remains the last resort.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urljoin
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - optional dependency
+    HTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # pragma: no cover - optional dependency
+    lxml = None
+    CSSSelector = None
+
+if HTMLParser is not None:
+    BACKEND = "selectolax"
+elif CSSSelector is not None:
+    BACKEND = "lxml"
+else:
+    BACKEND = "bs4"
+
+JSON_LD_SELECTOR = 'script[type="application/ld+json"]'
+
+TITLE_SELECTORS = ["h1", ".recipe-title", ".entry-title", "h1.title"]
+INGREDIENT_SELECTORS = [
+    ".ingredients li",
+    ".recipe-ingredients li",
+    '[itemprop="recipeIngredient"]',
+    ".ingredient",
+]
+INSTRUCTION_SELECTORS = [
+    ".instructions li",
+    ".recipe-instructions li",
+    '[itemprop="recipeInstructions"] li',
+    ".instruction-step",
+    ".step",
+]
+INSTRUCTION_PARAGRAPH_SELECTORS = [
+    ".instructions p",
+    ".recipe-instructions p",
+    ".directions p",
+]
+LINK_KEYWORDS = ("recipe", "matcha", "latte", "smoothie")
+
+
+class _Page:
+    """Backend-neutral view of a parsed HTML document."""
+
+    def __init__(self, html: str | bytes, backend: str = BACKEND):
+        self.backend = backend
+        if backend == "selectolax":
+            self._tree = HTMLParser(html)
+        elif backend == "lxml":
+            self._tree = lxml.html.fromstring(html)
+        else:
+            from bs4 import BeautifulSoup
+
+            self._tree = BeautifulSoup(html, "html.parser")
+
+    def texts(self, selector: str) -> list[str]:
+        """Return the stripped text of every element matching ``selector``."""
+        if self.backend == "selectolax":
+            return [n.text(strip=True) for n in self._tree.css(selector)]
+        if self.backend == "lxml":
+            return [
+                " ".join(e.text_content().split())
+                for e in _compiled_selector(selector)(self._tree)
+            ]
+        return [e.get_text(strip=True) for e in self._tree.select(selector)]
+
+    def first_text(self, selector: str) -> str | None:
+        """Return the text of the first element matching ``selector``."""
+        if self.backend == "selectolax":
+            node = self._tree.css_first(selector)
+            return node.text(strip=True) if node is not None else None
+        if self.backend == "lxml":
+            found = _compiled_selector(selector)(self._tree)
+            return " ".join(found[0].text_content().split()) if found else None
+        elem = self._tree.select_one(selector)
+        return elem.get_text(strip=True) if elem else None
+
+    def raw_texts(self, selector: str) -> list[str]:
+        """Return unstripped element text, used for ``<script>`` bodies."""
+        if self.backend == "selectolax":
+            return [n.text(deep=True) for n in self._tree.css(selector)]
+        if self.backend == "lxml":
+            return [e.text or "" for e in _compiled_selector(selector)(self._tree)]
+        return [e.string or "" for e in self._tree.select(selector)]
+
+    def hrefs(self) -> list[str]:
+        """Return the ``href`` of every anchor on the page."""
+        if self.backend == "selectolax":
+            return [
+                n.attributes["href"]
+                for n in self._tree.css("a[href]")
+                if n.attributes.get("href")
+            ]
+        if self.backend == "lxml":
+            return self._tree.xpath("//a/@href")
+        return [a["href"] for a in self._tree.find_all("a", href=True)]
+
+
+_SELECTOR_CACHE: dict[str, "CSSSelector"] = {}
+
+
+def _compiled_selector(selector: str) -> "CSSSelector":
+    """Compile an lxml CSS selector once per process."""
+    compiled = _SELECTOR_CACHE.get(selector)
+    if compiled is None:
+        compiled = _SELECTOR_CACHE[selector] = CSSSelector(selector)
+    return compiled
+
+
+def _is_recipe_type(node: dict) -> bool:
+    """Check whether a JSON-LD node declares ``@type`` Recipe."""
+    node_type = node.get("@type")
+    if isinstance(node_type, list):
+        return "Recipe" in node_type
+    return node_type == "Recipe"
+
+
+def iter_json_ld_recipes(data) -> Iterator[dict]:
+    """Yield every Recipe node in a JSON-LD document.
+
+    Args:
+        data: Decoded JSON-LD payload (dict or list), possibly with ``@graph``
+
+    Yields:
+        JSON-LD dictionaries whose ``@type`` is Recipe
+    """
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if _is_recipe_type(node):
+                yield node
+            elif "@graph" in node:
+                stack.append(node["@graph"])
+
+
+def _instruction_texts(instructions) -> list[str]:
+    """Flatten recipeInstructions, including nested HowToSection items."""
+    if isinstance(instructions, str):
+        return [instructions]
+    texts = []
+    for step in instructions if isinstance(instructions, list) else []:
+        if isinstance(step, str):
+            text = step
+        elif isinstance(step, dict):
+            if "itemListElement" in step:
+                texts.extend(_instruction_texts(step["itemListElement"]))
+                continue
+            text = step.get("text", "")
+        else:
+            continue
+        if text:
+            texts.append(text)
+    return texts
+
+
+def extract_recipe_from_json_ld(data: dict) -> dict | None:
+    """Extract recipe from JSON-LD structured data.
+
+    Args:
+        data: JSON-LD data dictionary
+
+    Returns:
+        Recipe dictionary or None
+    """
+    try:
+        ingredients = data.get("recipeIngredient", [])
+        if isinstance(ingredients, str):
+            ingredients = [ingredients]
+        recipe = {
+            "title": data.get("name", "Matcha Recipe"),
+            "ingredients": list(ingredients) if isinstance(ingredients, list) else [],
+            "instructions": _instruction_texts(data.get("recipeInstructions", [])),
+        }
+        if recipe["ingredients"] and recipe["instructions"]:
+            return recipe
+    except Exception:
+        pass
+    return None
+
+
+def _json_ld_recipes(page: _Page) -> list[dict]:
+    """Decode all JSON-LD blocks of a page and convert Recipe nodes."""
+    recipes = []
+    for raw in page.raw_texts(JSON_LD_SELECTOR):
+        try:
+            data = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        for node in iter_json_ld_recipes(data):
+            recipe = extract_recipe_from_json_ld(node)
+            if recipe:
+                recipes.append(recipe)
+    return recipes
+
+
+def _selector_recipe(page: _Page) -> dict | None:
+    """Heuristic CSS-selector extraction used when JSON-LD is missing."""
+    title = next(
+        (t for t in map(page.first_text, TITLE_SELECTORS) if t), "Matcha Recipe"
+    )
+
+    ingredients = []
+    for selector in INGREDIENT_SELECTORS:
+        ingredients = page.texts(selector)
+        if ingredients:
+            break
+    if not ingredients:
+        return None
+
+    instructions = []
+    for selector in INSTRUCTION_SELECTORS:
+        instructions = page.texts(selector)
+        if instructions:
+            break
+    if not instructions:
+        for selector in INSTRUCTION_PARAGRAPH_SELECTORS:
+            instructions = [t for t in page.texts(selector) if t]
+            if instructions:
+                break
+
+    if ingredients and instructions:
+        return {
+            "title": title,
+            "ingredients": ingredients,
+            "instructions": instructions,
+        }
+    return None
+
+
+def _recipe_links(page: _Page, base_url: str) -> list[str]:
+    """Collect absolute links that look like recipe pages."""
+    links = set()
+    for href in page.hrefs():
+        if not any(keyword in href.lower() for keyword in LINK_KEYWORDS):
+            continue
+        if href.startswith("http"):
+            links.add(href)
+        elif href.startswith("/"):
+            links.add(urljoin(base_url, href))
+    return list(links)
+
+
+def parse_recipe_html(
+    html: str | bytes, url: str, with_links: bool = False, backend: str = BACKEND
+) -> dict:
+    """Parse one HTML page into recipes using the fastest available backend.
+
+    Args:
+        html: Raw page content
+        url: URL of the page (used to resolve relative links)
+        with_links: Also collect candidate recipe links from the page
+        backend: Parser backend ("selectolax", "lxml" or "bs4")
+
+    Returns:
+        Dictionary with ``recipes``, ``links`` and the parser ``stage`` that
+        produced the recipes ("json_ld", "selectors" or None)
+    """
+    page = _Page(html, backend)
+    result = {"url": url, "recipes": [], "links": [], "stage": None}
+
+    recipes = _json_ld_recipes(page)
+    if recipes:
+        result.update(recipes=recipes, stage="json_ld")
+        return result
+
+    if with_links:
+        result["links"] = _recipe_links(page, url)
+        return result
+
+    recipe = _selector_recipe(page)
+    if recipe:
+        result.update(recipes=[recipe], stage="selectors")
+    return result
+
+
+def _parse_job(job: tuple[str, str | bytes, bool]) -> dict:
+    """Process-pool entry point for :func:`parse_recipe_html`."""
+    url, html, with_links = job
+    return parse_recipe_html(html, url, with_links=with_links)
+
+
+def parse_pages_parallel(
+    pages: list[tuple[str, str | bytes]],
+    max_workers: int | None = None,
+    with_links: bool = False,
+) -> list[dict]:
+    """Parse many HTML pages across a process pool.
+
+    Args:
+        pages: List of ``(url, html)`` pairs
+        max_workers: Number of worker processes (defaults to CPU count)
+        with_links: Also collect candidate recipe links from each page
+
+    Returns:
+        Parse results in the same order as ``pages``
+    """
+    jobs = [(url, html, with_links) for url, html in pages]
+    if max_workers == 1 or len(jobs) < 2:
+        return [_parse_job(job) for job in jobs]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_parse_job, jobs, chunksize=chunksize))
+
+
+def parse_html_dir(directory: Path | str, max_workers: int | None = None) -> list[dict]:
+    """Parse every saved ``*.html`` file in a directory.
+
+    Args:
+        directory: Folder containing saved HTML pages
+        max_workers: Number of worker processes (defaults to CPU count)
+
+    Returns:
+        Parse results, one per file, with the file URI as ``url``
+    """
+    paths = sorted(Path(directory).glob("*.html"))
+    pages = [(path.resolve().as_uri(), path.read_bytes()) for path in paths]
+    return parse_pages_parallel(pages, max_workers=max_workers)
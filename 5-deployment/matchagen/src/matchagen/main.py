@@ -183,7 +183,7 @@ def main():
     logger.info("Running test generation with inputs: 'milk, sugar'")
     test_recipe = generator.generate("milk, sugar")
     logger.info("Test generation result:")
-    logger.info("\n" + test_recipe)
+    logger.info("\n" + test_recipe.to_text())
     
     logger.info("Setup complete!")
 
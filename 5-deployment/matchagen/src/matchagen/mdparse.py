@@ -0,0 +1,263 @@
+"""Single-pass markdown tokenizer for Firecrawl recipe pages.
+
+A page is walked once by a single token regex. Headings, recipe sections,
+recipe links and pagination hints are collected together into one
+``MarkdownPage``, so callers that need more than one of them share a single
+result. Links and page markers inside headings are picked up as well.
+Sections are paired in order, so roundup pages yield every recipe on them.
+"""
+
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+LABEL_RE = re.compile(
+    r"^(?:(ingredients?)|(instructions?|directions?|method|steps?))\b",
+    re.IGNORECASE,
+)
+PLAIN_URL_RE = re.compile(r"https://[^\s\)]+/blogs/[^\s\)]*/[a-z0-9-]+")
+PAGE_PARAM_RE = re.compile(r"page[=\s]+(\d+)", re.IGNORECASE)
+
+# Tokens that can appear anywhere in a line, headings included
+INLINE_PATTERN = (
+    r"\[(?P<ltext>[^\]\n]+)\]\((?P<lurl>[^\)\n]+)\)"
+    r"|\[(?P<bracket>\d+)\]"
+    r"|(?P<plain>https://[^\s\)]+/blogs/[^\s\)]*/[a-z0-9-]+)"
+    r"|[Pp][Aa][Gg][Ee][=\s]+(?P<page>\d+)"
+)
+INLINE_RE = re.compile(INLINE_PATTERN)
+INLINE_GROUPS = {"lurl", "bracket", "plain", "page"}
+
+# One alternation per token type, so finditer walks the page once. A heading
+# token spans its whole line; its text is scanned with INLINE_RE afterwards.
+TOKEN_RE = re.compile(
+    r"\n[ \t]*(?:(?P<hashes>\#{1,6})[ \t]*(?P<heading>[^\n]*?)[ \t\#]*"
+    r"|[*_]*(?i:(?P<ingredients>ingredients?)"
+    r"|(?P<instructions>instructions?|directions?|method|steps?))[*_ \t]*:?[*_ \t]*)$"
+    r"|(?P<trailing>[Ii]ngredients?[ \t]*:[ \t]*$)"
+    r"|" + INLINE_PATTERN,
+    re.MULTILINE,
+)
+
+# Skip lists compiled into single alternations, checked with one search each
+PLAIN_URL_SKIP_RE = re.compile(
+    r"/tagged|/account|/checkout|/policies|/pages|/collections"
+)
+LINK_SKIP_RE = re.compile(
+    r"page=|\?page|/tagged/|/account/|/checkout|/policies/|/pages/"
+    r"|/collections/|/cdn/"
+)
+ASSET_RE = re.compile(r"\.(?:jpe?g|png|gif|svg|css|js|ico)", re.IGNORECASE)
+RECIPE_KEYWORD_RE = re.compile(r"recipe|latte|smoothie|dessert|cake", re.IGNORECASE)
+RECIPE_PATH_RE = re.compile(r"/blogs/(?:.*/)?matcha-recipes/", re.IGNORECASE)
+
+MAX_INGREDIENTS = 20
+MAX_INSTRUCTIONS = 15
+
+
+@dataclass(slots=True)
+class Section:
+    """A block of lines under an ingredients or instructions label."""
+
+    kind: str
+    heading: str | None
+    lines: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MarkdownPage:
+    """Everything the scraper needs from one markdown page."""
+
+    title: str | None = None
+    headings: list[tuple[int, str]] = field(default_factory=list)
+    sections: list[Section] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)
+    max_page: int = 1
+
+
+def _label_kind(text: str, exact: bool = False) -> str | None:
+    """Classify a heading or bare label line as a recipe section.
+
+    Headings only need to start with a label ("Ingredients for two"), bare
+    lines must consist of the label alone ("**INGREDIENTS:**").
+    """
+    text = text.strip("*_ ").rstrip(":").strip("*_ ")
+    match = LABEL_RE.match(text)
+    if match is None or (exact and match.end() != len(text)):
+        return None
+    return "ingredients" if match.group(1) else "instructions"
+
+
+def _netloc(url: str) -> str:
+    """Return the host of an absolute URL without a full urlparse."""
+    return url.split("/", 3)[2] if "//" in url else ""
+
+
+def _recipe_link(text: str, url: str, origin: str, base_domain: str) -> str | None:
+    """Return the absolute URL of a markdown link if it looks like a recipe."""
+    if not url or url[0] == "#" or ASSET_RE.search(url):
+        return None
+
+    is_recipe_path = RECIPE_PATH_RE.search(url) is not None and url.count("/") >= 4
+    if not is_recipe_path and not RECIPE_KEYWORD_RE.search(text):
+        return None
+
+    if url.startswith("http"):
+        full_url = url
+    elif url.startswith("//"):
+        full_url = origin.split("//", 1)[0] + url
+    elif url[0] == "/":
+        full_url = origin + url
+    else:
+        return None
+
+    if _netloc(full_url) != base_domain or LINK_SKIP_RE.search(full_url):
+        return None
+    return full_url
+
+
+def _plain_url_ok(url: str, base_domain: str) -> bool:
+    """Check a bare blog URL against the domain and skip list."""
+    return _netloc(url) == base_domain and not PLAIN_URL_SKIP_RE.search(url)
+
+
+def tokenize_markdown(markdown: str, base_url: str = "") -> MarkdownPage:
+    """Walk a markdown page once and collect its recipe-relevant structure.
+
+    Args:
+        markdown: Markdown content from the page
+        base_url: URL of the page, used to resolve and filter links
+
+    Returns:
+        MarkdownPage with headings, sections, recipe links and pagination
+    """
+    page = MarkdownPage()
+    parsed = urlparse(base_url)
+    base_domain = parsed.netloc
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    links: dict[str, None] = {}
+    seen_links: set[str] = set()
+    pages = [0]
+    # Section bodies run from the end of their label to the next boundary
+    spans: list[list[int]] = []
+    last_heading: str | None = None
+
+    def collect(match: re.Match):
+        # Links, bare blog URLs and page numbers of one inline token
+        group = match.lastgroup
+        if group == "lurl":
+            url = match.group("lurl")
+            if url in seen_links:
+                return
+            seen_links.add(url)
+            label = match.group("ltext")
+            link = _recipe_link(label, url, origin, base_domain)
+            if link:
+                links[link] = None
+            if label.isdigit() and int(label) < 100:
+                pages.append(int(label))
+            if "/blogs/" in url:
+                for plain in PLAIN_URL_RE.findall(url):
+                    if _plain_url_ok(plain, base_domain):
+                        links[plain] = None
+            if "page" in url.lower():
+                pages.extend(int(n) for n in PAGE_PARAM_RE.findall(url))
+        elif group == "page":
+            pages.append(int(match.group("page")))
+        elif group == "bracket":
+            if int(match.group("bracket")) < 100:
+                pages.append(int(match.group("bracket")))
+        elif _plain_url_ok(match.group("plain"), base_domain):
+            links[match.group("plain")] = None
+
+    # Leading newline lets line-start tokens match on the first line too
+    text = "\n" + markdown
+    for match in TOKEN_RE.finditer(text):
+        group = match.lastgroup
+        if group in INLINE_GROUPS:
+            collect(match)
+            continue
+
+        # Structural token: close the open section at this line
+        boundary = match.start()
+        if group == "trailing":
+            boundary = text.rfind("\n", 0, boundary)
+        if spans and spans[-1][1] < 0:
+            spans[-1][1] = boundary
+
+        if group == "heading":
+            level, heading = len(match.group("hashes")), match.group("heading")
+            for inline in INLINE_RE.finditer(heading):
+                collect(inline)
+            page.headings.append((level, heading))
+            if level == 1 and page.title is None and heading:
+                page.title = heading
+            kind = _label_kind(heading)
+            if kind is None:
+                last_heading = heading
+                continue
+        elif group == "instructions":
+            kind = "instructions"
+        else:
+            kind = "ingredients"
+
+        page.sections.append(Section(kind=kind, heading=last_heading))
+        spans.append([match.end(), -1])
+
+    for section, (start, end) in zip(page.sections, spans):
+        body = text[start : end if end >= 0 else len(text)]
+        section.lines = [line.strip() for line in body.splitlines() if line.strip()]
+
+    page.links = list(links)
+    page.max_page = max(pages) or 1
+    return page
+
+
+def _clean_ingredients(lines: list[str]) -> list[str]:
+    """Strip list markers from ingredient lines."""
+    return [line.lstrip("-*•").strip() for line in lines][:MAX_INGREDIENTS]
+
+
+def _clean_instructions(lines: list[str]) -> list[str]:
+    """Strip numbering from instruction lines and drop short fragments."""
+    return [line.lstrip("0123456789.-*•").strip() for line in lines if len(line) > 10][
+        :MAX_INSTRUCTIONS
+    ]
+
+
+def recipes_from_page(page: MarkdownPage) -> list[dict]:
+    """Pair ingredients and instructions sections into recipes.
+
+    Every ingredients section followed by an instructions section forms one
+    recipe, so roundup pages with several recipes yield all of them.
+
+    Args:
+        page: Tokenized markdown page
+
+    Returns:
+        List of recipe dictionaries
+    """
+    recipes = []
+    pending: Section | None = None
+    for section in page.sections:
+        if section.kind == "ingredients":
+            pending = section
+        elif pending is not None:
+            ingredients = [i for i in _clean_ingredients(pending.lines) if i]
+            instructions = _clean_instructions(section.lines)
+            if ingredients and instructions:
+                recipes.append(
+                    {
+                        "title": pending.heading,
+                        "ingredients": ingredients,
+                        "instructions": instructions,
+                    }
+                )
+            pending = None
+
+    # A single recipe is best named by the page title, several by their headings
+    fallback = page.title or "Matcha Recipe"
+    for recipe in recipes:
+        if len(recipes) == 1 or not recipe["title"]:
+            recipe["title"] = fallback
+    return recipes
@@ -0,0 +1,387 @@
+"""Prometheus-style metrics for recipe generation.
+
+Counters and histograms live in a process-wide registry and are rendered in
+the Prometheus text exposition format by the backend's ``/metrics`` endpoint,
+so no client library is needed.
+
+Stage timings are exclusive: time spent in a nested stage (``format`` inside
+``parse``) is only counted for the nested stage, so the stages of one request
+add up to its total generation time.
+
+A server with several worker processes shares its metrics through a directory
+(``MATCHAGEN_METRICS_DIR``): every worker writes a snapshot of its values
+there every ``MATCHAGEN_METRICS_INTERVAL`` seconds (default 5), and
+``/metrics`` adds the snapshots of the other workers to its own values. All
+metrics are counters or histograms, so summing them is exact, but the other
+workers' share can lag by up to one interval.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for a named metric with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        """Create the metric and register it.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every sample must set
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple, extra: tuple = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def _copy(self, value):
+        raise NotImplementedError
+
+    def _add(self, values: dict, key: tuple, value):
+        raise NotImplementedError
+
+    def _samples(self, values: dict) -> list[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> list:
+        """Current values as JSON-serializable ``[labels, value]`` pairs."""
+        with self._lock:
+            return [
+                [list(key), self._copy(value)] for key, value in self._values.items()
+            ]
+
+    def render(self, snapshots: list[dict] = ()) -> list[str]:
+        """HELP, TYPE and sample lines of this metric.
+
+        Args:
+            snapshots: ``Registry.snapshot`` results of other processes, added
+                to the values of this one
+        """
+        with self._lock:
+            values = {key: self._copy(value) for key, value in self._values.items()}
+        for snapshot in snapshots:
+            for key, value in snapshot.get(self.name, []):
+                self._add(values, tuple(key), value)
+        return [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self._samples(values)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Add ``amount`` to the counter for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _copy(self, value: float) -> float:
+        return value
+
+    def _add(self, values: dict, key: tuple, value: float):
+        values[key] = values.get(key, 0.0) + value
+
+    def _samples(self, values: dict) -> list[str]:
+        if not values and not self.labelnames:
+            return [f"{self.name} 0.0"]
+        return [
+            f"{self.name}{self._labels(key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        """Create the histogram.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every observation must set
+            buckets: Sorted upper bounds; +Inf is added automatically
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels):
+        """Record one observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _copy(self, value: list) -> list:
+        counts, total = value
+        return [list(counts), total]
+
+    def _add(self, values: dict, key: tuple, value: list):
+        counts, total = value
+        state = values.get(key)
+        if state is None:
+            values[key] = self._copy(value)
+            return
+        state[0] = [a + b for a, b in zip(state[0], counts)]
+        state[1] += total
+
+    def _samples(self, values: dict) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = self._labels(key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        """Values of all metrics by name, see ``Metric.snapshot``."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, snapshots: list[dict] = ()) -> str:
+        """All metrics in the Prometheus text format.
+
+        Args:
+            snapshots: Snapshots of other processes to add to these values
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render(snapshots)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+GENERATE_SECONDS = Histogram(
+    "matchagen_generate_seconds", "Total time of RecipeGenerator.generate"
+)
+STAGE_SECONDS = Histogram(
+    "matchagen_generate_stage_seconds",
+    "Exclusive time per stage of RecipeGenerator.generate",
+    ("stage",),
+)
+DECODE_TOKENS_PER_SECOND = Histogram(
+    "matchagen_decode_tokens_per_second",
+    "Generated tokens per second of decoding",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+GENERATED_TOKENS = Counter(
+    "matchagen_generated_tokens_total", "Tokens generated by the decoder"
+)
+SAFETY_FILTER_HITS = Counter(
+    "matchagen_safety_filter_hits_total",
+    "Ingredients removed by the safety filter",
+)
+INGREDIENT_RECOVERIES = Counter(
+    "matchagen_ingredient_recoveries_total",
+    "Input ingredients added back after the model dropped them",
+)
+EMERGENCY_LATTE_OVERRIDES = Counter(
+    "matchagen_emergency_latte_overrides_total",
+    "Generated directions replaced by the standard latte steps",
+)
+VARIANT_CACHE_REQUESTS = Counter(
+    "matchagen_variant_cache_requests_total",
+    "Recipe requests by whether a cached variant was served",
+    ("result",),
+)
+RECIPE_CACHE_REQUESTS = Counter(
+    "matchagen_recipe_cache_requests_total",
+    "Seeded recipe lookups by whether the recipe was cached",
+    ("result",),
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "matchagen_admission_queue_seconds",
+    "Time requests waited for a decode slot",
+    ("lane",),
+)
+ADMISSION_REJECTIONS = Counter(
+    "matchagen_admission_rejections_total",
+    "Requests turned away by admission control",
+    ("reason",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "matchagen_http_request_seconds",
+    "Backend request latency",
+    ("path", "status"),
+)
+
+_local = threading.local()
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Time a block as one stage of generation.
+
+    Args:
+        stage: Stage label (e.g. "tokenize", "decode")
+    """
+    # One accumulator per open stage, holding the time spent in nested stages
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        STAGE_SECONDS.observe(elapsed - nested, stage=stage)
+
+
+SNAPSHOT_PREFIX = "metrics-"
+_shared_dir: Path | None = None
+
+
+def _snapshot_path(directory: Path, pid: int) -> Path:
+    return directory / f"{SNAPSHOT_PREFIX}{pid}.json"
+
+
+def write_snapshot(directory: Path | str):
+    """Write the values of this process to ``directory``."""
+    path = _snapshot_path(Path(directory), os.getpid())
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(REGISTRY.snapshot()))
+    os.replace(tmp, path)
+
+
+def read_snapshots(directory: Path | str) -> list[dict]:
+    """Snapshots written by the other processes sharing ``directory``."""
+    own = _snapshot_path(Path(directory), os.getpid())
+    snapshots = []
+    for path in Path(directory).glob(f"{SNAPSHOT_PREFIX}*.json"):
+        if path == own:
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # removed while reading
+    return snapshots
+
+
+def clear_snapshots(directory: Path | str):
+    """Remove the snapshots of an earlier server run.
+
+    Snapshots of exited workers are kept while the server runs, so counters
+    never go down, but a new server must not add up the old values.
+    """
+    for path in Path(directory).glob(f"{SNAPSHOT_PREFIX}*.json"):
+        path.unlink(missing_ok=True)
+
+
+def share_metrics(directory: Path | str, interval: float = 5.0):
+    """Share this process's metrics with the other workers of the server.
+
+    Writes a snapshot every ``interval`` seconds and at exit, and makes
+    ``render_metrics`` add up the snapshots of all workers.
+
+    Args:
+        directory: Directory shared by all worker processes
+        interval: Seconds between snapshots
+    """
+    global _shared_dir
+
+    _shared_dir = Path(directory)
+    _shared_dir.mkdir(parents=True, exist_ok=True)
+
+    def run():
+        while True:
+            write_snapshot(directory)
+            time.sleep(interval)
+
+    threading.Thread(target=run, daemon=True).start()
+    atexit.register(write_snapshot, directory)
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text format.
+
+    After ``share_metrics`` the values of the other workers are included.
+    """
+    snapshots = read_snapshots(_shared_dir) if _shared_dir else []
+    return REGISTRY.render(snapshots)
@@ -2,49 +2,247 @@
 
 import re
 import string  # Ensure this is imported!
+import time
 from typing import List, Union
 
 import torch
 from loguru import logger
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers import AutoModelForSeq2SeqLM, StoppingCriteria, StoppingCriteriaList
+
+from matchagen.admission import DeadlineExceeded
+from matchagen.compilation import (
+    compile_enabled,
+    disable_compilation,
+    enable_compilation,
+    load_compile_cache,
+    static_length,
+)
+from matchagen.metrics import (
+    DECODE_TOKENS_PER_SECOND,
+    EMERGENCY_LATTE_OVERRIDES,
+    GENERATE_SECONDS,
+    GENERATED_TOKENS,
+    INGREDIENT_RECOVERIES,
+    SAFETY_FILTER_HITS,
+    time_stage,
+)
+from matchagen.recipe import Recipe
+from matchagen.recipe_cache import model_fingerprint
+from matchagen.seeding import sampling_rng
+from matchagen.vocab import load_tokenizer
+
+
+class DeadlineCriteria(StoppingCriteria):
+    """Stops decoding once ``time.monotonic()`` passes the deadline."""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        expired = time.monotonic() >= self.deadline
+        return torch.full(
+            (input_ids.shape[0],), expired, dtype=torch.bool, device=input_ids.device
+        )
+
+
+class LengthCriteria(StoppingCriteria):
+    """Stops decoding at ``max_length`` tokens, short of a longer static cache."""
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        done = input_ids.shape[-1] >= self.max_length
+        return torch.full(
+            (input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device
+        )
 
 
 class RecipeGenerator:
     """Recipe generator using Chef Transformer (T5)."""
 
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, compile: bool | None = None):
         """Initialize generator with T5 model.
 
         Args:
             model_path: Path to saved model directory or HuggingFace model ID
+            compile: Decode with a compiled step and static KV cache, defaults
+                to the MATCHAGEN_COMPILE environment variable
         """
-        logger.info("=" * 60)
-        logger.info("!!! CACHE BUSTER: VERSION 2025-LATTE-ENFORCER-V1 !!!")
-        logger.info("!!! IF YOU DONT SEE THIS, THE CODE IS OLD !!!")
-        logger.info("=" * 60)
+        logger.info("Code version 2025-LATTE-ENFORCER-V1 (cache buster)")
 
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Loading model from {model_path} on {self.device}")
 
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # Trimmed artefacts (matchagen.vocab) come with a remapping tokenizer
+        self.tokenizer = load_tokenizer(model_path)
         self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path).to(self.device)
         self.model.eval()
+        # Seeded recipes are cached per model, see matchagen.recipe_cache
+        self.fingerprint = model_fingerprint(model_path)
+
+        self.compiled = False
+        if compile_enabled() if compile is None else compile:
+            load_compile_cache()
+            self.compiled = enable_compilation(self.model)
 
     def generate(
         self,
         prompt: Union[str, List[str]],
         temperature: float = 0.9,
         max_length: int = 256,
-    ) -> str:
+        deadline: float | None = None,
+        seed: int | None = None,
+    ) -> Recipe:
         """Generate a recipe using the T5 model with safety checks.
 
         Args:
             prompt: Ingredients string (comma-separated) or list of ingredients
             temperature: Sampling temperature
             max_length: Maximum tokens to generate
+            deadline: ``time.monotonic()`` after which decoding is cancelled
+            seed: Makes the recipe reproducible for the same other arguments
+
+        Returns:
+            Structured recipe
+
+        Raises:
+            DeadlineExceeded: When decoding was cancelled by the deadline
+        """
+        return self.generate_variants(
+            prompt, 1, temperature, max_length, deadline, seed
+        )[0]
+
+    def generate_variants(
+        self,
+        prompt: Union[str, List[str]],
+        n: int = 3,
+        temperature: float = 0.9,
+        max_length: int = 256,
+        deadline: float | None = None,
+        seed: int | None = None,
+    ) -> List[Recipe]:
+        """Generate ``n`` different recipes for the same ingredients at once.
+
+        The prompt is encoded once and the ``n`` sampled sequences share the
+        encoder output, decoding together as one batch.
+
+        Args:
+            prompt: Ingredients string (comma-separated) or list of ingredients
+            n: Number of variants
+            temperature: Sampling temperature
+            max_length: Maximum tokens to generate
+            deadline: ``time.monotonic()`` after which decoding is cancelled
+            seed: Makes the recipes reproducible for the same other arguments
+
+        Returns:
+            List of ``n`` structured recipes
+
+        Raises:
+            DeadlineExceeded: When decoding was cancelled by the deadline
+        """
+        start = time.perf_counter()
+        with time_stage("normalize"):
+            clean_ingredients = self._prepare_ingredients(prompt)
+
+        # The model expects "items: ing1, ing2, ..."
+        input_text = f"items: {', '.join(clean_ingredients)}"
+        logger.debug(f"Generating {n} recipe(s) for input: {input_text}")
+
+        # 5. Generate with T5
+        with time_stage("tokenize"):
+            # Compiled decoding pads the prompt, so the cross-attention cache
+            # has few shapes too
+            padding = {}
+            if self.compiled:
+                padding = {"padding": True, "pad_to_multiple_of": 32}
+            inputs = self.tokenizer(input_text, return_tensors="pt", **padding).to(
+                self.device
+            )
+
+        stopping_criteria = StoppingCriteriaList()
+        if deadline is not None:
+            stopping_criteria.append(DeadlineCriteria(deadline))
+
+        with torch.no_grad():
+            # Run the encoder on its own so its cost is measured apart from decoding
+            with time_stage("encode"):
+                encoder_outputs = self.model.get_encoder()(**inputs, return_dict=True)
+
+            with time_stage("decode"), sampling_rng(seed):
+                decode_start = time.perf_counter()
+                outputs = self._decode(
+                    encoder_outputs=encoder_outputs,
+                    attention_mask=inputs["attention_mask"],
+                    max_length=max_length,
+                    min_length=60,
+                    do_sample=True,
+                    temperature=temperature,
+                    top_k=50,  # Only consider top 50 tokens (CRITICAL for speed!)
+                    top_p=0.92,  # Nucleus sampling (CRITICAL for speed!)
+                    repetition_penalty=1.2,
+                    no_repeat_ngram_size=2,
+                    num_return_sequences=n,
+                    stopping_criteria=stopping_criteria,
+                )
+                decode_seconds = time.perf_counter() - decode_start
+
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("Deadline passed while decoding")
+
+        # Skip the decoder start token and the padding of finished sequences
+        num_tokens = int((outputs[:, 1:] != self.model.config.pad_token_id).sum())
+        GENERATED_TOKENS.inc(num_tokens)
+        DECODE_TOKENS_PER_SECOND.observe(num_tokens / decode_seconds)
+
+        recipes = []
+        for sequence in outputs:
+            # Decode output
+            with time_stage("detokenize"):
+                generated_text = self.tokenizer.decode(
+                    sequence, skip_special_tokens=False
+                )
+            logger.debug(f"Raw model output: {generated_text}")
+
+            # 6. Parse and Format
+            with time_stage("parse"):
+                recipes.append(self._parse_t5_output(generated_text, clean_ingredients))
+
+        GENERATE_SECONDS.observe(time.perf_counter() - start)
+        return recipes
+
+    def _decode(
+        self, max_length: int, stopping_criteria: StoppingCriteriaList, **kwargs
+    ) -> torch.Tensor:
+        """Run ``model.generate``, compiled when enabled, else eager."""
+        if not self.compiled:
+            return self.model.generate(
+                max_length=max_length, stopping_criteria=stopping_criteria, **kwargs
+            )
+        # The static cache is sized to the bucket, the budget still ends decoding
+        bounded = StoppingCriteriaList([*stopping_criteria, LengthCriteria(max_length)])
+        try:
+            return self.model.generate(
+                max_length=static_length(max_length),
+                stopping_criteria=bounded,
+                **kwargs,
+            )
+        except Exception as e:
+            logger.warning(f"Compiled decoding failed, falling back to eager: {e}")
+            disable_compilation(self.model)
+            self.compiled = False
+            return self.model.generate(
+                max_length=max_length, stopping_criteria=stopping_criteria, **kwargs
+            )
+
+    def _prepare_ingredients(self, prompt: Union[str, List[str]]) -> List[str]:
+        """Clean the requested ingredients and complete them into a latte.
+
+        Args:
+            prompt: Ingredients string (comma-separated) or list of ingredients
 
         Returns:
-            Formatted recipe text
+            Ingredients to condition the model on
         """
         # 1. Parse and Clean Input
         if isinstance(prompt, str):
@@ -76,6 +274,7 @@ class RecipeGenerator:
         if len(clean_ingredients) != len(raw_ingredients):
             num_filtered = len(raw_ingredients) - len(clean_ingredients)
             logger.warning(f"Filtered out {num_filtered} unsafe ingredients")
+            SAFETY_FILTER_HITS.inc(num_filtered)
 
         # 3. Ensure Matcha is present (Guidance for T5)
         if not any("matcha" in i for i in clean_ingredients):
@@ -88,7 +287,7 @@ class RecipeGenerator:
         if not any("milk" in i for i in clean_ingredients):
             chosen_milk = self._select_logical_milk(clean_ingredients)
             clean_ingredients.append(chosen_milk)
-            logger.info(f"Auto-added liquid base: {chosen_milk}")
+            logger.debug(f"Auto-added liquid base: {chosen_milk}")
 
         # Ensure a Sweetener (Defaulting to Honey as a safe choice)
         if not any(
@@ -96,35 +295,9 @@ class RecipeGenerator:
         ):
             chosen_sweet = "honey"
             clean_ingredients.append(chosen_sweet)
-            logger.info(f"Auto-added sweetener: {chosen_sweet}")
-
-        # The model expects "items: ing1, ing2, ..."
-        input_text = f"items: {', '.join(clean_ingredients)}"
-        logger.info(f"Generating recipe for input: {input_text}")
+            logger.debug(f"Auto-added sweetener: {chosen_sweet}")
 
-        # 5. Generate with T5
-        inputs = self.tokenizer(input_text, return_tensors="pt").to(self.device)
-
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=max_length,
-                min_length=60,
-                do_sample=True,
-                temperature=temperature,
-                top_k=50,  # Only consider top 50 tokens (CRITICAL for speed!)
-                top_p=0.92,  # Nucleus sampling (CRITICAL for speed!)
-                repetition_penalty=1.2,
-                no_repeat_ngram_size=2,
-                num_return_sequences=1,
-            )
-
-        # Decode output
-        generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=False)
-        logger.info(f"Raw model output: {generated_text}")
-
-        # 6. Parse and Format
-        return self._parse_t5_output(generated_text, clean_ingredients)
+        return clean_ingredients
 
     def _select_logical_milk(self, ingredients: List[str]) -> str:
         """Deterministically select a milk type based on input ingredients.
@@ -155,8 +328,10 @@ class RecipeGenerator:
         # Default safe option
         return "oat milk"
 
-    def _parse_t5_output(self, text: str, input_ingredients: List[str] = None) -> str:
-        """Parse the T5 output string into a readable recipe.
+    def _parse_t5_output(
+        self, text: str, input_ingredients: List[str] = None
+    ) -> Recipe:
+        """Parse the T5 output string into a structured recipe.
 
         Args:
             text: Raw model output
@@ -205,16 +380,17 @@ class RecipeGenerator:
                             break
 
                     if not is_present:
-                        logger.info(f"Recovering dropped ingredient: {original}")
+                        logger.debug(f"Recovering dropped ingredient: {original}")
+                        INGREDIENT_RECOVERIES.inc()
                         ingredients.append(original)
 
             if not ingredients and not directions:
                 logger.warning("Standard parsing failed, returning raw text")
-                return text
+                return Recipe(title=title, directions=[text])
 
             # THEME ENFORCER: Force "Latte" naming convention
             if "milkshake" in title.lower() or "smoothie" in title.lower():
-                logger.info(f"Enforcing Latte Theme: Renaming '{title}'")
+                logger.debug(f"Enforcing Latte Theme: Renaming '{title}'")
                 title = title.replace("Milkshake", "Latte").replace("Smoothie", "Latte")
                 title = title.replace("milkshake", "Latte").replace("smoothie", "Latte")
 
@@ -231,7 +407,7 @@ class RecipeGenerator:
 
             # Fix 1: Title too simple (e.g., just "matcha")
             if len(title_words) <= 2:
-                logger.info(f"Title too simple: '{title}' - generating better one")
+                logger.debug(f"Title too simple: '{title}' - generating better one")
                 main_ingredient = None
                 for ing in ingredients:
                     ing_lower = ing.lower()
@@ -283,16 +459,18 @@ class RecipeGenerator:
                 logger.warning(f"{msg} Rewriting directions.")
                 # Emergency Override: Generate standard Latte steps
                 directions = self._generate_emergency_latte_steps(ingredients)
+                EMERGENCY_LATTE_OVERRIDES.inc()
 
             # 6. Format (Inside Try Block to catch formatting errors)
-            return self._format_recipe(title, ingredients, directions)
+            with time_stage("format"):
+                return self._format_recipe(title, ingredients, directions)
 
         except Exception as e:
             logger.error(f"Error parsing/formatting recipe: {e}")
             import traceback
 
             logger.error(traceback.format_exc())
-            return f"Error parsing generated recipe.\nRaw output: {text}"
+            return Recipe(title="Error parsing generated recipe")
 
     def _generate_emergency_latte_steps(self, ingredients: List[str]) -> List[str]:
         """Generate standard latte steps if the model goes rogue (baking/cooking)."""
@@ -362,8 +540,8 @@ class RecipeGenerator:
 
     def _format_recipe(
         self, title: str, ingredients: List[str], directions: List[str]
-    ) -> str:
-        """Format recipe as readable text.
+    ) -> Recipe:
+        """Clean up the parsed parts into a display-ready recipe.
 
         Args:
             title: Recipe title
@@ -371,7 +549,7 @@ class RecipeGenerator:
             directions: List of instruction steps
 
         Returns:
-            Formatted recipe text
+            Structured recipe
         """
         # POST-PROCESSING SAFETY CHECK (UNIVERSAL):
         # Ensure ALL ingredients are actually used in the steps.
@@ -430,16 +608,8 @@ class RecipeGenerator:
                     # Fallback for things like Lavender
                     directions.append(f"Add the {ing_name} and mix gently to combine.")
 
-        output = [f"Title: {title}", ""]
-
-        output.append("Ingredients:")
-        for ing in ingredients:
-            if ing:
-                output.append(f"- {ing.capitalize()}")
-        output.append("")
-
-        output.append("Directions:")
-        for i, direction in enumerate(directions, 1):
+        steps = []
+        for direction in directions:
             if direction:
                 # FIX: Remove leading numbers from model output
                 # (e.g. "1. Preheat" -> "Preheat")
@@ -449,6 +619,10 @@ class RecipeGenerator:
                 # Look for digit space digit patterns
                 pattern = r"(\d+)\s+(\d+)\s*(min|hour)"
                 fixed_direction = re.sub(pattern, r"\1-\2 \3", clean_direction)
-                output.append(f"{i}. {fixed_direction.capitalize()}")
+                steps.append(fixed_direction.capitalize())
 
-        return "\n".join(output)
+        return Recipe(
+            title=title,
+            ingredients=[ing.capitalize() for ing in ingredients if ing],
+            directions=steps,
+        )
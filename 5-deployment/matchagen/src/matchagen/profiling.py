@@ -0,0 +1,173 @@
+"""On-demand profiling of recipe generation.
+
+A configurable fraction of requests is profiled with ``torch.profiler`` and a
+Python stack sampler. Each profile writes a Chrome trace (open it in
+chrome://tracing or Perfetto) and a folded-stack file (render it with
+flamegraph.pl or speedscope) to a directory that keeps only the newest
+profiles. With a sample rate of 0, the default, ``profile()`` returns a
+shared no-op context without touching torch or starting threads.
+
+Configured through environment variables:
+
+    MATCHAGEN_PROFILE_RATE   fraction of requests to profile (default 0)
+    MATCHAGEN_PROFILE_DIR    output directory (default "profiles")
+    MATCHAGEN_PROFILE_KEEP   number of profiles to keep (default 20)
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from loguru import logger
+
+TRACE_SUFFIX = ".trace.json"
+FOLDED_SUFFIX = ".folded"
+
+_DISABLED = nullcontext()
+
+
+class StackSampler:
+    """Samples the Python stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """Initialize the sampler.
+
+        Args:
+            thread_id: Identifier of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = Path(code.co_filename).name
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Samples in the collapsed format of flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class Profiler:
+    """Profiles a sampled fraction of generate calls."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        directory: Path | str = "profiles",
+        keep: int = 20,
+        interval: float = 0.005,
+    ):
+        """Initialize the profiler.
+
+        Args:
+            rate: Fraction of calls to profile, 0 disables profiling
+            directory: Where trace and folded-stack files are written
+            keep: Number of most recent profiles to keep
+            interval: Seconds between Python stack samples
+        """
+        self.rate = rate
+        self.directory = Path(directory)
+        self.keep = keep
+        self.interval = interval
+        # torch.profiler is process-wide, so only one profile runs at a time
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        """Create a profiler configured by MATCHAGEN_PROFILE_* variables."""
+        return cls(
+            rate=float(os.getenv("MATCHAGEN_PROFILE_RATE", "0")),
+            directory=os.getenv("MATCHAGEN_PROFILE_DIR", "profiles"),
+            keep=int(os.getenv("MATCHAGEN_PROFILE_KEEP", "20")),
+        )
+
+    def profile(self, label: str, force: bool = False):
+        """Context that profiles the block if this call is sampled.
+
+        Args:
+            label: Name used in the output file names
+            force: Profile regardless of the sample rate
+
+        Returns:
+            Context manager
+        """
+        if not force and (self.rate <= 0 or random.random() >= self.rate):
+            return _DISABLED
+        return self._profile(label)
+
+    @contextmanager
+    def _profile(self, label: str) -> Iterator[None]:
+        if not self._busy.acquire(blocking=False):
+            yield
+            return
+        try:
+            import torch
+            from torch.profiler import ProfilerActivity
+            from torch.profiler import profile as torch_profile
+
+            activities = [ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(ProfilerActivity.CUDA)
+
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            start = time.perf_counter()
+            with torch_profile(activities=activities) as prof, sampler:
+                yield
+            elapsed = time.perf_counter() - start
+            self._write(label, prof, sampler, elapsed)
+        finally:
+            self._busy.release()
+
+    def _write(self, label: str, prof, sampler: StackSampler, elapsed: float):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{label}"
+        prof.export_chrome_trace(str(self.directory / f"{stem}{TRACE_SUFFIX}"))
+        (self.directory / f"{stem}{FOLDED_SUFFIX}").write_text(sampler.folded())
+        logger.info(f"Wrote profile {stem} ({elapsed * 1000:.0f} ms)")
+        self._rotate()
+
+    def _rotate(self):
+        """Delete all but the ``keep`` most recent profiles."""
+        traces = sorted(self.directory.glob(f"*{TRACE_SUFFIX}"), reverse=True)
+        for trace in traces[self.keep :]:
+            stem = trace.name.removesuffix(TRACE_SUFFIX)
+            trace.unlink(missing_ok=True)
+            (self.directory / f"{stem}{FOLDED_SUFFIX}").unlink(missing_ok=True)
+
+    def list_profiles(self) -> list[str]:
+        """Names of the stored profile files, newest first."""
+        if not self.directory.exists():
+            return []
+        files = [
+            p.name
+            for p in self.directory.iterdir()
+            if p.name.endswith((TRACE_SUFFIX, FOLDED_SUFFIX))
+        ]
+        return sorted(files, reverse=True)
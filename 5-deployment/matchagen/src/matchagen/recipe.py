@@ -0,0 +1,66 @@
+"""Structured recipe returned by the generator."""
+
+import re
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class Recipe:
+    """A generated recipe, ready to serialize.
+
+    Ingredients and directions are display-ready: capitalized, without
+    bullets or step numbers.
+    """
+
+    title: str
+    ingredients: list[str] = field(default_factory=list)
+    directions: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def to_text(self) -> str:
+        """Plain-text form, as used for downloads and sharing."""
+        lines = [f"Title: {self.title}", "", "Ingredients:"]
+        lines += [f"- {ingredient}" for ingredient in self.ingredients]
+        lines += ["", "Directions:"]
+        lines += [f"{i}. {step}" for i, step in enumerate(self.directions, 1)]
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+    @classmethod
+    def from_text(cls, text: str) -> "Recipe":
+        """Parse the plain-text form produced by ``to_text``.
+
+        Args:
+            text: Recipe text with a title line and Ingredients/Directions
+                (or Instructions) sections
+
+        Returns:
+            Parsed recipe
+        """
+        lines = [line.strip() for line in text.split("\n") if line.strip()]
+        if not lines:
+            return cls(title="Matcha Recipe")
+
+        title = re.sub(r"^title:\s*", "", lines[0], flags=re.IGNORECASE)
+        ingredients: list[str] = []
+        directions: list[str] = []
+        section = None
+        for line in lines[1:]:
+            header = line.lower().rstrip(":")
+            if header == "ingredients":
+                section = ingredients
+            elif header in ("directions", "instructions"):
+                section = directions
+            elif section is not None:
+                item = re.sub(r"^(?:-|\d+[.)])\s*", "", line).strip()
+                if item:
+                    section.append(item)
+        return cls(
+            title=title or "Matcha Recipe",
+            ingredients=ingredients,
+            directions=directions,
+        )
@@ -0,0 +1,158 @@
+"""Content-addressed cache of seeded recipes.
+
+A seeded generation is fully determined by its ingredients, seed,
+temperature and token budget, together with the model and whether decoding is
+compiled, so its result is stored under a hash of those parameters. Retries
+of the same request and shared ``/recipes/{id}`` links are answered from the
+cache without decoding. Entries are kept in memory, and also as JSON files
+when ``MATCHAGEN_RECIPE_CACHE_DIR`` is set, so that all workers of a server
+and restarts see the same recipes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+from matchagen.metrics import RECIPE_CACHE_REQUESTS
+from matchagen.variants import variant_key
+
+RECIPE_ID = re.compile(r"[0-9a-f]{16}")
+
+# Weight files of a saved model, single or sharded
+WEIGHT_PATTERNS = ("*.safetensors", "*.bin")
+
+
+def model_fingerprint(model_path: str) -> str:
+    """Identify a model by its config and the size and mtime of its weights.
+
+    Retrained or re-trimmed weights get a new fingerprint without hashing
+    hundreds of megabytes. A HuggingFace model ID is used as is.
+
+    Args:
+        model_path: Saved model directory or HuggingFace model ID
+
+    Returns:
+        First 16 hex digits of the digest
+    """
+    path = Path(model_path)
+    if not path.is_dir():
+        return hashlib.sha256(model_path.encode()).hexdigest()[:16]
+    digest = hashlib.sha256()
+    config = path / "config.json"
+    if config.exists():
+        digest.update(config.read_bytes())
+    for pattern in WEIGHT_PATTERNS:
+        for weights in sorted(path.glob(pattern)):
+            stat = weights.stat()
+            digest.update(f"{weights.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def recipe_id(
+    prompt: str,
+    seed: int,
+    temperature: float,
+    max_length: int,
+    fingerprint: str,
+    compiled: bool,
+) -> str:
+    """Hash of the parameters that determine a seeded recipe.
+
+    Ingredient order, case and spacing do not change the id.
+
+    Args:
+        prompt: Comma-separated ingredients
+        seed: Random seed
+        temperature: Sampling temperature
+        max_length: Token budget
+        fingerprint: ``model_fingerprint`` of the generating model
+        compiled: Whether decoding is compiled, which samples differently
+    """
+    ingredients, temperature = variant_key(prompt, temperature)
+    payload = json.dumps(
+        {
+            "ingredients": ingredients,
+            "seed": seed,
+            "temperature": temperature,
+            "max_length": max_length,
+            "model": fingerprint,
+            "compiled": compiled,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class RecipeCache:
+    """Bounded in-memory cache of recipes by id, optionally backed by files."""
+
+    def __init__(self, max_entries: int = 1024, directory: Path | str | None = None):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Recipes kept in memory, least recently used are
+                evicted first
+            directory: Directory for one JSON file per recipe, None to keep
+                recipes in memory only
+        """
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RecipeCache":
+        """Create a cache configured by MATCHAGEN_RECIPE_CACHE_* variables."""
+        return cls(
+            max_entries=int(os.getenv("MATCHAGEN_RECIPE_CACHE_SIZE", "1024")),
+            directory=os.getenv("MATCHAGEN_RECIPE_CACHE_DIR") or None,
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        """Stored recipe and its parameters, None if unknown.
+
+        Args:
+            key: Recipe id from ``recipe_id``
+
+        Returns:
+            Dict with the recipe text and generation parameters, or None
+        """
+        if not RECIPE_ID.fullmatch(key):
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.directory and self._path(key).exists():
+            entry = json.loads(self._path(key).read_text())
+            self._remember(key, entry)
+        RECIPE_CACHE_REQUESTS.inc(result="miss" if entry is None else "hit")
+        return entry
+
+    def put(self, key: str, entry: dict):
+        """Store a recipe under its id."""
+        self._remember(key, entry)
+        if self.directory:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp = self.directory / f"{key}.{os.getpid()}.tmp"
+                tmp.write_text(json.dumps(entry))
+                tmp.replace(self._path(key))
+            except OSError as e:
+                logger.warning(f"Could not store recipe {key}: {e}")
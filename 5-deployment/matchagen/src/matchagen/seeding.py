@@ -0,0 +1,77 @@
+"""Reproducible sampling with a seed.
+
+Sampling in ``generate`` draws from torch's global random number generator,
+which all generation threads share. A seeded generation therefore runs
+alone: it forks the generator state, seeds it and waits until no other
+generation is drawing from it. Unseeded generations still run side by side.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import torch
+
+
+class RngLock:
+    """Readers-writer lock: unseeded generations share, seeded ones exclude.
+
+    Waiting seeded generations block new unseeded ones, so they cannot starve.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting_exclusive = 0
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self._exclusive and not self._waiting_exclusive
+            )
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_exclusive += 1
+            self._cond.wait_for(lambda: not self._exclusive and not self._shared)
+            self._waiting_exclusive -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
+_rng_lock = RngLock()
+
+
+@contextmanager
+def sampling_rng(seed: int | None = None) -> Iterator[None]:
+    """Context for drawing samples, seeded when ``seed`` is given.
+
+    The global generator state is restored afterwards, so a seeded
+    generation does not change what unseeded ones draw.
+
+    Args:
+        seed: Seed for a reproducible sample, None to sample freely
+    """
+    if seed is None:
+        with _rng_lock.shared():
+            yield
+        return
+
+    with _rng_lock.exclusive(), torch.random.fork_rng():
+        torch.manual_seed(seed)
+        yield
@@ -0,0 +1,380 @@
+"""Thread, worker and CPU affinity settings for CPU inference.
+
+By default torch sizes its intra-op pool to every core, so each uvicorn worker
+competes for all cores once several of them run. The autotuner benchmarks
+worker and thread counts on the current host, with as many decodes in flight
+per worker as admission control allows (MATCHAGEN_CONCURRENCY), and stores
+the fastest combination in the ``[serving]`` section of matchagen.toml:
+
+    python -m matchagen.serving --model artefacts/matcha-model
+
+The backend reads that section at startup, pins every worker to its own
+slice of the available cores and sizes its torch thread pools to match.
+"""
+
+import fcntl
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import tomli
+import torch
+from loguru import logger
+
+from matchagen.admission import AdmissionController
+
+DEFAULT_CONFIG_FILE = Path(os.getenv("MATCHAGEN_CONFIG", "matchagen.toml"))
+
+# Prompts the benchmark cycles through, shaped like frontend requests
+BENCH_PROMPTS = [
+    "Oat Milk, Mango",
+    "Almond Milk, Vanilla Syrup, Collagen",
+    "Coconut Milk, Strawberry",
+    "Whole Milk, Honey, Cinnamon",
+    "Soy Milk, Blueberries, White Chocolate",
+    "Oat Milk, Ginger",
+]
+
+
+@dataclass
+class ServingConfig:
+    """Process layout for serving the model on CPU."""
+
+    workers: int = 1
+    intra_op_threads: int = 1
+    inter_op_threads: int = 1
+    pin_cpus: bool = True
+
+
+def available_cpus() -> list[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_slice(index: int, workers: int, cpus: list[int] | None = None) -> list[int]:
+    """Contiguous share of the CPUs for one worker.
+
+    Args:
+        index: Worker index, 0 <= index < workers
+        workers: Number of workers sharing the CPUs
+        cpus: CPUs to divide, defaults to the available ones
+
+    Returns:
+        CPUs assigned to the worker (shared when there are more workers than CPUs)
+    """
+    cpus = cpus or available_cpus()
+    if workers >= len(cpus):
+        return [cpus[index % len(cpus)]]
+    size = len(cpus) // workers
+    return cpus[index * size : (index + 1) * size]
+
+
+def apply_serving_config(config: ServingConfig, index: int = 0):
+    """Pin the current process and size its torch thread pools.
+
+    Must run before the model does any work, because torch only allows the
+    inter-op pool to be sized once.
+
+    Args:
+        config: Settings to apply
+        index: Index of this worker, selects its CPU slice
+    """
+    if config.pin_cpus and hasattr(os, "sched_setaffinity"):
+        cpus = cpu_slice(index, config.workers)
+        os.sched_setaffinity(0, cpus)
+        logger.info(f"Worker {index} pinned to CPUs {cpus}")
+
+    torch.set_num_threads(config.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(config.inter_op_threads)
+    except RuntimeError:
+        logger.warning("Inter-op threads already in use, keeping the default")
+
+
+_slot_lock = None
+
+
+def claim_worker_slot(workers: int, lock_dir: Path | str = "/tmp") -> int:
+    """Claim a free worker index among sibling server processes.
+
+    uvicorn does not tell its workers apart, so each worker takes the first
+    index whose lock file is free. The lock is released when the process exits.
+
+    Args:
+        workers: Number of worker indices
+        lock_dir: Directory for the lock files
+
+    Returns:
+        Claimed index, or 0 if all are taken
+    """
+    global _slot_lock
+
+    for index in range(workers):
+        handle = open(Path(lock_dir) / f"matchagen-worker-{index}.lock", "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_lock = handle
+        return index
+    return 0
+
+
+def load_serving_config(
+    path: Path | str = DEFAULT_CONFIG_FILE,
+) -> ServingConfig | None:
+    """Read the ``[serving]`` section, None if it is missing."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open("rb") as f:
+        section = tomli.load(f).get("serving")
+    if not section:
+        return None
+    fields = ServingConfig.__dataclass_fields__
+    return ServingConfig(**{k: v for k, v in section.items() if k in fields})
+
+
+def save_serving_config(
+    config: ServingConfig,
+    path: Path | str = DEFAULT_CONFIG_FILE,
+    comment: str = "",
+):
+    """Write ``config`` as the ``[serving]`` section, keeping other sections."""
+    path = Path(path)
+    text = path.read_text() if path.exists() else ""
+    # Drop the previous section up to the next table header
+    text = re.sub(r"(?ms)^\[serving\]\n.*?(?=^\[|\Z)", "", text).rstrip()
+
+    lines = ["[serving]"]
+    if comment:
+        lines.append(f"# {comment}")
+    for key, value in asdict(config).items():
+        lines.append(f"{key} = {str(value).lower()}")
+    path.write_text((text + "\n\n" if text else "") + "\n".join(lines) + "\n")
+
+
+def _bench_worker(
+    model_path: str,
+    config: ServingConfig,
+    index: int,
+    prompts: list[str],
+    max_length: int,
+    concurrency: int,
+    start,
+    results,
+):
+    apply_serving_config(config, index)
+
+    from matchagen.models import RecipeGenerator
+
+    generator = RecipeGenerator(model_path)
+    generator.generate(prompts[0], max_length=max_length)  # warm-up
+    results.put(None)
+    start.wait()
+
+    # Like the backend's threadpool, ``concurrency`` decodes share the process
+    def decode(offset: int) -> list[float]:
+        latencies = []
+        for i in range(offset, len(prompts), concurrency):
+            prompt = prompts[(i + index) % len(prompts)]
+            t0 = time.perf_counter()
+            generator.generate(prompt, temperature=0.8, max_length=max_length)
+            latencies.append(time.perf_counter() - t0)
+        return latencies
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results.put([t for part in pool.map(decode, range(concurrency)) for t in part])
+
+
+def benchmark(
+    model_path: str,
+    config: ServingConfig,
+    requests_per_worker: int = 6,
+    max_length: int = 128,
+    concurrency: int = 1,
+) -> dict:
+    """Serve a fixed number of requests from every worker at once.
+
+    Every worker is a fresh process, because the thread pools of a process can
+    only be sized once.
+
+    Args:
+        model_path: Model directory
+        config: Layout to benchmark
+        requests_per_worker: Requests each worker generates
+        max_length: Maximum tokens per request
+        concurrency: Decodes in flight per worker
+
+    Returns:
+        Throughput in requests per second and median latency in ms
+    """
+    import multiprocessing as mp
+
+    ctx = mp.get_context("spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+    prompts = [
+        BENCH_PROMPTS[i % len(BENCH_PROMPTS)] for i in range(requests_per_worker)
+    ]
+    procs = [
+        ctx.Process(
+            target=_bench_worker,
+            args=(
+                model_path,
+                config,
+                i,
+                prompts,
+                max_length,
+                concurrency,
+                start,
+                results,
+            ),
+        )
+        for i in range(config.workers)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for _ in procs:
+            results.get()  # wait until every worker is warmed up
+        t0 = time.perf_counter()
+        start.set()
+        latencies = [t for _ in procs for t in results.get()]
+        elapsed = time.perf_counter() - t0
+    finally:
+        for p in procs:
+            p.join()
+
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+    }
+
+
+def candidates(
+    workers: list[int] | None = None,
+    inter_op: tuple[int, ...] = (1,),
+    concurrency: int = 1,
+) -> list[ServingConfig]:
+    """Layouts worth benchmarking on this host.
+
+    Each worker count gets its share of the cores, half of it, and the share
+    divided among its concurrent decodes as intra-op threads.
+
+    Args:
+        workers: Worker counts, defaults to powers of two up to the CPU count
+        inter_op: Inter-op thread counts
+        concurrency: Decodes in flight per worker
+
+    Returns:
+        Candidate configurations
+    """
+    num_cpus = len(available_cpus())
+    if workers is None:
+        workers = [w for w in (1, 2, 4, 8, 16) if w <= num_cpus]
+    configs = []
+    for w in workers:
+        share = max(1, num_cpus // w)
+        shares = {share, max(1, share // 2), max(1, share // concurrency)}
+        for threads in sorted(shares, reverse=True):
+            for inter in inter_op:
+                configs.append(ServingConfig(w, threads, inter, pin_cpus=True))
+    return configs
+
+
+def autotune(
+    model_path: str,
+    configs: list[ServingConfig] | None = None,
+    requests_per_worker: int = 6,
+    max_length: int = 128,
+    concurrency: int | None = None,
+) -> tuple[ServingConfig, dict]:
+    """Benchmark the candidate layouts and return the fastest one.
+
+    Args:
+        model_path: Model directory
+        configs: Layouts to try, defaults to ``candidates()``
+        requests_per_worker: Requests each worker generates per layout
+        max_length: Maximum tokens per request
+        concurrency: Decodes in flight per worker, defaults to the backend's
+            MATCHAGEN_CONCURRENCY
+
+    Returns:
+        Tuple of (highest-throughput configuration, its benchmark result)
+    """
+    if concurrency is None:
+        concurrency = AdmissionController.from_env().concurrency
+    best = None
+    for config in configs or candidates(concurrency=concurrency):
+        result = benchmark(
+            model_path, config, requests_per_worker, max_length, concurrency
+        )
+        logger.info(
+            f"workers={config.workers} intra={config.intra_op_threads} "
+            f"inter={config.inter_op_threads}: "
+            f"{result['throughput']:.2f} req/s, p50 {result['p50_ms']:.0f} ms"
+        )
+        if best is None or result["throughput"] > best[1]["throughput"]:
+            best = (config, result)
+    return best
+
+
+def tune_and_save(
+    model_path: str,
+    config_file: Path | str = DEFAULT_CONFIG_FILE,
+    **kwargs,
+) -> ServingConfig:
+    """Run ``autotune`` and store the winner in the config file."""
+    config, result = autotune(model_path, **kwargs)
+    comment = (
+        f"Tuned on {len(available_cpus())} CPUs: "
+        f"{result['throughput']:.2f} req/s, p50 {result['p50_ms']:.0f} ms"
+    )
+    save_serving_config(config, config_file, comment)
+    logger.info(f"Saved {config} to {config_file}")
+    return config
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tune threads and workers")
+    parser.add_argument("--model", default="artefacts/matcha-model", help="Model dir")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG_FILE), help="TOML file")
+    parser.add_argument("--workers", help="Comma-separated worker counts")
+    parser.add_argument(
+        "--inter-op", default="1", help="Comma-separated inter-op thread counts"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=6, help="Requests per worker and layout"
+    )
+    parser.add_argument(
+        "--max-length", type=int, default=128, help="Maximum tokens per request"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=AdmissionController.from_env().concurrency,
+        help="Decodes in flight per worker (default MATCHAGEN_CONCURRENCY)",
+    )
+
+    args = parser.parse_args()
+
+    workers = [int(w) for w in args.workers.split(",")] if args.workers else None
+    inter_op = tuple(int(i) for i in args.inter_op.split(","))
+    tune_and_save(
+        args.model,
+        args.config,
+        configs=candidates(workers, inter_op, args.concurrency),
+        requests_per_worker=args.requests,
+        max_length=args.max_length,
+        concurrency=args.concurrency,
+    )
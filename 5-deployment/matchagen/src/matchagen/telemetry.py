@@ -0,0 +1,230 @@
+"""Structured per-request telemetry for scrape runs.
+
+Every fetch made by the scrapers is recorded as one JSON line with its latency,
+payload size, status, Firecrawl credits, the parser stage that produced recipes
+and the number of recipes yielded. The file can be summarised per domain with:
+
+    python -m matchagen.telemetry [metrics.jsonl]
+"""
+
+import json
+import math
+import os
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlparse
+
+DEFAULT_METRICS_FILE = Path(
+    os.getenv("CRAWL_METRICS_FILE", "assets/crawl_metrics.jsonl")
+)
+
+
+class CrawlTelemetry:
+    """Append-only JSONL recorder for crawl requests."""
+
+    def __init__(self, path: Path | str = DEFAULT_METRICS_FILE):
+        """Initialize the recorder.
+
+        Args:
+            path: Metrics file to append records to
+        """
+        self.path = Path(path)
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, url: str, source: str, kind: str = "page") -> Iterator[dict]:
+        """Time a request and write its record when the block exits.
+
+        The caller fills in ``status``, ``bytes``, ``credits``, ``stage`` and
+        ``recipes`` on the yielded record; latency and errors are added here.
+
+        Args:
+            url: Requested URL
+            source: Fetcher name ("firecrawl" or "http")
+            kind: What was requested (e.g. "json", "markdown", "page")
+
+        Yields:
+            Mutable record dictionary
+        """
+        record = self._new_record(url, source, kind)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["status"] = record["status"] or "error"
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.write(record)
+
+    def record(self, url: str, source: str, kind: str = "page", **fields):
+        """Write a record for a request that was timed elsewhere.
+
+        Used for documents streamed from batch jobs, where the latency is
+        measured from job submission rather than around a single call.
+
+        Args:
+            url: Requested URL
+            source: Fetcher name
+            kind: What was requested
+            **fields: Record fields such as ``latency_ms``, ``bytes`` or ``stage``
+        """
+        record = self._new_record(url, source, kind)
+        record.update(fields)
+        self.write(record)
+
+    def _new_record(self, url: str, source: str, kind: str) -> dict:
+        """Build an empty record for one request."""
+        return {
+            "run_id": self.run_id,
+            "ts": time.time(),
+            "url": url,
+            "domain": urlparse(url).netloc,
+            "source": source,
+            "kind": kind,
+            "status": None,
+            "bytes": 0,
+            "credits": None,
+            "stage": None,
+            "recipes": 0,
+        }
+
+    def write(self, record: dict):
+        """Append one record to the metrics file.
+
+        Args:
+            record: JSON-serialisable record
+        """
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as file:
+                file.write(line)
+
+
+telemetry = CrawlTelemetry()
+
+
+def firecrawl_stats(result) -> tuple[int, int | None, int | None]:
+    """Read payload size, credits and HTTP status from a Firecrawl Document.
+
+    Args:
+        result: Document returned by ``Firecrawl.scrape``
+
+    Returns:
+        Tuple of (bytes, credits_used, status_code)
+    """
+    if result is None:
+        return 0, None, None
+    size = len(getattr(result, "markdown", None) or "")
+    if getattr(result, "json", None):
+        size += len(json.dumps(result.json, default=str))
+    metadata = getattr(result, "metadata", None)
+    credits = getattr(metadata, "credits_used", None)
+    status = getattr(metadata, "status_code", None)
+    return size, credits, status
+
+
+def load_records(path: Path | str) -> list[dict]:
+    """Load all telemetry records from a metrics file.
+
+    Args:
+        path: Metrics JSONL file
+
+    Returns:
+        List of record dictionaries
+    """
+    with Path(path).open() as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(records: list[dict]) -> list[dict]:
+    """Aggregate telemetry records per domain.
+
+    Args:
+        records: Records as written by :class:`CrawlTelemetry`
+
+    Returns:
+        One summary row per domain, slowest p95 first
+    """
+    by_domain: dict[str, list[dict]] = {}
+    for record in records:
+        by_domain.setdefault(record["domain"], []).append(record)
+
+    rows = []
+    for domain, items in by_domain.items():
+        latencies = [r["latency_ms"] for r in items]
+        recipes = sum(r.get("recipes") or 0 for r in items)
+        errors = sum(1 for r in items if r.get("error") or r["status"] == "error")
+        stages = {}
+        for r in items:
+            if r.get("stage"):
+                stages[r["stage"]] = stages.get(r["stage"], 0) + 1
+        rows.append(
+            {
+                "domain": domain,
+                "requests": len(items),
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+                "mean_kb": statistics.fmean(r.get("bytes") or 0 for r in items) / 1024,
+                "credits": sum(r.get("credits") or 0 for r in items),
+                "errors": errors,
+                "recipes": recipes,
+                "yield": recipes / len(items),
+                "stages": stages,
+            }
+        )
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def print_summary(rows: list[dict]):
+    """Print a per-domain table of latency, credits and recipe yield."""
+    header = (
+        f"{'domain':<32}{'reqs':>6}{'p50 ms':>10}{'p95 ms':>10}{'KB':>8}"
+        f"{'credits':>9}{'errors':>8}{'recipes':>9}{'yield':>7}  stages"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        stages = ", ".join(f"{k}={v}" for k, v in sorted(row["stages"].items()))
+        print(
+            f"{row['domain'][:31]:<32}{row['requests']:>6}{row['p50_ms']:>10.0f}"
+            f"{row['p95_ms']:>10.0f}{row['mean_kb']:>8.1f}{row['credits']:>9}"
+            f"{row['errors']:>8}{row['recipes']:>9}{row['yield']:>7.2f}  {stages}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize crawl telemetry")
+    parser.add_argument(
+        "metrics_file",
+        nargs="?",
+        default=str(DEFAULT_METRICS_FILE),
+        help="Metrics JSONL file",
+    )
+    parser.add_argument("--run", help="Only include records from this run_id")
+
+    args = parser.parse_args()
+
+    records = load_records(args.metrics_file)
+    if args.run:
+        records = [r for r in records if r["run_id"] == args.run]
+    if not records:
+        raise SystemExit(f"No telemetry records in {args.metrics_file}")
+    print_summary(summarize(records))
@@ -0,0 +1,136 @@
+"""Server-side cache of pre-generated recipe variants.
+
+Pressing "generate" again for the same ingredients asks for a new variant of
+the same recipe. On a miss the cache generates a batch of variants in one
+decode, returns the first and keeps the rest, so the following presses for
+those ingredients are served from memory, each with a different recipe.
+Every variant keeps the token budget it was decoded with and is only handed
+to requests that allow at least that many tokens.
+"""
+
+import threading
+from collections import OrderedDict
+
+from matchagen.metrics import VARIANT_CACHE_REQUESTS
+from matchagen.recipe import Recipe
+
+
+def variant_key(prompt: str, temperature: float) -> tuple:
+    """Cache key that ignores ingredient order, case and spacing.
+
+    The token budget is not part of the key: admission control shrinks it
+    under load, so a variant decoded with a small budget may serve any request
+    allowing at least that much.
+    """
+    ingredients = sorted({i.strip().lower() for i in prompt.split(",") if i.strip()})
+    return tuple(ingredients), round(temperature, 2)
+
+
+class VariantCache:
+    """Hands out pre-generated variants one per request."""
+
+    def __init__(self, generator, n: int = 3, max_entries: int = 256):
+        """Initialize the cache.
+
+        Args:
+            generator: RecipeGenerator providing ``generate_variants``
+            n: Variants generated per miss
+            max_entries: Ingredient combinations kept, least recently used
+                are evicted first
+        """
+        self.generator = generator
+        self.n = n
+        self.max_entries = max_entries
+        # Variants per key as (token budget, recipe) pairs
+        self._entries: OrderedDict[tuple, list[tuple[int, Recipe]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pop(self, key: tuple, max_length: int) -> Recipe | None:
+        with self._lock:
+            variants = self._entries.get(key)
+            if not variants:
+                return None
+            # The longest variant the request's budget allows
+            fitting = [
+                i for i, (budget, _) in enumerate(variants) if budget <= max_length
+            ]
+            if not fitting:
+                return None
+            _, recipe = variants.pop(max(fitting, key=lambda i: variants[i][0]))
+            if not variants:
+                del self._entries[key]
+            return recipe
+
+    def _store(self, key: tuple, recipes: list[Recipe], max_length: int):
+        if not recipes:
+            return
+        with self._lock:
+            self._entries.setdefault(key, []).extend(
+                (max_length, recipe) for recipe in recipes
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, prompt: str, temperature: float, max_length: int) -> Recipe | None:
+        """Take a cached variant, None if there is none left within the budget.
+
+        Args:
+            prompt: Comma-separated ingredients
+            temperature: Sampling temperature
+            max_length: Most tokens the variant may have been decoded with
+
+        Returns:
+            Structured recipe or None
+        """
+        recipe = self._pop(variant_key(prompt, temperature), max_length)
+        VARIANT_CACHE_REQUESTS.inc(result="miss" if recipe is None else "hit")
+        return recipe
+
+    def fill(
+        self,
+        prompt: str,
+        temperature: float,
+        max_length: int,
+        deadline: float | None = None,
+    ) -> Recipe:
+        """Generate a batch of variants, return the first and keep the rest.
+
+        Args:
+            prompt: Comma-separated ingredients
+            temperature: Sampling temperature
+            max_length: Maximum tokens to generate
+            deadline: ``time.monotonic()`` after which decoding is cancelled
+
+        Returns:
+            Structured recipe
+        """
+        recipes = self.generator.generate_variants(
+            prompt,
+            n=self.n,
+            temperature=temperature,
+            max_length=max_length,
+            deadline=deadline,
+        )
+        self._store(variant_key(prompt, temperature), recipes[1:], max_length)
+        return recipes[0]
+
+    def get(self, prompt: str, temperature: float, max_length: int) -> Recipe:
+        """Return an unseen variant, generating a new batch when none is left.
+
+        Args:
+            prompt: Comma-separated ingredients
+            temperature: Sampling temperature
+            max_length: Maximum tokens to generate
+
+        Returns:
+            Structured recipe
+        """
+        recipe = self.pop(prompt, temperature, max_length)
+        if recipe is None:
+            recipe = self.fill(prompt, temperature, max_length)
+        return recipe
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._entries.values())
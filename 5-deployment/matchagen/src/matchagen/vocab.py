@@ -0,0 +1,261 @@
+"""Trim the served model to the vocabulary matcha recipes actually use.
+
+The fine-tuned T5 keeps the full 32k-token vocabulary, although the recipes
+use a small slice of it. Every decode step computes a softmax over all of
+them. The trimming tool tokenizes the training corpus and generated outputs,
+keeps the tokens that occur plus the special tokens, and slices the embedding
+and LM-head matrices to those rows:
+
+    python -m matchagen.vocab --model artefacts/matcha-model \\
+        --output artefacts/matcha-model-trimmed --samples 200
+
+The trimmed artefact stores the original tokenizer together with the kept
+token ids. ``RecipeGenerator`` notices the id file and loads the tokenizer as
+a ``TrimmedTokenizer``, which remaps ids in both directions. Input tokens
+outside the kept set become the unknown token; ingredients lost that way are
+added back by the ingredient recovery step of generation.
+"""
+
+import json
+from collections import Counter
+from pathlib import Path
+
+import torch
+from loguru import logger
+from torch import nn
+from transformers import AutoTokenizer, BatchEncoding
+
+TRIM_FILE = "trimmed_vocab.json"
+
+
+class TrimmedTokenizer:
+    """Tokenizer of a trimmed model, remapping ids of the original tokenizer.
+
+    Special tokens keep their ids, because they are always kept and the kept
+    ids are sorted, so ``pad_token_id`` and friends of the wrapped tokenizer
+    remain valid.
+    """
+
+    def __init__(self, tokenizer, keep_ids: list[int]):
+        """Initialize the wrapper.
+
+        Args:
+            tokenizer: Tokenizer of the untrimmed model
+            keep_ids: Sorted original ids kept in the trimmed vocabulary
+        """
+        self.tokenizer = tokenizer
+        self.keep_ids = torch.tensor(keep_ids, dtype=torch.long)
+        size = max(len(tokenizer), int(self.keep_ids.max()) + 1)
+        unk_id = keep_ids.index(tokenizer.unk_token_id)
+        self.to_trimmed = torch.full((size,), unk_id, dtype=torch.long)
+        self.to_trimmed[self.keep_ids] = torch.arange(len(keep_ids))
+
+    @classmethod
+    def from_pretrained(cls, path: Path | str) -> "TrimmedTokenizer":
+        """Load the original tokenizer and the kept ids from a trimmed artefact."""
+        keep_ids = json.loads((Path(path) / TRIM_FILE).read_text())["keep_ids"]
+        return cls(AutoTokenizer.from_pretrained(path), keep_ids)
+
+    def save_pretrained(self, path: Path | str):
+        self.tokenizer.save_pretrained(path)
+        (Path(path) / TRIM_FILE).write_text(
+            json.dumps({"keep_ids": self.keep_ids.tolist()})
+        )
+
+    def __len__(self) -> int:
+        return len(self.keep_ids)
+
+    def __call__(self, text, return_tensors=None, **kwargs) -> BatchEncoding:
+        encoding = self.tokenizer(text, return_tensors="pt", **kwargs)
+        input_ids = self.to_trimmed[encoding["input_ids"]]
+        if return_tensors != "pt":
+            encoding = {k: v.tolist() for k, v in encoding.items()}
+            input_ids = input_ids.tolist()
+        encoding["input_ids"] = input_ids
+        return BatchEncoding(encoding)
+
+    def decode(self, token_ids, **kwargs) -> str:
+        token_ids = torch.as_tensor(token_ids, dtype=torch.long)
+        return self.tokenizer.decode(self.keep_ids[token_ids.cpu()], **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.tokenizer, name)
+
+
+def load_tokenizer(model_path: Path | str):
+    """Tokenizer for a model directory, trimmed or not."""
+    if (Path(model_path) / TRIM_FILE).exists():
+        return TrimmedTokenizer.from_pretrained(model_path)
+    return AutoTokenizer.from_pretrained(model_path)
+
+
+def corpus_texts(recipe_file: Path | str) -> list[str]:
+    """Training inputs and targets, in the format the model sees them."""
+    from matchagen.main import format_for_t5, load_recipes
+
+    pairs = format_for_t5(load_recipes(Path(recipe_file)))
+    return [p["input_text"] for p in pairs] + [p["target_text"] for p in pairs]
+
+
+def count_tokens(tokenizer, texts: list[str]) -> Counter:
+    """Occurrences of each token id in the tokenized texts."""
+    counts: Counter = Counter()
+    for text in texts:
+        counts.update(tokenizer(text)["input_ids"])
+    return counts
+
+
+def sample_token_ids(
+    model, tokenizer, prompts: list[str], samples: int, max_length: int = 512
+) -> Counter:
+    """Occurrences of each token id in outputs sampled from the model.
+
+    Uses the sampling settings of ``RecipeGenerator``, so tokens the model
+    produces beyond the training corpus are kept as well.
+    """
+    counts: Counter = Counter()
+    model.eval()
+    for i in range(samples):
+        inputs = tokenizer(prompts[i % len(prompts)], return_tensors="pt")
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_length=max_length,
+                do_sample=True,
+                temperature=0.8,
+                top_k=50,
+                top_p=0.92,
+                repetition_penalty=1.2,
+                no_repeat_ngram_size=2,
+            )
+        counts.update(outputs[0].tolist())
+    return counts
+
+
+def select_vocab(tokenizer, counts: Counter, min_count: int = 1) -> list[int]:
+    """Sorted ids of the special tokens and the tokens seen ``min_count`` times."""
+    keep = {i for i, c in counts.items() if c >= min_count}
+    keep.update(tokenizer.all_special_ids)
+    return sorted(keep)
+
+
+def trim_model(model, keep_ids: list[int]):
+    """Slice the embedding and LM-head matrices to ``keep_ids`` in place.
+
+    Args:
+        model: Seq2seq model with input and output embeddings
+        keep_ids: Sorted ids to keep; their order defines the new ids
+
+    Returns:
+        The trimmed model
+    """
+    keep = torch.tensor(keep_ids, dtype=torch.long)
+    old_input = model.get_input_embeddings()
+    old_output = model.get_output_embeddings()
+    tied = old_output.weight.data_ptr() == old_input.weight.data_ptr()
+
+    new_input = nn.Embedding(len(keep), old_input.embedding_dim)
+    new_input.weight.data = old_input.weight.data[keep].clone()
+    model.set_input_embeddings(new_input)
+
+    new_output = nn.Linear(old_output.in_features, len(keep), bias=False)
+    if tied:
+        new_output.weight = new_input.weight
+    else:
+        new_output.weight.data = old_output.weight.data[keep].clone()
+    model.set_output_embeddings(new_output)
+
+    model.config.vocab_size = len(keep)
+    return model
+
+
+def trim(
+    model_path: Path | str,
+    output_dir: Path | str,
+    recipe_file: Path | str | None = None,
+    generated_files: list[Path] = (),
+    samples: int = 0,
+    min_count: int = 1,
+) -> list[int]:
+    """Build the reduced vocabulary and write the trimmed model artefact.
+
+    Args:
+        model_path: Untrimmed model directory
+        output_dir: Directory of the trimmed artefact
+        recipe_file: Training recipes to analyze
+        generated_files: Text files of raw model outputs to analyze
+        samples: Number of outputs to sample from the model
+        min_count: Occurrences a token needs to be kept
+
+    Returns:
+        Kept original token ids
+    """
+    from transformers import AutoModelForSeq2SeqLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+
+    texts = corpus_texts(recipe_file) if recipe_file else []
+    for path in generated_files:
+        texts += Path(path).read_text().splitlines()
+    counts = count_tokens(tokenizer, texts)
+
+    if samples:
+        prompts = [t for t in texts if t.startswith("items:")] or ["items: matcha"]
+        counts.update(sample_token_ids(model, tokenizer, prompts, samples))
+
+    keep_ids = select_vocab(tokenizer, counts, min_count)
+    old_size = model.get_input_embeddings().num_embeddings
+    old_params = sum(p.numel() for p in model.parameters())
+    trim_model(model, keep_ids)
+    new_params = sum(p.numel() for p in model.parameters())
+
+    output_dir = Path(output_dir)
+    model.save_pretrained(output_dir)
+    TrimmedTokenizer(tokenizer, keep_ids).save_pretrained(output_dir)
+    logger.info(
+        f"Vocabulary {old_size} -> {len(keep_ids)} tokens, "
+        f"parameters {old_params / 1e6:.1f}M -> {new_params / 1e6:.1f}M, "
+        f"saved to {output_dir}"
+    )
+    return keep_ids
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trim the model vocabulary")
+    parser.add_argument("--model", default="artefacts/matcha-model", help="Model dir")
+    parser.add_argument(
+        "--output", default="artefacts/matcha-model-trimmed", help="Output dir"
+    )
+    parser.add_argument(
+        "--recipes",
+        default="assets/matcha_recipes_combined_cleaned.txt",
+        help="Training recipes",
+    )
+    parser.add_argument(
+        "--generated",
+        type=Path,
+        nargs="*",
+        default=[],
+        help="Files with one raw model output per line",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=0, help="Outputs to sample from the model"
+    )
+    parser.add_argument(
+        "--min-count", type=int, default=1, help="Occurrences to keep a token"
+    )
+
+    args = parser.parse_args()
+
+    recipes = args.recipes if Path(args.recipes).exists() else None
+    trim(
+        args.model,
+        args.output,
+        recipes,
+        args.generated,
+        args.samples,
+        args.min_count,
+    )